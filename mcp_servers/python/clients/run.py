@@ -1,7 +1,8 @@
 from quart import Quart, request, jsonify, make_response, Response
+from quart.json.provider import DefaultJSONProvider
 from quart_cors import cors
-import json
 import asyncio
+import math
 import sys
 import os
 import logging
@@ -12,56 +13,181 @@ from asyncio import Lock
 from hypercorn.asyncio import serve
 from hypercorn.config import Config
 from contextlib import AsyncExitStack
-from src.llm.azureopenai import azure_openai_processor
-from src.server_connection import initialize_all_mcp, MCPServers
+from src.server_connection import initialize_all_mcp, MCPServers, MCPServerStatus
+from src.client_and_server_config import AdmissionControlConfig, ServerStartupConfig, SidecarConfig, StreamConfig
+from src.llm.http_client import initialize_llm_clients, close_llm_clients
 from src.client_and_server_validation import client_and_server_validation
 from src.client_and_server_execution import client_and_server_execution
-import logging
+from src.tool_router import RouterDecisionCache
+from src.tool_result_cache import ToolResultCache, get_tenant_hash
+from src.admission_control import (
+    AdmissionRejected, acquire_admission, admission, get_admission_stats, release_admission
+)
+from src.json_codec import dumps, loads
+from src.metrics import (
+    METRICS_CONTENT_TYPE, Errors, InflightRequests, Metrics, RequestSeconds, SerializationSeconds,
+    SseFirstFrameSeconds, ValidationSeconds, build_gauge
+)
+from src.structured_logging import RequestId, get_dropped_log_records, log_payload, new_request_id, setup_logging
 
 
-# Configure clean logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Structured logging through a queue, written out by a background thread
+setup_logging()
 logger = logging.getLogger('api')
 
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify and request.get_json through the shared JSON codec"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        with SerializationSeconds.time(stage="response"):
+            return dumps(obj)
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+
 app = Quart(__name__)
+app.json = FastJSONProvider(app)
 app = cors(app, allow_origin="*")
 
+def get_endpoint_label() -> str:
+    # Route rule rather than path, so unknown paths cannot grow the label set
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
 # Clean request logging middleware
 @app.before_request
 async def log_request_start():
     request.start_time = time.time()
+    # Correlation ID of the request, taken from the caller when it sends one
+    request.request_id = request.headers.get("X-Request-ID") or new_request_id()
+    RequestId.set(request.request_id)
+    request.metrics_endpoint = get_endpoint_label()
+    InflightRequests.inc(endpoint=request.metrics_endpoint)
 
 # Clean response logging middleware
 @app.after_request
 async def log_request_complete(response):
     request_time = time.time() - request.start_time
-    logger.info(f"{request.method} {request.path} - {response.status_code} - {request_time:.3f}s")
+    if not getattr(request, "is_streamed", False):
+        # Streamed requests are observed by stream_generator once the stream ends
+        RequestSeconds.observe(request_time, endpoint=request.metrics_endpoint)
+    response.headers["X-Request-ID"] = request.request_id
+    logger.info("Request completed", extra={"fields": {
+        "method": request.method, "path": request.path, "status": response.status_code, "duration": round(request_time, 3)
+    }})
     return response
 
+@app.teardown_request
+async def track_request_end(exc):
+    if getattr(request, "metrics_endpoint", None) is not None and not getattr(request, "is_streamed", False):
+        InflightRequests.dec(endpoint=request.metrics_endpoint)
+
 app.mcp_exit_stack = None
 # Initialize the clients when the app starts
 @app.before_serving
 async def startup():
     try:
+        await initialize_llm_clients()
+        logger.info("LLM HTTP clients initialized")
+
         app.mcp_exit_stack = AsyncExitStack()
         await app.mcp_exit_stack.__aenter__()
-        print("\n✅ MCP servers initialization started.")
+        logger.info("MCP servers initialization started")
         success = await initialize_all_mcp(app.mcp_exit_stack)
         if success: 
-            print(f"\nAvailable servers: {list(MCPServers.keys())}")
-            print("\n✅ MCP servers initialized successfully.\n")
+            logger.info("MCP servers initialized", extra={"fields": {"servers": list(MCPServers.keys())}})
         else:
-            print("\n❌ Failed to initialize MCP clients.")
+            logger.error("Failed to initialize MCP clients")
         
     except Exception as err:
-        print(f"Error initializing MCP clients =========>>>> {err}")
+        logger.exception(f"Error initializing MCP clients: {err}")
+
+
+@app.route("/api/v1/mcp/health", methods=["GET"])
+async def health():
+    servers = {name: dict(status) for name, status in MCPServerStatus.items()}
+    for name, pool in MCPServers.items():
+        if name in servers:
+            servers[name]["replica_load"] = pool.stats()
+    # Lazy servers count as healthy, they are spawned on their first request. Degraded ones
+    # still serve with fewer replicas, reported in their "replicas" count.
+    is_ready = all(status["status"] in ("ready", "degraded", "lazy") for status in servers.values())
+    return jsonify({
+        "Data": {
+            "lazy_startup": ServerStartupConfig.get("lazy", False),
+            "servers": servers,
+            "caches": {
+                "router_decisions": RouterDecisionCache.stats(),
+                "tool_results": ToolResultCache.stats()
+            },
+            "streams": get_stream_metrics(),
+            "admission": get_admission_stats()
+        },
+        "Error": None,
+        "Status": is_ready
+    }), 200 if is_ready else 503
+
+
+def collect_runtime_metrics():
+    """Metrics read at scrape time from the caches, the server pools and the open streams"""
+    caches = {"router_decisions": RouterDecisionCache.stats(), "tool_results": ToolResultCache.stats()}
+    stream_metrics = get_stream_metrics()
+    admission_stats = get_admission_stats()
+    return [
+        build_gauge("mcp_gateway_cache_hits_total", "Cache hits", ("cache",),
+                    [({"cache": name}, stats["hits"]) for name, stats in caches.items()], metric_type="counter"),
+        build_gauge("mcp_gateway_cache_misses_total", "Cache misses", ("cache",),
+                    [({"cache": name}, stats["misses"]) for name, stats in caches.items()], metric_type="counter"),
+        build_gauge("mcp_gateway_cache_entries", "Cached entries", ("cache",),
+                    [({"cache": name}, stats["size"]) for name, stats in caches.items()]),
+        build_gauge("mcp_gateway_server_up", "Whether an MCP server is ready or degraded", ("server",),
+                    [({"server": name}, int(status["status"] in ("ready", "degraded"))) for name, status in MCPServerStatus.items()]),
+        build_gauge("mcp_gateway_server_replicas", "Live replicas per MCP server", ("server",),
+                    [({"server": name}, len(pool)) for name, pool in MCPServers.items()]),
+        build_gauge("mcp_gateway_session_inflight_tool_calls", "In-flight tool calls per MCP server replica", ("server", "replica"),
+                    [({"server": name, "replica": index}, replica["in_flight"])
+                     for name, pool in MCPServers.items() for index, replica in enumerate(pool.stats())]),
+        build_gauge("mcp_gateway_sse_active_streams", "Open SSE streams", (),
+                    [({}, stream_metrics["active_streams"])]),
+        build_gauge("mcp_gateway_sse_queue_depth", "Frames waiting in the SSE queues", (),
+                    [({}, stream_metrics["queue_depth"])]),
+        build_gauge("mcp_gateway_sse_heartbeats_total", "SSE heartbeats sent", (),
+                    [({}, stream_metrics["heartbeats_sent"])], metric_type="counter"),
+        build_gauge("mcp_gateway_sse_producer_stall_seconds_total", "Time producers waited on a full SSE queue", (),
+                    [({}, stream_metrics["producer_stall_seconds"])], metric_type="counter"),
+        build_gauge("mcp_gateway_log_records_dropped_total", "Log records dropped because the log queue was full", (),
+                    [({}, get_dropped_log_records())], metric_type="counter"),
+        build_gauge("mcp_gateway_admission_active", "Slots in use per tenant, provider and MCP server (tenants summed)", ("scope", "key"),
+                    [({"scope": stats["scope"], "key": stats["key"]}, stats["active"]) for stats in admission_stats]),
+        build_gauge("mcp_gateway_admission_waiting", "Work waiting for a slot per tenant, provider and MCP server (tenants summed)", ("scope", "key"),
+                    [({"scope": stats["scope"], "key": stats["key"]}, stats["waiting"]) for stats in admission_stats]),
+    ]
+
+
+Metrics.register_collector(collect_runtime_metrics)
+
+
+@app.route("/metrics", methods=["GET"])
+async def metrics():
+    return Response(Metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+def get_tenant_key(data: Dict[str, Any]) -> str:
+    """Tenant of a request, the X-Tenant-ID header or else the hash of its server credentials"""
+    return request.headers.get("X-Tenant-ID") or get_tenant_hash(data.get("selected_server_credentials"))
+
+
+def admission_rejected_response(error: AdmissionRejected):
+    """503 returned for work shed by admission control"""
+    logger.warning("Request shed by admission control", extra={"fields": {"scope": error.scope, "reason": error.reason}})
+    retry_after = max(1, math.ceil(AdmissionControlConfig.get("queue_timeout", 5.0)))
+    return jsonify({
+        "Data": None,
+        "Error": str(error),
+        "Status": False
+    }), 503, {"Retry-After": str(retry_after)}
 
 
 @app.route("/api/v1/mcp/process_message", methods=["POST"])
@@ -73,24 +199,26 @@ async def process_message():
         if "client_details" in data:
             data["client_details"]["is_stream"] = False
         
-        # Validation check
-        validation_result = await client_and_server_validation(data, {"streamCallbacks": None, "is_stream": False})
-        if not validation_result["status"]:
-            return jsonify({
-                "Data": None,
-                "Error": validation_result["error"],
-                "Status": False
-            }), 200
+        async with admission("tenant", get_tenant_key(data)):
+            # Validation check
+            with ValidationSeconds.time():
+                validation_result = await client_and_server_validation(data, {"streamCallbacks": None, "is_stream": False})
+            if not validation_result["status"]:
+                Errors.inc(stage="validation")
+                return jsonify({
+                    "Data": None,
+                    "Error": validation_result["error"],
+                    "Status": False
+                }), 200
+                
+            logger.info("Validation successful, execution started")
             
-        print(f"\n✅ Validation Successful")
-        # print(validation_result)
-        print(f"\n✅ Execution Started")
-        
-        # Execution
-        generated_payload = validation_result["payload"]
-        execution_response = await client_and_server_execution(generated_payload, {"streamCallbacks": None, "is_stream": False})
+            # Execution
+            generated_payload = validation_result["payload"]
+            execution_response = await client_and_server_execution(generated_payload, {"streamCallbacks": None, "is_stream": False})
         
-        print(f"\n✅ Execution Completed")
+        logger.info("Execution completed", extra={"fields": {"status": execution_response.Status}})
+        log_payload(logger, "Execution response", execution_response.Data)
         response_dict = {
             "Data": execution_response.Data,
             "Error": execution_response.Error,
@@ -98,8 +226,10 @@ async def process_message():
         }
         return jsonify(response_dict), 200
     
+    except AdmissionRejected as error:
+        return admission_rejected_response(error)
     except Exception as error:
-        print(f"Error ========>>>>> {error}")
+        logger.exception(f"Error processing message: {error}")
         return jsonify({
             "Data": None,
             "Error": str(error),
@@ -107,13 +237,44 @@ async def process_message():
         }), 500
 
 
+# Queues of the open SSE streams and their counters, reported by the health endpoint
+ActiveStreamQueues: set = set()
+StreamMetrics: Dict[str, Any] = {
+    "total_streams": 0,
+    "heartbeats_sent": 0,
+    "max_queue_depth": 0,
+    "producer_stalls": 0,
+    "producer_stall_seconds": 0.0
+}
+
+
+def get_stream_metrics() -> Dict[str, Any]:
+    return {
+        **StreamMetrics,
+        "producer_stall_seconds": round(StreamMetrics["producer_stall_seconds"], 3),
+        "active_streams": len(ActiveStreamQueues),
+        "queue_depth": sum(queue.qsize() for queue in ActiveStreamQueues)
+    }
+
+
 class CustomStreamHandler:
     def __init__(self, response_queue: asyncio.Queue):
         self.response_queue = response_queue
+
+    async def put(self, item: Optional[str]):
+        """Queue a frame, waiting for the reader when the queue is full"""
+        if self.response_queue.full():
+            stalled_at = time.perf_counter()
+            await self.response_queue.put(item)
+            StreamMetrics["producer_stalls"] += 1
+            StreamMetrics["producer_stall_seconds"] += time.perf_counter() - stalled_at
+        else:
+            self.response_queue.put_nowait(item)
+        StreamMetrics["max_queue_depth"] = max(StreamMetrics["max_queue_depth"], self.response_queue.qsize())
     
     async def on_data(self, chunk: str):
         """Send data chunk to the stream"""
-        await self.response_queue.put(f"data: {chunk}\n\n")
+        await self.put(f"data: {chunk}\n\n")
     
     async def on_end(self):
         """Send completion message and end the stream"""
@@ -124,36 +285,73 @@ class CustomStreamHandler:
             "StreamingStatus": "COMPLETED",
             "Action": "NO-ACTION"
         }
-        await self.response_queue.put(f"data: {json.dumps(completion_data)}\n\n")
-        await self.response_queue.put(None)  # Signal end of stream
+        await self.put(f"data: {dumps(completion_data)}\n\n")
+        await self.put(None)  # Signal end of stream
     
     async def on_error(self, error: Exception):
         """Send error message and end the stream"""
-        print(f"Streaming Error: {error}")
+        logger.error(f"Streaming error: {error}")
         error_data = {"error": str(error)}
-        await self.response_queue.put(f"data: {json.dumps(error_data)}\n\n")
-        await self.response_queue.put(None)  # Signal end of stream
+        await self.put(f"data: {dumps(error_data)}\n\n")
+        await self.put(None)  # Signal end of stream
 
-async def stream_generator(response_queue: asyncio.Queue):
-    """Generator function for streaming responses"""
-    while True:
-        try:
-            # Wait for data with a timeout to prevent hanging
-            data = await asyncio.wait_for(response_queue.get(), timeout=30.0)
-            if data is None:  # End of stream signal
+# Frames carrying LLM output, the first one ends the time to first frame. Frames are
+# encoded with the compact separators of the shared JSON codec.
+CONTENT_FRAME_MARKERS = ('"Action":"MESSAGE"', '"Action":"AI-RESPONSE"')
+
+
+async def stream_generator(
+    response_queue: asyncio.Queue,
+    producer_task: Optional[asyncio.Task] = None,
+    started_at: Optional[float] = None,
+    metrics_endpoint: Optional[str] = None,
+    request_started_at: Optional[float] = None
+):
+    """Generator function for streaming responses.
+
+    While the producer is busy (long tool or LLM calls) an SSE comment is sent every
+    heartbeat interval to keep proxies and clients from closing the connection.
+    The generator is closed when the client disconnects, the producer task is then
+    cancelled so the request stops making LLM and tool calls nobody will read.
+    The request duration and in-flight metrics of `metrics_endpoint` are closed here,
+    when the stream ends rather than when the handler returns.
+    """
+    heartbeat_interval = StreamConfig.get("heartbeat_interval", 15.0)
+    ActiveStreamQueues.add(response_queue)
+    StreamMetrics["total_streams"] += 1
+    try:
+        while True:
+            try:
+                data = await asyncio.wait_for(response_queue.get(), timeout=heartbeat_interval)
+                if data is None:  # End of stream signal
+                    break
+                if started_at is not None and any(marker in data for marker in CONTENT_FRAME_MARKERS):
+                    SseFirstFrameSeconds.observe(time.perf_counter() - started_at)
+                    started_at = None
+                yield data
+            except asyncio.TimeoutError:
+                if producer_task is not None and producer_task.done() and response_queue.empty():
+                    # The producer ended without its end of stream signal
+                    break
+                StreamMetrics["heartbeats_sent"] += 1
+                yield ": keepalive\n\n"
+            except Exception as e:
+                logger.exception(f"Stream generator error: {e}")
                 break
-            yield data
-        except asyncio.TimeoutError:
-            # Send keepalive or break on timeout
-            break
-        except Exception as e:
-            print(f"Stream generator error: {e}")
-            break
+    finally:
+        ActiveStreamQueues.discard(response_queue)
+        if producer_task is not None and not producer_task.done():
+            logger.info("Stream closed before completion, cancelling request execution")
+            producer_task.cancel()
+        if metrics_endpoint is not None:
+            RequestSeconds.observe(time.time() - request_started_at, endpoint=metrics_endpoint)
+            InflightRequests.dec(endpoint=metrics_endpoint)
 
 @app.route('/api/v1/mcp/process_message_stream', methods=['POST'])
 async def process_message_stream():
-    # Create a queue for streaming responses
-    response_queue = asyncio.Queue()
+    started_at = time.perf_counter()
+    # Create a bounded queue for streaming responses, a slow reader holds back the producer
+    response_queue = asyncio.Queue(maxsize=StreamConfig.get("max_queue_size", 256))
     custom_stream_handler = CustomStreamHandler(response_queue)
     
     try:
@@ -165,7 +363,13 @@ async def process_message_stream():
         # Modify client details
         if 'client_details' not in data:
             data['client_details'] = {}
-        data['client_details']['is_stream'] = False
+        data['client_details']['is_stream'] = True
+
+        # Shed before the stream starts, the tenant slot is released when the producer ends
+        try:
+            tenant_limiter = await acquire_admission("tenant", get_tenant_key(data))
+        except AdmissionRejected as error:
+            return admission_rejected_response(error)
         
         # Start streaming response
         async def generate_response():
@@ -178,12 +382,14 @@ async def process_message_stream():
                     "StreamingStatus": "STARTED",
                     "Action": "NO-ACTION"
                 }
-                await custom_stream_handler.on_data(json.dumps(start_data))
+                await custom_stream_handler.on_data(dumps(start_data))
                 
                 # =========================================== validation check start =============================================================
-                validation_result = await client_and_server_validation(data, {"streamCallbacks": custom_stream_handler, "is_stream": True})
+                with ValidationSeconds.time():
+                    validation_result = await client_and_server_validation(data, {"streamCallbacks": custom_stream_handler, "is_stream": True})
                 
                 if not validation_result.get('status', False):
+                    Errors.inc(stage="validation")
                     error_data = {
                         "Data": None,
                         "Error": validation_result.get('error'),
@@ -191,7 +397,7 @@ async def process_message_stream():
                         "StreamingStatus": "ERROR",
                         "Action": "ERROR"
                     }
-                    await custom_stream_handler.on_data(json.dumps(error_data))
+                    await custom_stream_handler.on_data(dumps(error_data))
                     await custom_stream_handler.on_end()
                     return
                 # =========================================== validation check end =============================================================
@@ -200,7 +406,8 @@ async def process_message_stream():
                 generated_payload = validation_result.get('payload')
                 execution_response = await client_and_server_execution(generated_payload, {"streamCallbacks": custom_stream_handler, "is_stream": True})
                 # =========================================== execution end ======================================================================
-                print(f"\n✅ ------------------------" , execution_response.Data)
+                logger.info("Execution completed", extra={"fields": {"status": execution_response.Status}})
+                log_payload(logger, "Execution response", execution_response.Data)
                 if not execution_response.Status:
                     error_data = {
                         "Data": execution_response.Data,
@@ -209,7 +416,7 @@ async def process_message_stream():
                         "StreamingStatus": "ERROR",
                         "Action": "ERROR"
                     }
-                    await custom_stream_handler.on_data(json.dumps(error_data))
+                    await custom_stream_handler.on_data(dumps(error_data))
                     await custom_stream_handler.on_end()
                     return
                 
@@ -221,11 +428,13 @@ async def process_message_stream():
                     "StreamingStatus": "IN-PROGRESS",
                     "Action": "AI-RESPONSE"
                 }
-                await custom_stream_handler.on_data(json.dumps(success_data))
+                with SerializationSeconds.time(stage="response"):
+                    success_frame = dumps(success_data)
+                await custom_stream_handler.on_data(success_frame)
                 await custom_stream_handler.on_end()
                 
             except Exception as error:
-                print(f"Error ========>>>>> {error}")
+                logger.exception(f"Error processing message stream: {error}")
                 error_data = {
                     "Data": None,
                     "Error": str(error),
@@ -233,15 +442,17 @@ async def process_message_stream():
                     "StreamingStatus": "ERROR",
                     "Action": "ERROR"
                 }
-                await custom_stream_handler.on_data(json.dumps(error_data))
+                await custom_stream_handler.on_data(dumps(error_data))
                 await custom_stream_handler.on_end()
         
         # Start the response generation in the background
-        asyncio.create_task(generate_response())
+        producer_task = asyncio.create_task(generate_response())
+        producer_task.add_done_callback(lambda _: release_admission(tenant_limiter))
         
-        # Return streaming response
+        # Return streaming response, its metrics are closed when the stream ends
+        request.is_streamed = True
         return Response(
-            stream_generator(response_queue),
+            stream_generator(response_queue, producer_task, started_at, request.metrics_endpoint, request.start_time),
             mimetype='text/event-stream',
             headers={
                 'Cache-Control': 'no-cache',
@@ -252,7 +463,7 @@ async def process_message_stream():
         )
         
     except Exception as error:
-        print(f"Error ========>>>>> {error}")
+        logger.exception(f"Error processing message stream: {error}")
         
         # Send error response immediately
         error_data = {
@@ -264,7 +475,7 @@ async def process_message_stream():
         }
         
         async def error_generator():
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield f"data: {dumps(error_data)}\n\n"
         
         return Response(
             error_generator(),
@@ -281,7 +492,9 @@ async def shutdown():
     if app.mcp_exit_stack:
         await app.mcp_exit_stack.__aexit__(None, None, None)
         app.mcp_exit_stack = None
-        print("\n✅ MCP servers cleaned up on shutdown.\n")
+        logger.info("MCP servers cleaned up on shutdown")
+    await close_llm_clients()
+    logger.info("LLM HTTP clients closed on shutdown")
     
 if __name__ == "__main__":
     # Create a config instance
@@ -301,4 +514,14 @@ if __name__ == "__main__":
     print("╚═══════════════════════════════════════════════════════════════════════════════════════════╝")
 
     # Start the Quart app
-    asyncio.run(serve(app, config))
\ No newline at end of file
+    workers = SidecarConfig.get("workers", 1)
+    if workers > 1:
+        if not SidecarConfig.get("enabled"):
+            logger.warning("Several workers without the sidecar, every worker spawns its own MCP servers")
+        # Worker processes import the app by path, with the MCP servers shared through the sidecar
+        from hypercorn.run import run
+        config.workers = workers
+        config.application_path = "run:app"
+        run(config)
+    else:
+        asyncio.run(serve(app, config))
\ No newline at end of file
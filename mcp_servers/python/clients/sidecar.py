@@ -0,0 +1,26 @@
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+
+from src.server_connection import initialize_all_mcp
+from src.sidecar_server import start_sidecar_server
+from src.structured_logging import setup_logging
+
+setup_logging()
+logger = logging.getLogger("sidecar")
+
+
+async def main():
+    """Own the MCP server processes and serve them to the gateway workers over the sidecar socket"""
+    async with AsyncExitStack() as exit_stack:
+        await initialize_all_mcp(exit_stack, use_sidecar=False)
+        server = await start_sidecar_server()
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Sidecar stopped")
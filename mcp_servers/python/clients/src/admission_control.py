@@ -0,0 +1,140 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from src.client_and_server_config import AdmissionControlConfig
+from src.metrics import AdmissionQueueSeconds, AdmissionRejections, Errors
+
+
+class AdmissionRejected(Exception):
+    """Work shed because its tenant, provider or server has no free slot, answered with a 503"""
+
+    def __init__(self, scope: str, key: str, reason: str):
+        self.scope = scope
+        self.key = key
+        self.reason = reason
+        detail = "too many waiting requests" if reason == "queue_full" else "no free slot in time"
+        super().__init__(f"{scope} {key} is at capacity ({detail}), retry later")
+
+
+class ConcurrencyLimiter:
+    """Semaphore with a bounded number of waiters"""
+
+    def __init__(self, scope: str, key: str, max_concurrent: int, max_queue: int):
+        self.scope = scope
+        self.key = key
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)
+        self.active = 0
+        self.waiting = 0
+
+    def is_idle(self) -> bool:
+        return self.active == 0 and self.waiting == 0
+
+    async def acquire(self, timeout: float):
+        """Take a slot, raising AdmissionRejected when the queue is full or the wait times out"""
+        if not self.semaphore.locked():
+            # Free slot, taken without suspending so concurrent arrivals see it in use
+            await self.semaphore.acquire()
+            self.active += 1
+            AdmissionQueueSeconds.observe(0.0, scope=self.scope)
+            return
+        if self.waiting >= self.max_queue:
+            raise self.reject("queue_full")
+
+        started_at = time.perf_counter()
+        is_acquired = False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=timeout)
+            is_acquired = True
+        except asyncio.TimeoutError:
+            raise self.reject("timeout")
+        finally:
+            self.waiting -= 1
+            if not is_acquired:
+                # Rejected or cancelled while waiting
+                self.discard_if_idle()
+        self.active += 1
+        AdmissionQueueSeconds.observe(time.perf_counter() - started_at, scope=self.scope)
+
+    def release(self):
+        self.active -= 1
+        self.semaphore.release()
+        self.discard_if_idle()
+
+    def discard_if_idle(self):
+        # Tenant limiters come and go with the tenants, drop them once unused
+        if self.scope == "tenant" and self.is_idle() and AdmissionLimiters.get((self.scope, self.key)) is self:
+            AdmissionLimiters.pop((self.scope, self.key))
+
+    def reject(self, reason: str) -> AdmissionRejected:
+        AdmissionRejections.inc(scope=self.scope, reason=reason)
+        Errors.inc(stage="admission")
+        return AdmissionRejected(self.scope, self.key, reason)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scope": self.scope,
+            "key": self.key,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue
+        }
+
+
+# Limiters by (scope, key), created on first use from AdmissionControlConfig
+AdmissionLimiters: Dict[Tuple[str, str], ConcurrencyLimiter] = {}
+
+
+def get_limiter(scope: str, key: str) -> ConcurrencyLimiter:
+    limiter = AdmissionLimiters.get((scope, key))
+    if limiter is None:
+        scope_config = AdmissionControlConfig.get(scope, {})
+        limits = {**scope_config.get("default", {}), **scope_config.get(key, {})}
+        limiter = AdmissionLimiters[(scope, key)] = ConcurrencyLimiter(
+            scope, key, limits.get("max_concurrent", 8), limits.get("max_queue", 0)
+        )
+    return limiter
+
+
+async def acquire_admission(scope: str, key: str) -> Optional[ConcurrencyLimiter]:
+    """Take a slot of a tenant, provider or server. Returns the limiter to release, None when disabled."""
+    if not AdmissionControlConfig.get("enabled", True):
+        return None
+    limiter = get_limiter(scope, key)
+    await limiter.acquire(AdmissionControlConfig.get("queue_timeout", 5.0))
+    return limiter
+
+
+def release_admission(limiter: Optional[ConcurrencyLimiter]):
+    if limiter is not None:
+        limiter.release()
+
+
+@asynccontextmanager
+async def admission(scope: str, key: str) -> AsyncIterator[None]:
+    """Hold a slot of a tenant, provider or server for the duration of the block"""
+    limiter = await acquire_admission(scope, key)
+    try:
+        yield
+    finally:
+        release_admission(limiter)
+
+
+def get_admission_stats() -> List[Dict[str, Any]]:
+    """Slots in use and waiters of the provider and server limiters, plus the tenant totals"""
+    stats = [limiter.stats() for (scope, _), limiter in AdmissionLimiters.items() if scope != "tenant"]
+    tenants = [limiter for (scope, _), limiter in AdmissionLimiters.items() if scope == "tenant"]
+    if tenants:
+        stats.append({
+            "scope": "tenant",
+            "key": "*",
+            "active": sum(limiter.active for limiter in tenants),
+            "waiting": sum(limiter.waiting for limiter in tenants),
+            "tenants": len(tenants)
+        })
+    return stats
@@ -3,6 +3,12 @@ ClientsConfig =[
     "MCP_CLIENT_OPENAI",
 	"MCP_CLIENT_GEMINI"
 ]
+# Every server entry may also set "replicas" (number of subprocesses started for it,
+# tool calls go to the replica with the fewest in-flight calls) and "startup_timeout".
+# An entry with a "url" (and optional "headers") connects to a server already running
+# with the Streamable HTTP transport instead of spawning "command", e.g.
+# {"server_name": "MCP-APPSIGNAL", "url": "http://127.0.0.1:8101/mcp"}. Its replicas are
+# sessions to the same endpoint.
 ServersConfig = [
 	{
 		"server_name": "MCP-APPSIGNAL",
@@ -53,3 +59,239 @@ ServersConfig = [
 		]
 	}
 ]
+
+# Pooled keep-alive HTTP clients used by the LLM processors (one per client).
+# "default" applies to every client, per-client entries override it.
+LlmHttpClientConfig = {
+	"default": {
+		"max_connections": 100,
+		"max_keepalive_connections": 20,
+		"keepalive_expiry": 30.0,
+		"timeout": 60.0,
+		"connect_timeout": 10.0
+	},
+	"MCP_CLIENT_AZURE_AI": {},
+	"MCP_CLIENT_OPENAI": {},
+	"MCP_CLIENT_GEMINI": {}
+}
+
+# MCP servers start concurrently, each bounded by "startup_timeout" seconds
+# (a "startup_timeout" key on a ServersConfig entry overrides it).
+# With "lazy" enabled a server is only spawned when a request first selects it.
+# A server that timed out or failed is started again by the next request selecting it, once
+# retry_backoff seconds have passed, doubled after every further failure up to max_retry_backoff.
+ServerStartupConfig = {
+	"startup_timeout": 60.0,
+	"lazy": False,
+	"retry_backoff": 5.0,
+	"max_retry_backoff": 300.0
+}
+
+# Sidecar mode: `python sidecar.py` owns the MCP server processes and serves them over a unix
+# socket, so several gateway workers share one set of servers. With "enabled" the gateway
+# connects to socket_path instead of spawning servers, and run.py serves with "workers"
+# processes. Messages (tool results included) are limited to max_message_size bytes. Workers
+# started before the sidecar retry every retry_interval seconds for up to connect_timeout, and
+# attach its servers on first use when it is still unreachable.
+SidecarConfig = {
+	"enabled": False,
+	"socket_path": "/tmp/mcp_gateway_sidecar.sock",
+	"connect_timeout": 10.0,
+	"retry_interval": 1.0,
+	"max_message_size": 64 * 1024 * 1024,
+	"workers": 1
+}
+
+# Tool calls returned in one LLM turn run concurrently, at most this many at a time
+ToolExecutionConfig = {
+	"max_concurrent_tool_calls": 4,
+	# Per-request limits, overridable with the same keys in client_details. Past the deadline
+	# in-flight LLM and tool calls are cancelled and the partial result is returned.
+	"request_timeout": 120.0,
+	"max_tool_rounds": 8
+}
+
+# Tool selection before the tool loop. In "hybrid" mode the local router ranks the
+# tools against the user input (BM25 over names, descriptions and parameters) and the
+# tool-selection LLM call is only made when it is not confident. "llm" always asks the LLM.
+ToolRouterConfig = {
+	"mode": "hybrid",
+	"local_router": "bm25",
+	"min_score": 1.0,
+	"min_confidence": 0.5,
+	"relative_score": 0.5,
+	"max_tools": 5
+}
+
+# Cache of parsed tool-selection LLM decisions, keyed on the normalized input,
+# the selected servers and the tool catalog version
+RouterCacheConfig = {
+	"enabled": True,
+	"max_size": 1024,
+	"ttl": 600.0
+}
+
+# Gateway-side cache of tool results. "read_only" maps cacheable tools to their TTL in
+# seconds, every other tool is treated as mutating: it is never cached and a call to it
+# drops the cached results of the same server and tenant.
+ToolResultCacheConfig = {
+	"enabled": True,
+	"max_size": 2048,
+	"servers": {
+		"MCP-APPSIGNAL": {
+			"read_only": {
+				"search_appsignal_errors": 60,
+				"get_appsignal_all_errors": 60,
+				"get_appsignal_all_incidents": 60,
+				"get_appsignal_incident_details": 60
+			}
+		},
+		"MCP-STOCKANALYZER": {
+			"read_only": {
+				"get_stock_details": 60,
+				"get_stock_news": 300,
+				"get_similar_stocks": 3600,
+				"get_stock_analysis": 300
+			}
+		},
+		"MCP-ANYTYPE": {
+			"read_only": {
+				"list_spaces": 300,
+				"get_space": 120,
+				"list_space_objects": 60,
+				"search_objects": 60,
+				"list_type_templates": 600
+			}
+		},
+		"MCP-PINGDOM": {
+			"read_only": {
+				"get_all_checks": 60,
+				"get_check_details": 60,
+				"get_check_results": 60,
+				"get_all_maintenance": 120,
+				"get_all_probes": 3600,
+				"get_summary_average": 120,
+				"get_summary_outage": 120,
+				"get_summary_performance": 120,
+				"get_summary_pagespeed": 120,
+				"get_all_transactions": 60,
+				"get_transaction_details": 60
+			}
+		},
+		"MCP-GOOGLECLASSROOM": {
+			"read_only": {
+				"list_classroom_courses": 300,
+				"get_classroom_course": 300,
+				"get_classroom_course_summary": 120,
+				"list_classroom_students": 120,
+				"list_classroom_teachers": 300,
+				"list_classroom_assignments": 120,
+				"get_classroom_assignment": 120,
+				"list_classroom_submissions": 60,
+				"get_classroom_submission": 60,
+				"list_classroom_announcements": 120,
+				"get_classroom_user_profile": 600,
+				"get_classroom_guardian_invitations": 120
+			}
+		}
+	}
+}
+
+# Token budget of the chat history resent on every LLM call of the tool loop. Over budget,
+# older tool results are elided to a short preview, the latest messages stay verbatim.
+HistoryBudgetConfig = {
+	"enabled": True,
+	"default_budget": 12000,
+	"models": {
+		"gpt-4o": 24000,
+		"gpt-4o-mini": 24000,
+		"gemini-2.0-flash": 48000,
+		"gemini-2.0-pro": 48000
+	},
+	"keep_last_messages": 4,
+	"preview_chars": 200
+}
+
+# Shaping of tool results before they are added to the chat history. The full result stays
+# in "executed_tool_calls", only the LLM view is sampled and capped.
+ToolResultShapingConfig = {
+	"enabled": True,
+	"max_result_tokens": 4000,
+	"array_head": 10,
+	"array_tail": 3,
+	# Arrays of identically-shaped objects are sent as {"columns": [...], "rows": [[...], ...]}
+	"tabular_arrays": True,
+	"tabular_min_rows": 3
+}
+
+# Context windows used to size max_tokens before every LLM call. Prompts that would
+# overflow the window are compacted and then trimmed before the request is sent.
+ContextWindowConfig = {
+	"default_context_window": 128000,
+	"models": {
+		"gpt-4o": 128000,
+		"gpt-4o-mini": 128000,
+		"gpt-4-turbo": 128000,
+		"gpt-35-turbo": 16385,
+		"gemini-2.0-flash": 1048576,
+		"gemini-2.0-pro": 2097152
+	},
+	"min_output_tokens": 256,
+	# Share of the window kept free for the estimation error
+	"safety_margin": 0.05
+}
+
+# SSE responses: a comment line is sent after every heartbeat_interval seconds without data,
+# and the producer waits once max_queue_size frames are pending for a slow reader.
+StreamConfig = {
+	"heartbeat_interval": 15.0,
+	"max_queue_size": 256
+}
+
+# Tracing of the request stages, off by default. Spans are written as OTLP JSON lines (the format
+# of the OpenTelemetry collector file exporter) by a background thread, and optionally posted to
+# an OTLP/HTTP endpoint. Every process writes its own "<service>-<pid>.jsonl" file in file_dir,
+# rotated at max_file_bytes with backup_count old files kept; spans beyond queue_size are dropped.
+# The trace context reaches the MCP servers in the _meta field of tools/call requests, and
+# the servers write their spans to the same directory.
+TracingConfig = {
+	"enabled": False,
+	"service_name": "mcp-gateway",
+	"file_dir": "traces",
+	"max_file_bytes": 50 * 1024 * 1024,
+	"backup_count": 3,
+	"queue_size": 10000,
+	"otlp_endpoint": None,
+	"max_batch_size": 64
+}
+
+# Gateway logs. Records are queued and written to stdout by a background thread, so the event
+# loop never waits on the console. Records beyond queue_size are dropped instead of blocking.
+# format is "json" (one object per line) or "text". Execution payloads are logged at DEBUG
+# level for a payload_sample_rate share of the requests, truncated to max_payload_chars.
+LoggingConfig = {
+	"level": "INFO",
+	"format": "json",
+	"queue_size": 10000,
+	"payload_sample_rate": 0.01,
+	"max_payload_chars": 2000
+}
+
+# Admission control. Every tenant (X-Tenant-ID header, or the hash of the request credentials),
+# LLM provider (selected_client) and MCP server (across its replicas) gets max_concurrent slots:
+# requests for a tenant, LLM calls for a provider, tool calls for a server. At most max_queue
+# more wait for a slot, for up to queue_timeout seconds. Anything beyond is rejected with a 503.
+# "default" applies to every key, entries named after a provider or server override it.
+AdmissionControlConfig = {
+	"enabled": True,
+	"queue_timeout": 5.0,
+	"tenant": {
+		"default": {"max_concurrent": 8, "max_queue": 16}
+	},
+	"provider": {
+		"default": {"max_concurrent": 32, "max_queue": 64}
+	},
+	"server": {
+		"default": {"max_concurrent": 8, "max_queue": 32}
+	}
+}
@@ -1,12 +1,25 @@
 import json
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 # Assuming these are your imported modules/classes for MCP clients and Azure LLM calls
-from src.llm.azureopenai import azure_openai_processor  # your async LLM call function
-from src.llm.openai import openai_processor  # your async LLM call function
+from src.llm.adapters import LlmAdapter, LlmAdapters
 from src.server_connection import MCPServers  # MCP clients dict or class with call_tool method
-from src.llm.gemini import gemini_processor 
+from src.client_and_server_config import ContextWindowConfig, ToolExecutionConfig
+from src.history_manager import compact_chat_history, get_history_tokens, trim_chat_history
+from src.tool_result_shaping import shape_tool_result
+from src.token_estimator import estimate_request_tokens, get_context_window, get_input_budget, get_model_name
+from src.json_codec import dumps, to_plain
+from src.metrics import Errors, LlmCallSeconds, LlmTokens, SerializationSeconds, ToolCallSeconds
+from src.tracing import SPAN_KIND_CLIENT, Span, get_trace_meta, start_span
+from src.tool_catalog import get_tool_catalog_version, is_catalog_tool
+from src.tool_result_cache import get_cached_tool_result, invalidate_tool_results, store_tool_result
+from src.tool_router import RouterDecision, RouterDecisionCache, get_router_cache_key, route_tools_locally
+from src.structured_logging import RequestId
+from src.admission_control import AdmissionRejected, admission
+
+logger = logging.getLogger(__name__)
 
 
 class ClientAndServerExecutionResponse:
@@ -20,21 +33,70 @@ class ClientAndServerExecutionResponse:
             "llm_responses_arr": [],
             "messages": [],
             "output_type": "text",
-            "executed_tool_calls": []
+            "executed_tool_calls": [],
+            "tool_router": None,
+            "history_tokens_saved": 0,
+            # Pre-flight estimates, to compare with the actual total_input_tokens
+            "estimated_input_tokens": 0,
+            "token_estimates": []
         }
         self.Error: Optional[str] = None
         self.Status: bool = False
 
 
+def get_request_limit(client_details: Dict[str, Any], key: str) -> Any:
+    """Limit of a request: the client_details value capped at the ToolExecutionConfig one"""
+    config_limit = ToolExecutionConfig.get(key)
+    value = client_details.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        # Missing or invalid (rejected by the validation), the configured limit applies
+        return config_limit
+    return value if config_limit is None else min(value, config_limit)
+
+
 async def client_and_server_execution(payload: Dict[str, Any], streaming_callback: Optional[Any] = None) -> ClientAndServerExecutionResponse:
-    try:
-        result = ClientAndServerExecutionResponse()
+    """Run a request within its deadline.
+
+    On timeout the engine task is cancelled, which cancels the in-flight LLM and tool
+    calls, and what was gathered so far is returned with the error.
+    """
+    result = ClientAndServerExecutionResponse()
+    request_timeout = get_request_limit(payload.get("client_details", {}), "request_timeout")
+    with start_span(
+        "mcp.request",
+        client=payload.get("selected_client"),
+        servers=",".join(payload.get("selected_servers", [])),
+        request_id=RequestId.get()
+    ) as span:
+        try:
+            result = await asyncio.wait_for(run_client_and_server_execution(payload, result, streaming_callback), timeout=request_timeout)
+        except asyncio.TimeoutError:
+            Errors.inc(stage="deadline")
+            result.Error = f"Request deadline of {request_timeout}s exceeded, returning partial result"
+            result.Status = False
+            logger.warning("Request deadline exceeded", extra={"fields": {"timeout": request_timeout}})
+
+        if span is not None:
+            span.set_attribute("llm_calls", result.Data["total_llm_calls"])
+            span.set_attribute("tool_calls", len(result.Data["executed_tool_calls"]))
+            if not result.Status:
+                span.set_error(str(result.Error))
+        return result
+
 
+async def run_client_and_server_execution(
+    payload: Dict[str, Any],
+    result: ClientAndServerExecutionResponse,
+    streaming_callback: Optional[Any] = None
+) -> ClientAndServerExecutionResponse:
+    try:
         selected_server_credentials = payload.get("selected_server_credentials")
         client_details = payload.get("client_details", {})
         selected_client = payload.get("selected_client", "")
         selected_servers = payload.get("selected_servers", [])
         selected_server = selected_servers[0] if selected_servers else ""
+        # Tool name -> owning server index built by validation from the tool catalog
+        tool_routes = payload.get("tool_routes") or {}
         # Prepare chat history
         input_content = client_details.get("input", "")
         if "chat_history" in client_details:
@@ -42,9 +104,18 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
         else:
             client_details["chat_history"] = [{"role": "user", "content": input_content}]
 
-        temp_tools = json.dumps(client_details.get("tools", []))
+        available_tools = list(client_details.get("tools", []))
         temp_prompt = client_details.get("prompt", "")
 
+        # Local tool routing against the precomputed index of the selected servers' catalog
+        catalog_version = get_tool_catalog_version(selected_servers)
+        local_decision = route_tools_locally(
+            input_content,
+            client_details.get("tools", []),
+            index_key=(tuple(selected_servers), catalog_version)
+        )
+        router_cache_key = get_router_cache_key(input_content, selected_servers, catalog_version, client_details["chat_history"][:-1])
+
         # Extract tool call details for prompt
         tool_call_details_arr = []
         for tool in client_details.get("tools", []):
@@ -54,7 +125,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
             })
 
         tools_getting_agent_prompt = f"""
-        You are an {selected_server} AI assistant that analyzes user requests and determines the require tool calls from available tools.
+        You are an {", ".join(selected_servers)} AI assistant that analyzes user requests and determines the require tool calls from available tools.
         Available tools: {json.dumps(tool_call_details_arr)}
         Analyze each request to determine if it matches available tool capabilities or needs clarification.
         Return TRUE for tool calls when the request clearly maps to available tools without checking the required parameters.
@@ -68,797 +139,285 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
         client_details["prompt"] = tools_getting_agent_prompt
         client_details["tools"] = []
 
-        if selected_client == "MCP_CLIENT_AZURE_AI":
-
-            # Initial LLM call
-            initial_llm_response = await azure_openai_processor(client_details)
-            if not initial_llm_response.Status:
-                result.Error = initial_llm_response.Error
-                result.Status = initial_llm_response.Status
-                return result
-            extracted_result = extract_data_from_response(initial_llm_response.Data.get("messages", [{}])[0] if initial_llm_response.Data else "")
-            
-            result.Data["total_llm_calls"] += 1
-            result.Data["total_tokens"] += initial_llm_response.Data.get("total_tokens", 0)
-            result.Data["total_input_tokens"] += initial_llm_response.Data.get("total_input_tokens", 0)
-            result.Data["total_output_tokens"] += initial_llm_response.Data.get("total_output_tokens", 0)
-            result.Data["final_llm_response"] = initial_llm_response.Data.get("final_llm_response")
-            result.Data["llm_responses_arr"].append(initial_llm_response.Data.get("final_llm_response"))
-
-            if streaming_callback and streaming_callback.get("is_stream"):
-                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                    "Data": "Optimized Token LLM call Successfully Completed",
-                    "Error": None,
-                    "Status": True,
-                    "StreamingStatus": "IN-PROGRESS",
-                    "Action": "NOTIFICATION"
-                }))
-            
-            if extracted_result["isFunctionCall"]:
-                final_tool_calls = []
-                selected_tools = extracted_result["selectedTools"]
-                parsed_tools = json.loads(temp_tools)
-
-                for tool_name in selected_tools:
-                    matching_tool = next((t for t in parsed_tools if t.get("function", {}).get("name") == tool_name), None)
-                    if matching_tool:
-                        final_tool_calls.append(matching_tool)
-
-                client_details["prompt"] = temp_prompt
-                client_details["tools"] = final_tool_calls
-                
-
-                # Loop to handle multiple LLM calls and tool executions
-                while True:
-                    response = await azure_openai_processor(client_details)
-                    if not response.Status:
-                        result.Error = response.Error
-                        result.Status = response.Status
-                        return result
-
-                    result.Data["total_llm_calls"] += 1
-                    result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
-                    result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
-                    result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                    result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                    result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
-
-                    if response.Data.get("output_type") == "text":
-                        result.Data["messages"].extend(response.Data.get("messages", []))
-                        result.Data["output_type"] = response.Data.get("output_type", "")
-                        result.Error = response.Error
-                        result.Status = response.Status
-
-                        for message in response.Data.get("messages", []):
-                            if streaming_callback and streaming_callback.get("is_stream"):
-                                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                    "Data": message,
-                                    "Error": None,
-                                    "Status": True,
-                                    "StreamingStatus": "IN-PROGRESS",
-                                    "Action": "MESSAGE"
-                                }))
-                        return result
-
-                    if streaming_callback and streaming_callback.get("is_stream"):
-                        await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                            "Data": "Tool Calls Started",
-                            "Error": None,
-                            "Status": True,
-                            "StreamingStatus": "IN-PROGRESS",
-                            "Action": "NOTIFICATION"
-                        }))
-
-                    for tool in response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("tool_calls", []):
-                        
-                        tool_name = tool.get("function", {}).get("name")
-                        args = json.loads(tool.get("function", {}).get("arguments", "{}"))
-
-
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": f"{selected_server} MCP server {tool_name} call initiated",
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "NOTIFICATION"
-                            }))
-
-                        tool_call_result = await call_and_execute_tool(selected_server, selected_server_credentials, tool_name, args)
-
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": f"{selected_server} MCP server {tool_name} call result  : {json.dumps(tool_call_result)}",
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "NOTIFICATION"
-                            }))
-
-                        result.Data["executed_tool_calls"].append({
-                            "id": tool.get("id"),
-                            "name": tool_name,
-                            "arguments": args,
-                            "result": tool_call_result,
-                        })
-
-                        tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                        client_details["chat_history"].append({
-                            "role": "assistant",
-                            "content": tool_call_content_data,
-                        })
-
-            else:
-                # No function call, normal response case
-                client_details["prompt"] = f"{temp_prompt}. Available tools: {json.dumps(tool_call_details_arr)}"
-                client_details["tools"] = []
-
-                normal_response = await azure_openai_processor(client_details)
-                result.Data["total_llm_calls"] += 1
-                result.Data["total_tokens"] += normal_response.Data.get("total_tokens", 0)
-                result.Data["total_input_tokens"] += normal_response.Data.get("total_input_tokens", 0)
-                result.Data["total_output_tokens"] += normal_response.Data.get("total_output_tokens", 0)
-                result.Data["final_llm_response"] = normal_response.Data.get("final_llm_response")
-                result.Data["llm_responses_arr"].append(normal_response.Data.get("final_llm_response"))
-
-                result.Data["output_type"] = normal_response.Data.get("output_type", "")
-                result.Error = normal_response.Error
-                result.Status = normal_response.Status
-
-                content = normal_response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("content")
-                if not normal_response.Status or (content is not None and content != ""):
-                    result.Data["messages"] = normal_response.Data.get("messages", [])
-                    for message in normal_response.Data.get("messages", []):
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": message,
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "MESSAGE"
-                            }))
-                    return result
-
-                if len(normal_response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("tool_calls", [])) > 0:
-                    # Repeat the tool calling loop as in the TS code
-                    final_tool_calls = []
-                    selected_tools = extracted_result["selectedTools"]
-                    parsed_tools = json.loads(temp_tools)
-                    for tool_name in selected_tools:
-                        matching_tool = next((t for t in parsed_tools if t.get("function", {}).get("name") == tool_name), None)
-                        if matching_tool:
-                            final_tool_calls.append(matching_tool)
-
-                    client_details["prompt"] = temp_prompt
-                    client_details["tools"] = final_tool_calls
-
-                    while True:
-                        response = await azure_openai_processor(client_details)
-                        if not response.Status:
-                            result.Error = response.Error
-                            result.Status = response.Status
-                            return result
-
-                        result.Data["total_llm_calls"] += 1
-                        result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
-                        result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
-                        result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                        result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                        result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
-
-                        if response.Data.get("output_type") == "text":
-                            result.Data["messages"].extend(response.Data.get("messages", []))
-                            result.Data["output_type"] = response.Data.get("output_type", "")
-                            result.Error = response.Error
-                            result.Status = response.Status
-
-                            for message in response.Data.get("messages", []):
-                                if streaming_callback and streaming_callback.get("is_stream"):
-                                    await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                        "Data": message,
-                                        "Error": None,
-                                        "Status": True,
-                                        "StreamingStatus": "IN-PROGRESS",
-                                        "Action": "MESSAGE"
-                                    }))
-                            return result
-
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": "Tool Calls Started",
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "NOTIFICATION"
-                            }))
-
-                        for tool in response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("tool_calls", []):
-                            tool_name = tool.get("function", {}).get("name")
-                            args = json.loads(tool.get("function", {}).get("arguments", "{}"))
-
-                            if streaming_callback and streaming_callback.get("is_stream"):
-                                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                    "Data": f"{selected_server} MCP server {tool_name} call initiated",
-                                    "Error": None,
-                                    "Status": True,
-                                    "StreamingStatus": "IN-PROGRESS",
-                                    "Action": "NOTIFICATION"
-                                }))
-
-                            tool_call_result = await call_and_execute_tool(selected_server, selected_server_credentials, tool_name, args)
-
-                            if streaming_callback and streaming_callback.get("is_stream"):
-                                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                    "Data": f"{selected_server} MCP server {tool_name} call result  : {json.dumps(tool_call_result)}",
-                                    "Error": None,
-                                    "Status": True,
-                                    "StreamingStatus": "IN-PROGRESS",
-                                    "Action": "NOTIFICATION"
-                                }))
-
-                            result.Data["executed_tool_calls"].append({
-                                "id": tool.get("id"),
-                                "name": tool_name,
-                                "arguments": args,
-                                "result": tool_call_result,
-                            })
-
-                            tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                            client_details["chat_history"].append({
-                                "role": "assistant",
-                                "content": tool_call_content_data,
-                            })
-        
-        elif selected_client == "MCP_CLIENT_OPENAI":
-
-            # Initial LLM call
-            initial_llm_response = await openai_processor(client_details)
-            if not initial_llm_response.Status:
-                result.Error = initial_llm_response.Error
-                result.Status = initial_llm_response.Status
-                return result
-            extracted_result = extract_data_from_response(initial_llm_response.Data.get("messages", [{}])[0] if initial_llm_response.Data else "")
-            
-            result.Data["total_llm_calls"] += 1
-            result.Data["total_tokens"] += initial_llm_response.Data.get("total_tokens", 0)
-            result.Data["total_input_tokens"] += initial_llm_response.Data.get("total_input_tokens", 0)
-            result.Data["total_output_tokens"] += initial_llm_response.Data.get("total_output_tokens", 0)
-            result.Data["final_llm_response"] = initial_llm_response.Data.get("final_llm_response")
-            result.Data["llm_responses_arr"].append(initial_llm_response.Data.get("final_llm_response"))
-
-            if streaming_callback and streaming_callback.get("is_stream"):
-                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                    "Data": "Optimized Token LLM call Successfully Completed",
-                    "Error": None,
-                    "Status": True,
-                    "StreamingStatus": "IN-PROGRESS",
-                    "Action": "NOTIFICATION"
-                }))
-            
-            if extracted_result["isFunctionCall"]:
-                final_tool_calls = []
-                selected_tools = extracted_result["selectedTools"]
-                parsed_tools = json.loads(temp_tools)
-
-                for tool_name in selected_tools:
-                    matching_tool = next((t for t in parsed_tools if t.get("function", {}).get("name") == tool_name), None)
-                    if matching_tool:
-                        final_tool_calls.append(matching_tool)
-
-                client_details["prompt"] = temp_prompt
-                client_details["tools"] = final_tool_calls
-                
-
-                # Loop to handle multiple LLM calls and tool executions
-                while True:
-                    response = await openai_processor(client_details)
-                    if not response.Status:
-                        result.Error = response.Error
-                        result.Status = response.Status
-                        return result
-
-                    result.Data["total_llm_calls"] += 1
-                    result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
-                    result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
-                    result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                    result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                    result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
-
-                    if response.Data.get("output_type") == "text":
-                        result.Data["messages"].extend(response.Data.get("messages", []))
-                        result.Data["output_type"] = response.Data.get("output_type", "")
-                        result.Error = response.Error
-                        result.Status = response.Status
-
-                        for message in response.Data.get("messages", []):
-                            if streaming_callback and streaming_callback.get("is_stream"):
-                                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                    "Data": message,
-                                    "Error": None,
-                                    "Status": True,
-                                    "StreamingStatus": "IN-PROGRESS",
-                                    "Action": "MESSAGE"
-                                }))
-                        return result
-
-                    if streaming_callback and streaming_callback.get("is_stream"):
-                        await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                            "Data": "Tool Calls Started",
-                            "Error": None,
-                            "Status": True,
-                            "StreamingStatus": "IN-PROGRESS",
-                            "Action": "NOTIFICATION"
-                        }))
-
-                    for tool in response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("tool_calls", []):
-                        
-                        tool_name = tool.get("function", {}).get("name")
-                        args = json.loads(tool.get("function", {}).get("arguments", "{}"))
-
-
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": f"{selected_server} MCP server {tool_name} call initiated",
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "NOTIFICATION"
-                            }))
-
-                        tool_call_result = await call_and_execute_tool(selected_server, selected_server_credentials, tool_name, args)
-
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": f"{selected_server} MCP server {tool_name} call result  : {json.dumps(tool_call_result)}",
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "NOTIFICATION"
-                            }))
-
-                        result.Data["executed_tool_calls"].append({
-                            "id": tool.get("id"),
-                            "name": tool_name,
-                            "arguments": args,
-                            "result": tool_call_result,
-                        })
-
-                        tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                        client_details["chat_history"].append({
-                            "role": "assistant",
-                            "content": tool_call_content_data,
-                        })
+        adapter = LlmAdapters.get(selected_client)
+        if adapter is None:
+            result.Error = f"Unsupported client {selected_client}"
+            result.Status = False
+            return result
+
+        # Tool selection, answered by the local router when confident and by the LLM otherwise
+        with start_span("tool_router") as span:
+            extracted_result = await run_tool_router(adapter, client_details, result, streaming_callback, local_decision, router_cache_key)
+            if span is not None and result.Data["tool_router"]:
+                span.set_attribute("source", result.Data["tool_router"]["source"])
+                span.set_attribute("selected_tools", ",".join(result.Data["tool_router"]["selected_tools"]))
+        if extracted_result is None:
+            return result
+
+        final_tool_calls = []
+        for tool_name in extracted_result["selectedTools"]:
+            matching_tool = next((t for t in available_tools if t.get("function", {}).get("name") == tool_name), None)
+            if matching_tool:
+                final_tool_calls.append(matching_tool)
+
+        if extracted_result["isFunctionCall"]:
+            client_details["prompt"] = temp_prompt
+            client_details["tools"] = final_tool_calls
+            return await run_tool_loop(adapter, selected_server, selected_server_credentials, client_details, result, streaming_callback, tool_routes)
+
+        # No function call, normal response case
+        client_details["prompt"] = f"{temp_prompt}. Available tools: {json.dumps(tool_call_details_arr)}"
+        client_details["tools"] = []
 
-            else:
-                # No function call, normal response case
-                client_details["prompt"] = f"{temp_prompt}. Available tools: {json.dumps(tool_call_details_arr)}"
-                client_details["tools"] = []
-
-                normal_response = await openai_processor(client_details)
-                result.Data["total_llm_calls"] += 1
-                result.Data["total_tokens"] += normal_response.Data.get("total_tokens", 0)
-                result.Data["total_input_tokens"] += normal_response.Data.get("total_input_tokens", 0)
-                result.Data["total_output_tokens"] += normal_response.Data.get("total_output_tokens", 0)
-                result.Data["final_llm_response"] = normal_response.Data.get("final_llm_response")
-                result.Data["llm_responses_arr"].append(normal_response.Data.get("final_llm_response"))
-
-                result.Data["output_type"] = normal_response.Data.get("output_type", "")
-                result.Error = normal_response.Error
-                result.Status = normal_response.Status
-
-                content = normal_response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("content")
-                if not normal_response.Status or (content is not None and content != ""):
-                    result.Data["messages"] = normal_response.Data.get("messages", [])
-                    for message in normal_response.Data.get("messages", []):
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": message,
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "MESSAGE"
-                            }))
-                    return result
-
-                if len(normal_response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("tool_calls", [])) > 0:
-                    # Repeat the tool calling loop as in the TS code
-                    final_tool_calls = []
-                    selected_tools = extracted_result["selectedTools"]
-                    parsed_tools = json.loads(temp_tools)
-                    for tool_name in selected_tools:
-                        matching_tool = next((t for t in parsed_tools if t.get("function", {}).get("name") == tool_name), None)
-                        if matching_tool:
-                            final_tool_calls.append(matching_tool)
-
-                    client_details["prompt"] = temp_prompt
-                    client_details["tools"] = final_tool_calls
-
-                    while True:
-                        response = await openai_processor(client_details)
-                        if not response.Status:
-                            result.Error = response.Error
-                            result.Status = response.Status
-                            return result
-
-                        result.Data["total_llm_calls"] += 1
-                        result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
-                        result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
-                        result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                        result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                        result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
-
-                        if response.Data.get("output_type") == "text":
-                            result.Data["messages"].extend(response.Data.get("messages", []))
-                            result.Data["output_type"] = response.Data.get("output_type", "")
-                            result.Error = response.Error
-                            result.Status = response.Status
-
-                            for message in response.Data.get("messages", []):
-                                if streaming_callback and streaming_callback.get("is_stream"):
-                                    await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                        "Data": message,
-                                        "Error": None,
-                                        "Status": True,
-                                        "StreamingStatus": "IN-PROGRESS",
-                                        "Action": "MESSAGE"
-                                    }))
-                            return result
-
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": "Tool Calls Started",
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "NOTIFICATION"
-                            }))
-
-                        for tool in response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("tool_calls", []):
-                            tool_name = tool.get("function", {}).get("name")
-                            args = json.loads(tool.get("function", {}).get("arguments", "{}"))
-
-                            if streaming_callback and streaming_callback.get("is_stream"):
-                                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                    "Data": f"{selected_server} MCP server {tool_name} call initiated",
-                                    "Error": None,
-                                    "Status": True,
-                                    "StreamingStatus": "IN-PROGRESS",
-                                    "Action": "NOTIFICATION"
-                                }))
-
-                            tool_call_result = await call_and_execute_tool(selected_server, selected_server_credentials, tool_name, args)
-
-                            if streaming_callback and streaming_callback.get("is_stream"):
-                                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                    "Data": f"{selected_server} MCP server {tool_name} call result  : {json.dumps(tool_call_result)}",
-                                    "Error": None,
-                                    "Status": True,
-                                    "StreamingStatus": "IN-PROGRESS",
-                                    "Action": "NOTIFICATION"
-                                }))
-
-                            result.Data["executed_tool_calls"].append({
-                                "id": tool.get("id"),
-                                "name": tool_name,
-                                "arguments": args,
-                                "result": tool_call_result,
-                            })
-
-                            tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                            client_details["chat_history"].append({
-                                "role": "assistant",
-                                "content": tool_call_content_data,
-                            })
-        
-        elif selected_client == "MCP_CLIENT_GEMINI":
-
-            # Initial LLM call
-            initial_llm_response = await gemini_processor(client_details)
-            print("Initial LLM response:", initial_llm_response)
-            if not initial_llm_response.Status:
-                result.Error = initial_llm_response.Error
-                result.Status = initial_llm_response.Status
-                return result
-            extracted_result = extract_data_from_response(initial_llm_response.Data.get("messages", [{}])[0] if initial_llm_response.Data else "")
-            result.Data["total_llm_calls"] += 1
-            result.Data["total_tokens"] += initial_llm_response.Data.get("total_tokens", 0)
-            result.Data["total_input_tokens"] += initial_llm_response.Data.get("total_input_tokens", 0)
-            result.Data["total_output_tokens"] += initial_llm_response.Data.get("total_output_tokens", 0)
-            result.Data["final_llm_response"] = initial_llm_response.Data.get("final_llm_response")
-            result.Data["llm_responses_arr"].append(initial_llm_response.Data.get("final_llm_response"))
-
-            if streaming_callback and streaming_callback.get("is_stream"):
-                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                    "Data": "Optimized Token LLM call Successfully Completed",
-                    "Error": None,
-                    "Status": True,
-                    "StreamingStatus": "IN-PROGRESS",
-                    "Action": "NOTIFICATION"
-                }))
-            
-            if extracted_result["isFunctionCall"]:
-                final_tool_calls = []
-                selected_tools = extracted_result["selectedTools"]
-                parsed_tools = json.loads(temp_tools)
-
-                for tool_name in selected_tools:
-                    matching_tool = next((t for t in parsed_tools if t.get("function", {}).get("name") == tool_name), None)
-                    if matching_tool:
-                        final_tool_calls.append(matching_tool)
-
-                client_details["prompt"] = temp_prompt
-                client_details["tools"] = final_tool_calls
-
-                # Loop to handle multiple LLM calls and tool executions
-                count=1
-                while True:
-                    if count==3:
-                        result.Error = "Maximum LLM calls went into halucination"
-                        result.Status = response.Status
-                        return result
-                    
-                    if count != 1:
-                         client_details["tools"] = []
-                    
-                    response = await gemini_processor(client_details)
-                    print(response)
-                    if not response.Status:
-                        result.Error = response.Error
-                        result.Status = response.Status
-                        return result
-
-                    result.Data["total_llm_calls"] += 1
-                    result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
-                    result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
-                    result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                    result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                    result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
-
-                    if response.Data.get("output_type") == "text":
-                        result.Data["messages"].extend(response.Data.get("messages", []))
-                        result.Data["output_type"] = response.Data.get("output_type", "")
-                        result.Error = response.Error
-                        result.Status = response.Status
-
-                        for message in response.Data.get("messages", []):
-                            if streaming_callback and streaming_callback.get("is_stream"):
-                                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                    "Data": message,
-                                    "Error": None,
-                                    "Status": True,
-                                    "StreamingStatus": "IN-PROGRESS",
-                                    "Action": "MESSAGE"
-                                }))
-                        return result
-
-                    if streaming_callback and streaming_callback.get("is_stream"):
-                        await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                            "Data": "Tool Calls Started",
-                            "Error": None,
-                            "Status": True,
-                            "StreamingStatus": "IN-PROGRESS",
-                            "Action": "NOTIFICATION"
-                        }))
-
-                    final_llm_response = response.Data.get("final_llm_response") if response.Data else None
-                    candidates = final_llm_response.get("candidates", []) if final_llm_response else []
-                    first_candidate = candidates[0] if candidates and len(candidates) > 0 else {}
-                    content = first_candidate.get("content", {}) if isinstance(first_candidate, dict) else {}
-                    parts = content.get("parts", []) if isinstance(content, dict) else []
-                    
-                    for tool in parts:
-
-                        tool_name = tool.get("functionCall", {}).get("name")
-                        args_raw = tool.get("functionCall", {}).get("args", {})
-
-                        if isinstance(args_raw, str):
-                            try:
-                                 args = json.loads(args_raw)
-                            except json.JSONDecodeError as e:
-                                 args = {}
-                        else:
-                            args = args_raw
-
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": f"{selected_server} MCP server {tool_name} call initiated",
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "NOTIFICATION"
-                            }))
-                        tool_call_result = await call_and_execute_tool(selected_server, selected_server_credentials, tool_name, args)
-
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": f"{selected_server} MCP server {tool_name} call result  : {json.dumps(tool_call_result)}",
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "NOTIFICATION"
-                            }))
-
-
-                        result.Data["executed_tool_calls"].append({
-                            "id": tool.get("id"),
-                            "name": tool_name,
-                            "arguments": args,
-                            "result": tool_call_result,
-                        })
-
-                        tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                        client_details["chat_history"].append({
-                            "role": "model",
-                            "content": tool_call_content_data,
-                        })
-
-                    count+=1
-            else:
-                # No function call, normal response case
-                client_details["prompt"] = f"{temp_prompt}. Available tools: {json.dumps(tool_call_details_arr)}"
-                client_details["tools"] = []
-
-                normal_response = await gemini_processor(client_details)
-                result.Data["total_llm_calls"] += 1
-                result.Data["total_tokens"] += normal_response.Data.get("total_tokens", 0)
-                result.Data["total_input_tokens"] += normal_response.Data.get("total_input_tokens", 0)
-                result.Data["total_output_tokens"] += normal_response.Data.get("total_output_tokens", 0)
-                result.Data["final_llm_response"] = normal_response.Data.get("final_llm_response")
-                result.Data["llm_responses_arr"].append(normal_response.Data.get("final_llm_response"))
-
-                result.Data["output_type"] = normal_response.Data.get("output_type", "")
-                result.Error = normal_response.Error
-                result.Status = normal_response.Status
-
-                final_llm_response = normal_response.Data.get("final_llm_response") if normal_response.Data else None
-                candidates = final_llm_response.get("candidates", []) if final_llm_response else []
-                first_candidate = candidates[0] if candidates and len(candidates) > 0 else {}
-                content = first_candidate.get("content", {}) if isinstance(first_candidate, dict) else {}
-                parts = content.get("parts", []) if isinstance(content, dict) else []
-
-                text_content = content.get("text")
-
-                if not normal_response.Status or (text_content is not None and text_content != ""):
-                    result.Data["messages"] = normal_response.Data.get("messages", [])
-                    for message in normal_response.Data.get("messages", []):
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": message,
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "MESSAGE"
-                            }))
-                    return result
-
-                if len(parts) > 0:
-                    # Repeat the tool calling loop as in the TS code
-                    final_tool_calls = []
-                    selected_tools = extracted_result["selectedTools"]
-                    parsed_tools = json.loads(temp_tools)
-                    for tool_name in selected_tools:
-                        matching_tool = next((t for t in parsed_tools if t.get("function", {}).get("name") == tool_name), None)
-                        if matching_tool:
-                            final_tool_calls.append(matching_tool)
-
-                    client_details["prompt"] = temp_prompt
-                    client_details["tools"] = final_tool_calls
-
-                    count=1
-                    while True:
-                        if count==3:
-                            result.Error = "Maximum LLM calls went into halucination"
-                            result.Status = False
-                            return result
-                    
-                        if count != 1:
-                            client_details["tools"] = []
-
-                        response = await gemini_processor(client_details)
-                        if not response.Status:
-                            result.Error = response.Error
-                            result.Status = response.Status
-                            return result
-
-                        result.Data["total_llm_calls"] += 1
-                        result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
-                        result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
-                        result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                        result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                        result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
-
-                        if response.Data.get("output_type") == "text":
-                            result.Data["messages"].extend(response.Data.get("messages", []))
-                            result.Data["output_type"] = response.Data.get("output_type", "")
-                            result.Error = response.Error
-                            result.Status = response.Status
-
-                            for message in response.Data.get("messages", []):
-                                if streaming_callback and streaming_callback.get("is_stream"):
-                                    await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                        "Data": message,
-                                        "Error": None,
-                                        "Status": True,
-                                        "StreamingStatus": "IN-PROGRESS",
-                                        "Action": "MESSAGE"
-                                    }))
-                            return result
-
-                        if streaming_callback and streaming_callback.get("is_stream"):
-                            await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                "Data": "Tool Calls Started",
-                                "Error": None,
-                                "Status": True,
-                                "StreamingStatus": "IN-PROGRESS",
-                                "Action": "NOTIFICATION"
-                            }))
-
-                        final_llm_response = response.Data.get("final_llm_response") if response.Data else None
-                        candidates = final_llm_response.get("candidates", []) if final_llm_response else []
-                        first_candidate = candidates[0] if candidates and len(candidates) > 0 else {}
-                        content = first_candidate.get("content", {}) if isinstance(first_candidate, dict) else {}
-                        parts = content.get("parts", []) if isinstance(content, dict) else []
-
-                        for tool in parts:
-
-                            tool_name = tool.get("functionCall", {}).get("name")
-                            args_raw = tool.get("functionCall", {}).get("args", {})
-
-                            if isinstance(args_raw, str):
-                                try:
-                                    args = json.loads(args_raw)
-                                except json.JSONDecodeError as e:
-                                    args = {}
-                            else:
-                                args = args_raw
-
-                            if streaming_callback and streaming_callback.get("is_stream"):
-                                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                    "Data": f"{selected_server} MCP server {tool_name} call initiated",
-                                    "Error": None,
-                                    "Status": True,
-                                    "StreamingStatus": "IN-PROGRESS",
-                                    "Action": "NOTIFICATION"
-                                }))
-
-                            tool_call_result = await call_and_execute_tool(selected_server, selected_server_credentials, tool_name, args)
-
-                            if streaming_callback and streaming_callback.get("is_stream"):
-                                await streaming_callback["streamCallbacks"].on_data(json.dumps({
-                                    "Data": f"{selected_server} MCP server {tool_name} call result  : {json.dumps(tool_call_result)}",
-                                    "Error": None,
-                                    "Status": True,
-                                    "StreamingStatus": "IN-PROGRESS",
-                                    "Action": "NOTIFICATION"
-                                }))
-
-
-                            result.Data["executed_tool_calls"].append({
-                                "id": tool.get("id"),
-                                "name": tool_name,
-                                "arguments": args,
-                                "result": tool_call_result,
-                            })
-
-                            tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                            client_details["chat_history"].append({
-                                "role": "model",
-                                "content": tool_call_content_data,
-                            })
-
-                        count+=1    
+        normal_response = await call_llm(adapter, client_details, result, "fallback", on_delta=get_stream_delta_handler(streaming_callback))
+        if not normal_response.Status:
+            result.Error = normal_response.Error
+            result.Status = normal_response.Status
+            return result
+
+        record_llm_response(result, normal_response)
+        result.Data["output_type"] = normal_response.Data.get("output_type", "")
+        result.Error = normal_response.Error
+        result.Status = normal_response.Status
+
+        final_llm_response = normal_response.Data.get("final_llm_response")
+        content = adapter.get_text_content(final_llm_response)
+        if content is not None and content != "":
+            result.Data["messages"] = normal_response.Data.get("messages", [])
+            await send_stream_messages(streaming_callback, normal_response)
+            return result
+
+        if adapter.get_tool_calls(final_llm_response):
+            # Repeat the tool calling loop as in the TS code
+            client_details["prompt"] = temp_prompt
+            client_details["tools"] = final_tool_calls
+            return await run_tool_loop(adapter, selected_server, selected_server_credentials, client_details, result, streaming_callback, tool_routes)
 
         result.Status = True
         return result
 
+    except AdmissionRejected:
+        # Shed by admission control, answered with a 503 by the caller
+        raise
     except Exception as e:
-        logging.error(f"Exception in client_and_server_execution: {e}")
+        Errors.inc(stage="execution")
+        logger.exception(f"Exception in client_and_server_execution: {e}")
         res = ClientAndServerExecutionResponse()
         res.Error = str(e)
         res.Status = False
         return res
 
 
+def record_llm_response(result: ClientAndServerExecutionResponse, response: Any):
+    """Add the usage of one LLM call to the totals and keep its raw response"""
+    result.Data["total_llm_calls"] += 1
+    result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
+    result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
+    result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
+    result.Data["final_llm_response"] = response.Data.get("final_llm_response")
+    result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
+
+
+async def send_stream_event(streaming_callback: Optional[Any], data: Any, action: str = "NOTIFICATION"):
+    """Send an IN-PROGRESS frame to the stream, if the request is streamed"""
+    if streaming_callback and streaming_callback.get("is_stream"):
+        with SerializationSeconds.time(stage="sse_frame"):
+            frame = dumps({
+                "Data": data,
+                "Error": None,
+                "Status": True,
+                "StreamingStatus": "IN-PROGRESS",
+                "Action": action
+            })
+        await streaming_callback["streamCallbacks"].on_data(frame)
+
+
+async def send_stream_messages(streaming_callback: Optional[Any], response: Any):
+    """Send the messages of a final LLM response, unless they were already streamed as deltas"""
+    if response.Data.get("streamed"):
+        return
+    for message in response.Data.get("messages", []):
+        await send_stream_event(streaming_callback, message, action="MESSAGE")
+
+
+async def run_tool_loop(
+    adapter: LlmAdapter,
+    selected_server: str,
+    selected_server_credentials: Any,
+    client_details: Dict[str, Any],
+    result: ClientAndServerExecutionResponse,
+    streaming_callback: Optional[Any] = None,
+    tool_routes: Optional[Dict[str, Dict[str, str]]] = None
+) -> ClientAndServerExecutionResponse:
+    """Call the LLM and execute the tool calls it asks for until it answers with text"""
+    stream_delta_handler = get_stream_delta_handler(streaming_callback)
+    max_tool_rounds = get_request_limit(client_details, "max_tool_rounds")
+    loop_calls = 0
+    while True:
+        if adapter.max_tool_loop_calls is not None and loop_calls >= adapter.max_tool_loop_calls:
+            result.Error = "Maximum LLM calls went into halucination"
+            result.Status = False
+            return result
+
+        if max_tool_rounds is not None and loop_calls >= max_tool_rounds:
+            result.Error = f"Stopped after {max_tool_rounds} tool rounds without a final answer"
+            result.Status = False
+            return result
+
+        if loop_calls > 0 and not adapter.keep_tools_after_first_call:
+            client_details["tools"] = []
+
+        response = await call_llm(adapter, client_details, result, "loop", on_delta=stream_delta_handler)
+        if not response.Status:
+            result.Error = response.Error
+            result.Status = response.Status
+            return result
+
+        record_llm_response(result, response)
+        loop_calls += 1
+
+        if response.Data.get("output_type") == "text":
+            result.Data["messages"].extend(response.Data.get("messages", []))
+            result.Data["output_type"] = response.Data.get("output_type", "")
+            result.Error = response.Error
+            result.Status = response.Status
+            await send_stream_messages(streaming_callback, response)
+            return result
+
+        await send_stream_event(streaming_callback, "Tool Calls Started")
+
+        tool_calls = adapter.get_tool_calls(response.Data.get("final_llm_response"))
+        await execute_tool_calls(
+            selected_server,
+            selected_server_credentials,
+            tool_calls,
+            client_details,
+            result,
+            streaming_callback,
+            history_role=adapter.history_role,
+            tool_routes=tool_routes
+        )
+
+
+async def call_llm(
+    adapter: LlmAdapter,
+    client_details: Dict[str, Any],
+    result: ClientAndServerExecutionResponse,
+    stage: str,
+    on_delta: Optional[Callable[[str], Awaitable[None]]] = None
+) -> Any:
+    """Size and send one LLM call of the given stage (router, loop or fallback), recording its metrics"""
+    with start_span("llm.prepare", stage=stage):
+        prepare_llm_call(client_details, result)
+    with start_span(f"llm.{stage}", kind=SPAN_KIND_CLIENT, client=adapter.name, model=get_model_name(client_details)) as span:
+        # Time spent waiting for a provider slot is not counted as LLM call time
+        async with admission("provider", adapter.name):
+            with LlmCallSeconds.time(client=adapter.name, stage=stage):
+                response = await adapter.processor(client_details, on_delta=on_delta)
+        if span is not None:
+            span.set_attribute("estimated_input_tokens", result.Data["token_estimates"][-1]["estimated_input_tokens"])
+            if response.Status:
+                span.set_attribute("input_tokens", response.Data.get("total_input_tokens", 0))
+                span.set_attribute("output_tokens", response.Data.get("total_output_tokens", 0))
+            else:
+                span.set_error(str(response.Error))
+
+    if not response.Status:
+        Errors.inc(stage="llm")
+        return response
+    LlmTokens.inc(response.Data.get("total_input_tokens", 0), client=adapter.name, type="input")
+    LlmTokens.inc(response.Data.get("total_output_tokens", 0), client=adapter.name, type="output")
+    return response
+
+
+def prepare_llm_call(client_details: Dict[str, Any], result: ClientAndServerExecutionResponse):
+    """Fit the next LLM call in the model context window and size its max_tokens.
+
+    The history is compacted to its budget first; if the estimated prompt would still
+    overflow the window it is compacted harder and then trimmed. max_tokens is the
+    requested value capped to what is left of the window, or to min_output_tokens when
+    less is left.
+    """
+    model = get_model_name(client_details)
+    requested_max_tokens = client_details.setdefault("requested_max_tokens", client_details.get("max_tokens", 1000))
+
+    result.Data["history_tokens_saved"] += compact_chat_history(client_details)
+    estimated_input_tokens = estimate_request_tokens(client_details)
+
+    input_budget = get_input_budget(model)
+    if estimated_input_tokens > input_budget:
+        history_budget = input_budget - (estimated_input_tokens - get_history_tokens(client_details))
+        # Only the latest user input is protected from elision when the window would overflow
+        result.Data["history_tokens_saved"] += compact_chat_history(client_details, budget=history_budget, keep_last=0)
+        result.Data["history_tokens_saved"] += trim_chat_history(client_details, budget=history_budget)
+        estimated_input_tokens = estimate_request_tokens(client_details)
+
+    context_window = get_context_window(model)
+    available_tokens = context_window - estimated_input_tokens - int(context_window * ContextWindowConfig.get("safety_margin", 0.05))
+    # The floor keeps a nearly full window answerable, a smaller requested value is kept as is
+    client_details["max_tokens"] = min(requested_max_tokens, max(available_tokens, ContextWindowConfig.get("min_output_tokens", 256)))
+
+    result.Data["estimated_input_tokens"] += estimated_input_tokens
+    result.Data["token_estimates"].append({
+        "estimated_input_tokens": estimated_input_tokens,
+        "max_tokens": client_details["max_tokens"],
+        "context_window": context_window
+    })
+
+
+async def run_tool_router(
+    adapter: LlmAdapter,
+    client_details: Dict[str, Any],
+    result: ClientAndServerExecutionResponse,
+    streaming_callback: Optional[Any] = None,
+    local_decision: Optional[RouterDecision] = None,
+    router_cache_key: Optional[Any] = None
+) -> Optional[Dict[str, Any]]:
+    """Decide which tools the request needs.
+
+    A confident local router decision or a cached decision for the same intent skips the
+    tool-selection LLM call. Returns the extract_data_from_response result, or None when
+    the LLM call failed (the error is set on result).
+    """
+    cached_decision = RouterDecisionCache.get(router_cache_key) if local_decision is None and router_cache_key is not None else None
+    if cached_decision is not None:
+        local_decision = RouterDecision(
+            is_function_call=cached_decision["isFunctionCall"],
+            selected_tools=list(cached_decision["selectedTools"]),
+            source="cache"
+        )
+
+    if local_decision is not None:
+        result.Data["tool_router"] = {
+            "source": local_decision.source,
+            "confidence": local_decision.confidence,
+            "selected_tools": local_decision.selected_tools
+        }
+        await send_stream_event(streaming_callback, "Local Tool Routing Successfully Completed")
+        return local_decision.to_extracted_result()
+
+    # Initial LLM call
+    initial_llm_response = await call_llm(adapter, client_details, result, "router")
+    if not initial_llm_response.Status:
+        result.Error = initial_llm_response.Error
+        result.Status = initial_llm_response.Status
+        return None
+    extracted_result = extract_data_from_response(initial_llm_response.Data.get("messages", [{}])[0] if initial_llm_response.Data else "")
+
+    record_llm_response(result, initial_llm_response)
+    result.Data["tool_router"] = {
+        "source": "llm",
+        "confidence": None,
+        "selected_tools": extracted_result["selectedTools"]
+    }
+    if router_cache_key is not None:
+        RouterDecisionCache.set(router_cache_key, extracted_result)
+
+    await send_stream_event(streaming_callback, "Optimized Token LLM call Successfully Completed")
+
+    return extracted_result
+
+
 def extract_data_from_response(message: Any) -> Dict[str, Any]:
 
     """Parse message content for function call info and selected tools."""
@@ -886,6 +445,85 @@ def extract_data_from_response(message: Any) -> Dict[str, Any]:
     }
 
 
+def get_stream_delta_handler(streaming_callback: Optional[Any] = None) -> Optional[Callable[[str], Awaitable[None]]]:
+    """Return a callback forwarding LLM text deltas as MESSAGE frames, or None when not streaming."""
+    if not streaming_callback or not streaming_callback.get("is_stream"):
+        return None
+
+    stream_callbacks = streaming_callback["streamCallbacks"]
+
+    async def on_delta(delta: str):
+        await stream_callbacks.on_data(dumps({
+            "Data": delta,
+            "Error": None,
+            "Status": True,
+            "StreamingStatus": "IN-PROGRESS",
+            "Action": "MESSAGE"
+        }))
+
+    return on_delta
+
+
+async def execute_tool_calls(
+    selected_server: str,
+    selected_server_credentials: Any,
+    tool_calls: List[Dict[str, Any]],
+    client_details: Dict[str, Any],
+    result: ClientAndServerExecutionResponse,
+    streaming_callback: Optional[Any] = None,
+    history_role: str = "assistant",
+    tool_routes: Optional[Dict[str, Dict[str, str]]] = None
+):
+    """Run the tool calls of one LLM turn concurrently and record their results in the original order.
+
+    Every call is routed to the server owning the tool according to `tool_routes`,
+    falling back to `selected_server` for tools missing from the index.
+    """
+    semaphore = asyncio.Semaphore(max(1, ToolExecutionConfig.get("max_concurrent_tool_calls", 4)))
+
+    async def run_tool_call(tool_call: Dict[str, Any]) -> Tuple[Any, str]:
+        async with semaphore:
+            tool_name = tool_call["name"]
+            route = (tool_routes or {}).get(tool_name, {"server_name": selected_server, "tool_name": tool_name})
+            server_name = route["server_name"]
+
+            await send_stream_event(streaming_callback, f"{server_name} MCP server {tool_name} call initiated")
+
+            tool_call_result = await call_and_execute_tool(server_name, selected_server_credentials, route["tool_name"], tool_call["arguments"])
+
+            # Encoded once, for the stream and for the chat history
+            with SerializationSeconds.time(stage="tool_result_encode"):
+                tool_call_text = dumps(tool_call_result)
+            await send_stream_event(streaming_callback, f"{server_name} MCP server {tool_name} call result  : {tool_call_text}")
+            return tool_call_result, tool_call_text
+
+    tasks = [asyncio.ensure_future(run_tool_call(tool_call)) for tool_call in tool_calls]
+    try:
+        tool_call_results = await asyncio.gather(*tasks)
+    except BaseException:
+        # e.g. a call shed by admission control, the other calls of the turn are not needed anymore
+        for task in tasks:
+            task.cancel()
+        raise
+
+    for tool_call, (tool_call_result, tool_call_text) in zip(tool_calls, tool_call_results):
+        # The caller gets the full result, the LLM only a sampled and capped view of it
+        tool_call_content, tokens_saved = shape_tool_result(tool_call_result, tool_call_text)
+        result.Data["executed_tool_calls"].append({
+            "id": tool_call["id"],
+            "name": tool_call["name"],
+            "arguments": tool_call["arguments"],
+            "result": tool_call_result,
+            "result_tokens_saved": tokens_saved,
+        })
+
+        tool_call_content_data = f"Executed tool: {tool_call['name']} and the result is: {tool_call_content}"
+        client_details["chat_history"].append({
+            "role": history_role,
+            "content": tool_call_content_data,
+        })
+
+
 async def call_and_execute_tool(
     selected_server: str,
     credentials: Any, 
@@ -938,25 +576,54 @@ async def call_and_execute_tool(
         case _:
             pass
 
+    with start_span("mcp.tools/call", kind=SPAN_KIND_CLIENT, server=selected_server, tool=tool_name) as span:
+        return await execute_tool_call(selected_server, tool_name, args, creds, span)
+
+
+async def execute_tool_call(selected_server: str, tool_name: str, args: Dict[str, Any], creds: Any, span: Optional[Span] = None) -> Any:
+    """Serve a tool call from the result cache or the server, keeping the cache consistent"""
+    # Read-only tools are served from the result cache while fresh
+    cache_key, cached_result = get_cached_tool_result(selected_server, tool_name, args, creds)
+    if span is not None:
+        span.set_attribute("cache_hit", cached_result is not None)
+    if cached_result is not None:
+        return cached_result
+
     client = MCPServers[selected_server]
+    is_call_failed = False
 
     try:
-        # perform the tool call
-        raw_result = await client.call_tool(tool_name, args)
+        # perform the tool call, the trace context is propagated in the request _meta
+        # Tool names come from the LLM, only the ones in the catalog are used as labels
+        tool_label = tool_name if is_catalog_tool(selected_server, tool_name) else "unknown"
+        async with admission("server", selected_server):
+            with ToolCallSeconds.time(server=selected_server, tool=tool_label):
+                raw_result = await client.call_tool(tool_name, args, meta=get_trace_meta())
         
-        # try to JSON-serialize it
+        # convert the MCP result objects to plain dicts and lists, once
         try:
-            # this will recurse into __dict__ for any object
-            serialized = json.loads(
-                json.dumps(raw_result, default=lambda o: getattr(o, "__dict__", str(o)))
-            )
-            tool_call_result = serialized
+            with SerializationSeconds.time(stage="tool_result"):
+                tool_call_result = to_plain(raw_result)
         except (TypeError, ValueError):
             # fallback to string
             tool_call_result = str(raw_result)
 
+    except AdmissionRejected:
+        raise
     except Exception as err:
         # catch any call-tool exception and stringify it
+        Errors.inc(stage="tool")
+        if span is not None:
+            span.set_error(str(err))
         tool_call_result = str(err)
+        is_call_failed = True
+
+    if cache_key is not None:
+        # Errors are not cached, whether the call raised or the payload reports the failure
+        if not is_call_failed:
+            store_tool_result(cache_key, tool_call_result)
+    else:
+        # Mutating tools drop the cached reads of the same server and tenant
+        invalidate_tool_results(selected_server, creds)
 
     return tool_call_result
\ No newline at end of file
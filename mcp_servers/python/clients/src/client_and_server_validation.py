@@ -1,7 +1,25 @@
+import logging
 from typing import Dict, Any, Callable, Optional
 
-from src.server_connection import MCPServers
+from src.server_connection import MCPServers, ensure_mcp_server
 from src.client_and_server_config import ServersConfig, ClientsConfig
+from src.tool_catalog import build_tool_routes, get_catalog_tools, refresh_tool_catalog
+
+logger = logging.getLogger(__name__)
+
+# Per-request limits a caller may lower in client_details, never raise or turn off
+REQUEST_LIMIT_KEYS = ("request_timeout", "max_tool_rounds")
+
+
+def get_invalid_request_limit(client_details: Dict[str, Any]) -> Optional[str]:
+    """Name of the first request limit of client_details that is not a positive number"""
+    for key in REQUEST_LIMIT_KEYS:
+        if key not in client_details:
+            continue
+        value = client_details[key]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not value > 0:
+            return key
+    return None
 
 
 async def client_and_server_validation(payload: Dict[str, Any], streaming_callback: Optional[Callable] = None):
@@ -12,7 +30,7 @@ async def client_and_server_validation(payload: Dict[str, Any], streaming_callba
         selected_servers = payload.get("selected_servers", [])
 
         if not selected_client or not selected_servers or not selected_server_credentials or not client_details:
-            print("Invalid Request Payload")
+            logger.warning("Invalid request payload")
             return {
                 "payload": None,
                 "error": "Invalid Request Payload",
@@ -20,8 +38,8 @@ async def client_and_server_validation(payload: Dict[str, Any], streaming_callba
             }
 
         for server in selected_servers:
-            if server not in MCPServers:
-                print("Invalid Server")
+            if not await ensure_mcp_server(server):
+                logger.warning("Invalid server", extra={"fields": {"server": server}})
                 return {
                     "payload": None,
                     "error": "Invalid Server",
@@ -29,33 +47,29 @@ async def client_and_server_validation(payload: Dict[str, Any], streaming_callba
                 }
 
         if selected_client not in ClientsConfig:
-            print("Invalid Client")
+            logger.warning("Invalid client", extra={"fields": {"client": selected_client}})
             return {
                 "payload": None,
                 "error": "Invalid Client",
                 "status": False
             }
 
-        tools_arr = []
+        invalid_limit = get_invalid_request_limit(client_details)
+        if invalid_limit is not None:
+            logger.warning("Invalid request limit", extra={"fields": {"limit": invalid_limit}})
+            return {
+                "payload": None,
+                "error": f"Invalid {invalid_limit}, expected a positive number",
+                "status": False
+            }
+
         for server in selected_servers:
-   
-            resource = await MCPServers[server].list_tools()
-            if resource:
-                for tool in resource.tools:
-                    tool_dict = {
-                        "type": "function",
-                        "function": {
-                            "name": tool.name,
-                            "description": getattr(tool, "description", f"Tool for {tool.name}"),
-                            "parameters": getattr(tool, "inputSchema", {
-                                "type": "object",
-                                "properties": {},
-                                "required": []
-                            })
-                        }
-                    }
-                    tools_arr.append(tool_dict)
+            # Tools are served from the in-memory catalog, fetched once per server version
+            if get_catalog_tools(server) is None:
+                await refresh_tool_catalog(server, MCPServers[server])
 
+        # Merged tools of all selected servers and the tool name -> owning server index
+        tools_arr, tool_routes = build_tool_routes(selected_servers)
         client_details["tools"] = tools_arr
 
 
@@ -64,14 +78,15 @@ async def client_and_server_validation(payload: Dict[str, Any], streaming_callba
                 "selected_client": selected_client,
                 "selected_servers": selected_servers,
                 "selected_server_credentials": selected_server_credentials,
-                "client_details": client_details
+                "client_details": client_details,
+                "tool_routes": tool_routes
             },
             "error": None,
             "status": True
         }
 
     except Exception as err:
-        print("Error initializing MCP ==========>>>>", err)
+        logger.exception(f"Error validating request: {err}")
         return {
             "payload": None,
             "error": str(err),
@@ -0,0 +1,106 @@
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from src.client_and_server_config import HistoryBudgetConfig
+from src.token_estimator import estimate_tokens, get_model_name
+
+# Tool results are added to the chat history as "Executed tool: <name> and the result is: <json>"
+_TOOL_RESULT_PATTERN = re.compile(r"^Executed tool: (?P<name>.*?) and the result is: ", re.DOTALL)
+_ELIDED_MARKER = "[earlier result elided"
+
+
+def get_history_budget(client_details: Dict[str, Any]) -> int:
+    """Token budget of prompt plus history for the model of a request"""
+    model = get_model_name(client_details)
+    return HistoryBudgetConfig.get("models", {}).get(model, HistoryBudgetConfig.get("default_budget", 12000))
+
+
+def elide_message(message: Dict[str, Any], preview_chars: int, model: str = "") -> int:
+    """Replace an older tool result by a short preview, returning the tokens saved"""
+    content = message.get("content") or ""
+    match = _TOOL_RESULT_PATTERN.match(content)
+    if not match or _ELIDED_MARKER in content:
+        return 0
+
+    result_text = content[match.end():]
+    if len(result_text) <= preview_chars:
+        return 0
+
+    elided_content = (
+        f"Executed tool: {match.group('name')} and the result is: "
+        f"{result_text[:preview_chars]}... {_ELIDED_MARKER}, {estimate_tokens(result_text, model)} tokens]"
+    )
+    saved = estimate_tokens(content, model) - estimate_tokens(elided_content, model)
+    message["content"] = elided_content
+    return max(saved, 0)
+
+
+def get_protected_indexes(chat_history: List[Dict[str, Any]], keep_last: Optional[int] = None) -> Set[int]:
+    """Indexes of the latest user input and the last messages, which are always kept verbatim"""
+    if keep_last is None:
+        keep_last = HistoryBudgetConfig.get("keep_last_messages", 4)
+    protected = set(range(max(len(chat_history) - keep_last, 0), len(chat_history)))
+    last_user_index = next((index for index in range(len(chat_history) - 1, -1, -1) if chat_history[index].get("role") == "user"), None)
+    if last_user_index is not None:
+        protected.add(last_user_index)
+    return protected
+
+
+def get_history_tokens(client_details: Dict[str, Any]) -> int:
+    model = get_model_name(client_details)
+    return estimate_tokens(client_details.get("prompt", ""), model) + sum(
+        estimate_tokens(message.get("content") or "", model) for message in client_details.get("chat_history") or []
+    )
+
+
+def compact_chat_history(client_details: Dict[str, Any], budget: Optional[int] = None, keep_last: Optional[int] = None) -> int:
+    """Keep the prompt plus chat history within a token budget, returning the tokens saved.
+
+    The budget defaults to the per-model history budget. The system prompt, the latest user
+    input and the last `keep_last` messages are never touched, older tool results are elided oldest
+    first until the history fits.
+    """
+    if budget is None:
+        if not HistoryBudgetConfig.get("enabled", True):
+            return 0
+        budget = get_history_budget(client_details)
+
+    total_tokens = get_history_tokens(client_details)
+    if total_tokens <= budget:
+        return 0
+
+    chat_history: List[Dict[str, Any]] = client_details.get("chat_history") or []
+    protected = get_protected_indexes(chat_history, keep_last)
+    model = get_model_name(client_details)
+    tokens_saved = 0
+    preview_chars = HistoryBudgetConfig.get("preview_chars", 200)
+    for index, message in enumerate(chat_history):
+        if total_tokens - tokens_saved <= budget:
+            break
+        if index in protected:
+            continue
+        tokens_saved += elide_message(message, preview_chars, model)
+
+    return tokens_saved
+
+
+def trim_chat_history(client_details: Dict[str, Any], budget: int) -> int:
+    """Drop the oldest unprotected messages until the history fits, returning the tokens saved.
+
+    Last resort once compaction is not enough to fit the context window.
+    """
+    chat_history: List[Dict[str, Any]] = client_details.get("chat_history") or []
+    model = get_model_name(client_details)
+    total_tokens = get_history_tokens(client_details)
+    protected = get_protected_indexes(chat_history)
+
+    kept_messages = []
+    tokens_saved = 0
+    for index, message in enumerate(chat_history):
+        if index not in protected and total_tokens - tokens_saved > budget:
+            tokens_saved += estimate_tokens(message.get("content") or "", model)
+            continue
+        kept_messages.append(message)
+
+    chat_history[:] = kept_messages
+    return tokens_saved
@@ -0,0 +1,40 @@
+import dataclasses
+from typing import Any
+
+# orjson is a required dependency of the gateway (requirements.txt), there is no slower fallback
+import orjson
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def to_plain(value: Any) -> Any:
+    """Convert MCP result objects (pydantic models) and other objects into dicts, lists and scalars.
+
+    Done once per tool result, so the result can be cached and encoded without a
+    `default` hook and without a dumps/loads round trip.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_plain(item) for item in value]
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return to_plain(dataclasses.asdict(value))
+    if isinstance(value, BaseException):
+        # e.g. the Error of a failed LLM call, its attributes would drop the message
+        return str(value)
+    if hasattr(value, "__dict__"):
+        return to_plain(vars(value))
+    return str(value)
+
+
+def dumps(value: Any) -> str:
+    """Encode to compact JSON, objects are converted with to_plain"""
+    return orjson.dumps(value, default=to_plain, option=_ORJSON_OPTIONS).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    return orjson.loads(data)
@@ -0,0 +1,105 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.llm.azureopenai import azure_openai_processor
+from src.llm.gemini import gemini_processor
+from src.llm.openai import openai_processor
+
+
+class LlmAdapter(ABC):
+    """Provider specifics of the agent loop: which processor to call and how to read its responses.
+
+    Request building lives in the processors, the adapter parses the `final_llm_response`
+    they return so the loop itself stays provider agnostic.
+    """
+
+    # Role of the tool result messages added to the chat history
+    history_role: str = "assistant"
+    # LLM calls allowed in the tool loop before giving up, None for no limit
+    max_tool_loop_calls: Optional[int] = None
+    # Whether the tool schemas are still sent after the first call of the tool loop
+    keep_tools_after_first_call: bool = True
+
+    def __init__(self, name: str, processor: Callable[..., Awaitable[Any]]):
+        self.name = name
+        self.processor = processor
+
+    @abstractmethod
+    def get_tool_calls(self, final_llm_response: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def get_text_content(self, final_llm_response: Optional[Dict[str, Any]]) -> Optional[str]:
+        ...
+
+
+class ChatCompletionAdapter(LlmAdapter):
+    """OpenAI and Azure OpenAI chat completions"""
+
+    def get_message(self, final_llm_response: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        choices = (final_llm_response or {}).get("choices") or [{}]
+        return choices[0].get("message", {}) or {}
+
+    def get_tool_calls(self, final_llm_response: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        tool_calls = []
+        for tool in self.get_message(final_llm_response).get("tool_calls", []) or []:
+            tool_calls.append({
+                "id": tool.get("id"),
+                "name": tool.get("function", {}).get("name"),
+                "arguments": json.loads(tool.get("function", {}).get("arguments") or "{}"),
+            })
+        return tool_calls
+
+    def get_text_content(self, final_llm_response: Optional[Dict[str, Any]]) -> Optional[str]:
+        return self.get_message(final_llm_response).get("content")
+
+
+class GeminiAdapter(LlmAdapter):
+    """Gemini generateContent. Tool results go back with the `model` role and the tool
+    loop stops after two calls, the second one without tool schemas, since Gemini tends
+    to keep calling tools otherwise."""
+
+    history_role = "model"
+    max_tool_loop_calls = 2
+    keep_tools_after_first_call = False
+
+    def get_parts(self, final_llm_response: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        candidates = final_llm_response.get("candidates", []) if final_llm_response else []
+        first_candidate = candidates[0] if candidates and len(candidates) > 0 else {}
+        content = first_candidate.get("content", {}) if isinstance(first_candidate, dict) else {}
+        return content.get("parts", []) if isinstance(content, dict) else []
+
+    def get_tool_calls(self, final_llm_response: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        tool_calls = []
+        for tool in self.get_parts(final_llm_response):
+            if "functionCall" not in tool:
+                continue
+
+            args_raw = tool.get("functionCall", {}).get("args", {})
+            if isinstance(args_raw, str):
+                try:
+                    args = json.loads(args_raw)
+                except json.JSONDecodeError:
+                    args = {}
+            else:
+                args = args_raw
+
+            tool_calls.append({
+                "id": tool.get("id"),
+                "name": tool.get("functionCall", {}).get("name"),
+                "arguments": args,
+            })
+        return tool_calls
+
+    def get_text_content(self, final_llm_response: Optional[Dict[str, Any]]) -> Optional[str]:
+        texts = [part["text"] for part in self.get_parts(final_llm_response) if part.get("text")]
+        return "".join(texts) if texts else None
+
+
+# Adapters of the supported clients, keyed by selected_client
+LlmAdapters: Dict[str, LlmAdapter] = {
+    "MCP_CLIENT_AZURE_AI": ChatCompletionAdapter("MCP_CLIENT_AZURE_AI", azure_openai_processor),
+    "MCP_CLIENT_OPENAI": ChatCompletionAdapter("MCP_CLIENT_OPENAI", openai_processor),
+    "MCP_CLIENT_GEMINI": GeminiAdapter("MCP_CLIENT_GEMINI", gemini_processor),
+}
@@ -1,8 +1,11 @@
-import requests
+import httpx
 import json
 from typing import Dict, List, Any, Optional, Union
 from dataclasses import dataclass, field, asdict
 
+from src.llm.http_client import get_llm_client
+from src.llm.streaming import GeminiStreamAccumulator, DeltaCallback, iter_sse_events
+
 @dataclass
 class ChatMessage:
     role: str
@@ -18,6 +21,7 @@ class SuccessResponseDataFormat:
     llm_responses_arr: List[Dict[str, Any]]
     messages: List[str]
     output_type: str
+    streamed: bool = False
 
 @dataclass
 class LlmResponseStruct:
@@ -43,7 +47,7 @@ class GeminiChatCompletionParams:
     forced_tool_calls: Optional[Any] = None
     tool_choice: str = 'auto'
 
-async def gemini_processor(data: Dict[str, Any]) -> LlmResponseStruct:
+async def gemini_processor(data: Dict[str, Any], on_delta: Optional[DeltaCallback] = None) -> LlmResponseStruct:
     """Gemini LLM Processor"""
     try:
         # Parse parameters
@@ -141,16 +145,34 @@ async def gemini_processor(data: Dict[str, Any]) -> LlmResponseStruct:
             payload["tools"] = [{"functionDeclarations": function_declarations}]
 
         # Send request
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{selected_model}:generateContent?key={params.api_key}"
         headers = {'Content-Type': 'application/json'}
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
+        http_client = get_llm_client("MCP_CLIENT_GEMINI")
+
+        # Stream the completion when the caller consumes text deltas
+        is_streamed = params.is_stream and on_delta is not None
+        if is_streamed:
+            url = f"https://generativelanguage.googleapis.com/v1beta/models/{selected_model}:streamGenerateContent?alt=sse&key={params.api_key}"
+            accumulator = GeminiStreamAccumulator()
+            async with http_client.stream("POST", url, headers=headers, json=payload) as response:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+                async for chunk in iter_sse_events(response):
+                    text_delta = accumulator.add_chunk(chunk)
+                    if text_delta:
+                        await on_delta(text_delta)
+            response_data = accumulator.to_response()
+        else:
+            url = f"https://generativelanguage.googleapis.com/v1beta/models/{selected_model}:generateContent?key={params.api_key}"
+            response = await http_client.post(url, headers=headers, json=payload)
+            response.raise_for_status()
 
-        response_data = response.json()
+            response_data = response.json()
 
-        message_content = response_data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-        tool_call = response_data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("functionCall", None)
-        is_tool_call = tool_call is not None
+        parts = response_data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])
+        message_content = "".join(part.get("text", "") for part in parts)
+        # Text may come before the function calls, e.g. "Checking the price" then functionCall
+        is_tool_call = any("functionCall" in part for part in parts)
 
         usage = response_data.get("usageMetadata", {})
 
@@ -162,12 +184,13 @@ async def gemini_processor(data: Dict[str, Any]) -> LlmResponseStruct:
             final_llm_response=response_data,
             llm_responses_arr=[response_data],
             messages=[message_content],
-            output_type="tool_call" if is_tool_call else "text"
+            output_type="tool_call" if is_tool_call else "text",
+            streamed=is_streamed
         )
 
         return LlmResponseStruct(Data=asdict(final_format), Error=None, Status=True)
 
-    except requests.exceptions.RequestException as req_err:
+    except httpx.HTTPError as req_err:
         err_data = None
         if hasattr(req_err, 'response') and req_err.response is not None:
             try:
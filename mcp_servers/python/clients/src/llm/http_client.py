@@ -0,0 +1,45 @@
+import httpx
+from typing import Dict
+
+from src.client_and_server_config import ClientsConfig, LlmHttpClientConfig
+
+# Global pooled client store, one keep-alive client per LLM client name
+LlmHttpClients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _build_http_client(client_name: str) -> httpx.AsyncClient:
+    """Create a pooled async HTTP client using the configured limits"""
+    config = {**LlmHttpClientConfig.get("default", {}), **LlmHttpClientConfig.get(client_name, {})}
+
+    limits = httpx.Limits(
+        max_connections=config.get("max_connections", 100),
+        max_keepalive_connections=config.get("max_keepalive_connections", 20),
+        keepalive_expiry=config.get("keepalive_expiry", 30.0)
+    )
+    timeout = httpx.Timeout(config.get("timeout", 60.0), connect=config.get("connect_timeout", 10.0))
+
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+async def initialize_llm_clients():
+    """Create the pooled HTTP client of every configured LLM client"""
+    for client_name in ClientsConfig:
+        if client_name not in LlmHttpClients:
+            LlmHttpClients[client_name] = _build_http_client(client_name)
+    return True
+
+
+async def close_llm_clients():
+    """Close every pooled HTTP client and release its connections"""
+    for client_name in list(LlmHttpClients.keys()):
+        client = LlmHttpClients.pop(client_name)
+        await client.aclose()
+
+
+def get_llm_client(client_name: str) -> httpx.AsyncClient:
+    """Return the pooled HTTP client of an LLM client, creating it on first use"""
+    client = LlmHttpClients.get(client_name)
+    if client is None or client.is_closed:
+        client = _build_http_client(client_name)
+        LlmHttpClients[client_name] = client
+    return client
@@ -1,8 +1,11 @@
-import requests
+import httpx
 import json
 from typing import Dict, List, Any, Optional, Union
 from dataclasses import dataclass, field, asdict
 
+from src.llm.http_client import get_llm_client
+from src.llm.streaming import ChatCompletionStreamAccumulator, DeltaCallback, iter_sse_events
+
 @dataclass
 class ChatMessage:
     role: str
@@ -18,6 +21,7 @@ class SuccessResponseDataFormat:
     llm_responses_arr: List[Dict[str, Any]]
     messages: List[str]
     output_type: str
+    streamed: bool = False
 
 @dataclass
 class LlmResponseStruct:
@@ -44,7 +48,7 @@ class AzureAndOpenAiChatCompletionParams:
     forced_tool_calls: Optional[Any] = None
     tool_choice: str = 'auto'
 
-async def openai_processor(data: Dict[str, Any]) -> LlmResponseStruct:
+async def openai_processor(data: Dict[str, Any], on_delta: Optional[DeltaCallback] = None) -> LlmResponseStruct:
     """ 
     Main OpenAI Processor function
     """
@@ -104,9 +108,27 @@ async def openai_processor(data: Dict[str, Any]) -> LlmResponseStruct:
         url = f"https://api.openai.com/v1/chat/completions"
         headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {params.api_key}'}
 
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
-        resp.raise_for_status()
-        response_data = resp.json()
+        http_client = get_llm_client("MCP_CLIENT_OPENAI")
+
+        # Stream the completion when the caller consumes text deltas
+        is_streamed = params.is_stream and on_delta is not None
+        if is_streamed:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+            accumulator = ChatCompletionStreamAccumulator()
+            async with http_client.stream("POST", url, headers=headers, json=payload) as resp:
+                if resp.is_error:
+                    await resp.aread()
+                resp.raise_for_status()
+                async for chunk in iter_sse_events(resp):
+                    text_delta = accumulator.add_chunk(chunk)
+                    if text_delta:
+                        await on_delta(text_delta)
+            response_data = accumulator.to_response()
+        else:
+            resp = await http_client.post(url, headers=headers, json=payload)
+            resp.raise_for_status()
+            response_data = resp.json()
 
         # Detect tool calls
         choices = response_data.get('choices', [])
@@ -126,7 +148,8 @@ async def openai_processor(data: Dict[str, Any]) -> LlmResponseStruct:
             final_llm_response=response_data,
             llm_responses_arr=[response_data],
             messages=[message_content],
-            output_type="tool_call" if is_tool_call else "text"
+            output_type="tool_call" if is_tool_call else "text",
+            streamed=is_streamed
         )
         
         # print(f"response: {final_format}")
@@ -134,7 +157,7 @@ async def openai_processor(data: Dict[str, Any]) -> LlmResponseStruct:
         # Return as dict to avoid subscript errors
         return LlmResponseStruct(Data=asdict(final_format), Error=None, Status=True)
 
-    except requests.exceptions.RequestException as req_err:
+    except httpx.HTTPError as req_err:
         err_data = None
         if hasattr(req_err, 'response') and req_err.response is not None:
             try:
@@ -0,0 +1,146 @@
+import httpx
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from src.json_codec import loads
+
+# Async callback receiving every text delta as soon as the provider sends it
+DeltaCallback = Callable[[str], Awaitable[None]]
+
+
+async def iter_sse_events(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the JSON payload of every `data:` line of a server-sent events response"""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if not data:
+            continue
+        if data == "[DONE]":
+            break
+        yield loads(data)
+
+
+class ChatCompletionStreamAccumulator:
+    """Assemble OpenAI / Azure OpenAI chat completion chunks into a regular chat completion response"""
+
+    def __init__(self):
+        self.response_meta: Dict[str, Any] = {}
+        self.role = "assistant"
+        self.content_parts: List[str] = []
+        self.tool_calls: Dict[int, Dict[str, Any]] = {}
+        self.finish_reason: Optional[str] = None
+        self.usage: Dict[str, Any] = {}
+
+    def add_chunk(self, chunk: Dict[str, Any]) -> str:
+        """Merge one chunk and return its text delta"""
+        for key in ("id", "object", "created", "model", "system_fingerprint"):
+            if key in chunk and key not in self.response_meta:
+                self.response_meta[key] = chunk[key]
+
+        if chunk.get("usage"):
+            self.usage = chunk["usage"]
+
+        choices = chunk.get("choices") or []
+        if not choices:
+            return ""
+
+        choice = choices[0]
+        if choice.get("finish_reason"):
+            self.finish_reason = choice["finish_reason"]
+
+        delta = choice.get("delta") or {}
+        if delta.get("role"):
+            self.role = delta["role"]
+
+        # Tool calls arrive as fragments keyed by index, the arguments string is split across chunks
+        for tool_call_delta in delta.get("tool_calls") or []:
+            index = tool_call_delta.get("index", len(self.tool_calls))
+            tool_call = self.tool_calls.setdefault(index, {
+                "id": None,
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            if tool_call_delta.get("id"):
+                tool_call["id"] = tool_call_delta["id"]
+            if tool_call_delta.get("type"):
+                tool_call["type"] = tool_call_delta["type"]
+            function_delta = tool_call_delta.get("function") or {}
+            if function_delta.get("name"):
+                tool_call["function"]["name"] += function_delta["name"]
+            if function_delta.get("arguments"):
+                tool_call["function"]["arguments"] += function_delta["arguments"]
+
+        text_delta = delta.get("content") or ""
+        if text_delta:
+            self.content_parts.append(text_delta)
+        return text_delta
+
+    def to_response(self) -> Dict[str, Any]:
+        """Return the assembled response in the non streaming chat completion format"""
+        message: Dict[str, Any] = {
+            "role": self.role,
+            "content": "".join(self.content_parts) if self.content_parts else None
+        }
+        if self.tool_calls:
+            message["tool_calls"] = [self.tool_calls[index] for index in sorted(self.tool_calls)]
+
+        return {
+            **self.response_meta,
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": self.finish_reason
+            }],
+            "usage": self.usage
+        }
+
+
+class GeminiStreamAccumulator:
+    """Assemble Gemini streamGenerateContent chunks into a regular generateContent response"""
+
+    def __init__(self):
+        self.parts: List[Dict[str, Any]] = []
+        self.finish_reason: Optional[str] = None
+        self.usage: Dict[str, Any] = {}
+        self.model_version: Optional[str] = None
+
+    def add_chunk(self, chunk: Dict[str, Any]) -> str:
+        """Merge one chunk and return its text delta"""
+        if chunk.get("usageMetadata"):
+            self.usage = chunk["usageMetadata"]
+        if chunk.get("modelVersion"):
+            self.model_version = chunk["modelVersion"]
+
+        candidates = chunk.get("candidates") or []
+        if not candidates:
+            return ""
+
+        candidate = candidates[0]
+        if candidate.get("finishReason"):
+            self.finish_reason = candidate["finishReason"]
+
+        text_delta = ""
+        for part in (candidate.get("content") or {}).get("parts") or []:
+            if "text" in part:
+                text_delta += part["text"]
+                # Consecutive text fragments are merged into a single text part
+                if self.parts and "text" in self.parts[-1]:
+                    self.parts[-1]["text"] += part["text"]
+                else:
+                    self.parts.append({"text": part["text"]})
+            else:
+                self.parts.append(part)
+        return text_delta
+
+    def to_response(self) -> Dict[str, Any]:
+        """Return the assembled response in the non streaming generateContent format"""
+        response = {
+            "candidates": [{
+                "content": {"role": "model", "parts": self.parts or [{"text": ""}]},
+                "finishReason": self.finish_reason
+            }],
+            "usageMetadata": self.usage
+        }
+        if self.model_version:
+            response["modelVersion"] = self.model_version
+        return response
@@ -0,0 +1,197 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition format
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# (labels, value) samples of one metric
+Samples = List[Tuple[Dict[str, Any], float]]
+
+
+def escape_label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values: Dict[Tuple, Any] = {}
+
+    def get_key(self, labels: Dict[str, Any]) -> Tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def get_labels(self, key: Tuple) -> Dict[str, str]:
+        return dict(zip(self.label_names, key))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(self.get_labels(key))} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.get_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[self.get_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.get_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self.get_key(labels)
+        state = self.values.get(key)
+        if state is None:
+            state = self.values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                state["counts"][index] += 1
+                break
+        state["sum"] += value
+        state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the block, also when it raises or is cancelled"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for key, state in sorted(self.values.items()):
+            labels = self.get_labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels({**labels, 'le': format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics of the gateway plus collectors reading values owned by other modules at scrape time"""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], List[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], List[Metric]]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        metrics = list(self.metrics)
+        for collector in self.collectors:
+            metrics.extend(collector())
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+Metrics = MetricsRegistry()
+
+RequestSeconds = Metrics.register(Histogram(
+    "mcp_gateway_request_seconds", "Duration of API requests", ("endpoint",)
+))
+ValidationSeconds = Metrics.register(Histogram(
+    "mcp_gateway_validation_seconds", "Duration of client and server validation"
+))
+LlmCallSeconds = Metrics.register(Histogram(
+    "mcp_gateway_llm_call_seconds", "Duration of LLM calls, stage is router, loop or fallback", ("client", "stage")
+))
+ToolCallSeconds = Metrics.register(Histogram(
+    "mcp_gateway_tool_call_seconds", "Duration of MCP tool calls, cached results excluded", ("server", "tool")
+))
+SerializationSeconds = Metrics.register(Histogram(
+    "mcp_gateway_serialization_seconds", "Time spent converting and encoding payloads, by stage", ("stage",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+))
+SseFirstFrameSeconds = Metrics.register(Histogram(
+    "mcp_gateway_sse_first_frame_seconds", "Time from a streaming request to its first LLM output frame"
+))
+LlmTokens = Metrics.register(Counter(
+    "mcp_gateway_llm_tokens_total", "Tokens reported by the LLM providers", ("client", "type")
+))
+Errors = Metrics.register(Counter(
+    "mcp_gateway_errors_total", "Errors by stage", ("stage",)
+))
+AdmissionQueueSeconds = Metrics.register(Histogram(
+    "mcp_gateway_admission_queue_seconds", "Time admitted work waited for a slot, scope is tenant, provider or server", ("scope",)
+))
+AdmissionRejections = Metrics.register(Counter(
+    "mcp_gateway_admission_rejections_total", "Work shed by admission control, reason is queue_full or timeout", ("scope", "reason")
+))
+ReplicaRestarts = Metrics.register(Counter(
+    "mcp_gateway_server_replica_restarts_total", "Restarts of crashed MCP server replicas", ("server",)
+))
+InflightRequests = Metrics.register(Gauge(
+    "mcp_gateway_inflight_requests", "Requests being processed", ("endpoint",)
+))
+
+
+def build_gauge(name: str, documentation: str, label_names: Sequence[str], samples: Samples, metric_type: Optional[str] = None) -> Metric:
+    """Build a metric from values read at scrape time, e.g. cache or pool statistics"""
+    metric = Gauge(name, documentation, label_names)
+    if metric_type:
+        metric.metric_type = metric_type
+    for labels, value in samples:
+        metric.set(value, **labels)
+    return metric
@@ -1,13 +1,23 @@
 import os
+import time
 import asyncio
+import logging
 import warnings
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
 from contextlib import AsyncExitStack
-from src.client_and_server_config import ServersConfig
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from src.client_and_server_config import ServersConfig, ServerStartupConfig, SidecarConfig
 from mcp import ClientSession, StdioServerParameters
+from mcp import types
+from mcp.client.stdio import get_default_environment, stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from src.server_pool import MCPServerPool
+from src.sidecar_client import Sidecar, SidecarError, SidecarServerProxy
+from src.tool_catalog import refresh_tool_catalog, schedule_tool_catalog_refresh
+from src.tracing import get_server_trace_env
+from src.metrics import ReplicaRestarts
+
+logger = logging.getLogger(__name__)
 
 # Suppress warnings about unclosed transports
 warnings.filterwarnings("ignore", category=ResourceWarning, message="unclosed transport .*")
@@ -16,50 +26,381 @@ warnings.filterwarnings("ignore", category=ResourceWarning, message="unclosed tr
 # Suppress specific ResourceWarning related to unclosed transport
 warnings.filterwarnings("ignore", category=ResourceWarning, message="unclosed transport .*")
 
-# Global session store
-MCPServers: Dict[str, ClientSession] = {}
+# Global session store, one replica pool per server
+MCPServers: Dict[str, MCPServerPool] = {}
+
+# Readiness of every configured server: lazy, starting, ready, degraded (a crashed replica is
+# being restarted), timeout, failed or stopped
+MCPServerStatus: Dict[str, Dict[str, Any]] = {}
+
+_server_tasks: Dict[str, List[asyncio.Task]] = {}
+_server_stop_events: Dict[str, asyncio.Event] = {}
+_server_start_locks: Dict[str, asyncio.Lock] = {}
+# Consecutive failed starts of a server, sets the backoff before the next attempt
+_server_start_failures: Dict[str, int] = {}
+# Consecutive replica crashes of a running server, sets the backoff before its restart
+_replica_restarts: Dict[str, int] = {}
+# Set by initialize_all_mcp, the sidecar process owns its servers whatever SidecarConfig says
+_use_sidecar: Optional[bool] = None
+
+
+def tool_list_changed_handler(server_name: str):
+    """Build a session message handler refreshing the tool catalog on tools/list_changed"""
+    async def message_handler(message: Any):
+        if isinstance(message, types.ServerNotification) and isinstance(message.root, types.ToolListChangedNotification):
+            logger.info("Received tools/list_changed", extra={"fields": {"server": server_name}})
+            schedule_tool_catalog_refresh(server_name, MCPServers.get(server_name))
+
+    return message_handler
+
+
+def get_server_config(server_name: str) -> Optional[Dict[str, Any]]:
+    """Return the ServersConfig entry of a server"""
+    return next((server for server in ServersConfig if server["server_name"] == server_name), None)
+
+
+def set_server_status(server_name: str, status: str, error: Optional[str] = None, startup_seconds: Optional[float] = None, replicas: int = 0):
+    MCPServerStatus[server_name] = {
+        "status": status,
+        "error": error,
+        "startup_seconds": startup_seconds,
+        "replicas": replicas,
+        "updated_at": time.time()
+    }
+
+
+def get_retry_backoff(failures: int) -> float:
+    """Seconds to wait before the next start, doubling with every consecutive failure"""
+    return min(
+        ServerStartupConfig.get("retry_backoff", 5.0) * 2 ** (max(failures, 1) - 1),
+        ServerStartupConfig.get("max_retry_backoff", 300.0)
+    )
+
+
+def is_start_retry_due(server_name: str) -> bool:
+    """Whether a server that timed out or failed may be started again"""
+    status = MCPServerStatus.get(server_name, {})
+    return time.time() - status.get("updated_at", 0.0) >= get_retry_backoff(_server_start_failures.get(server_name, 1))
 
 
-async def initialize_all_mcp(exit_stack):
-    """Initialize all MCP clients based on server configuration"""
-    for server in ServersConfig:
-        try:
-            print(f"\n================= Initializing {server['server_name']} mcp server start ===============")
-            print(f"Server name        : {server['server_name']}")
-            print(f"Server command     : {server['command']}")
-            print(f"Server args        : {server['args']}")
-            print(f"cwd                : {os.getcwd()}")
+def set_replica_count(server_name: str, replicas: int, error: Optional[str] = None):
+    """Report the live replicas of a running server, degraded until all of them run again"""
+    server = get_server_config(server_name) or {}
+    status = "ready" if replicas >= max(1, int(server.get("replicas", 1))) else "degraded"
+    if status == "ready":
+        _replica_restarts.pop(server_name, None)
+    previous = MCPServerStatus.get(server_name, {})
+    set_server_status(server_name, status, error=error, startup_seconds=previous.get("startup_seconds"), replicas=replicas)
+
+
+async def restart_mcp_replica(server: Dict[str, Any], replica_index: int, stop: asyncio.Event, backoff: float):
+    """Replace a crashed replica after the backoff, unless the server is stopped meanwhile"""
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=backoff)
+        return
+    except asyncio.TimeoutError:
+        pass
+    logger.info("Restarting MCP server replica", extra={"fields": {"server": server["server_name"], "replica": replica_index + 1}})
+    ready = asyncio.get_running_loop().create_future()
+    # Nobody waits for a replacement, its start failures are handled by run_mcp_server
+    ready.add_done_callback(lambda future: future.cancelled() or future.exception())
+    await run_mcp_server(server, replica_index, ready, stop, is_restart=True)
+
+
+def schedule_replica_restart(server: Dict[str, Any], replica_index: int, stop: asyncio.Event):
+    server_name = server["server_name"]
+    restarts = _replica_restarts[server_name] = _replica_restarts.get(server_name, 0) + 1
+    ReplicaRestarts.inc(server=server_name)
+    task = asyncio.create_task(restart_mcp_replica(server, replica_index, stop, get_retry_backoff(restarts)))
+    # Kept with the replica tasks, so shutdown_all_mcp stops pending restarts too
+    _server_tasks[server_name] = [item for item in _server_tasks.get(server_name, []) if not item.done()] + [task]
+
+
+async def open_server_transport(server: Dict[str, Any], exit_stack: AsyncExitStack) -> Tuple[Any, Any]:
+    """Connect to a Streamable HTTP server when its entry has a "url", spawn it over stdio otherwise"""
+    if server.get("url"):
+        read_stream, write_stream, _ = await exit_stack.enter_async_context(
+            streamablehttp_client(server["url"], headers=server.get("headers"))
+        )
+        return read_stream, write_stream
+
+    # The servers write their spans to the gateway trace file
+    trace_env = get_server_trace_env()
+    server_env = {**get_default_environment(), **trace_env} if trace_env else None
+    server_params = StdioServerParameters(command=server["command"], args=server["args"], env=server_env)
+    return await exit_stack.enter_async_context(stdio_client(server_params))
+
+
+async def run_mcp_server(server: Dict[str, Any], replica_index: int, ready: asyncio.Future, stop: asyncio.Event, is_restart: bool = False):
+    """Own the transport and session of one server replica for its whole lifetime.
+
+    The stdio and HTTP transports run anyio task groups which must be entered and exited
+    by the same task, so every replica lives in its own task until it is stopped.
+    """
+    server_name = server["server_name"]
+    session = None
+    crash_error = None
+    try:
+        async with AsyncExitStack() as exit_stack:
+            startup_fields = {
+                "server": server_name,
+                "replica": f"{replica_index + 1}/{server.get('replicas', 1)}",
+            }
+            if server.get("url"):
+                startup_fields["url"] = server["url"]
+            else:
+                startup_fields.update({"command": server["command"], "args": server["args"], "cwd": os.getcwd()})
 
             # Optional directory existence check
-            if "--directory" in server["args"]:
+            if "--directory" in server.get("args", []):
                 dir_index = server["args"].index("--directory")
                 if dir_index + 1 < len(server["args"]):
-                    relative_path = server["args"][dir_index + 1]
-                    absolute_path = os.path.abspath(relative_path)
-                    print(f"Relative path      : {relative_path}")
-                    print(f"Absolute path      : {absolute_path}")
-                    print(f"Path exists        : {os.path.exists(absolute_path)}")
-
-            # Start stdio client
-            server_params = StdioServerParameters(command=server["command"], args=server["args"])
-            stdio_transport = await exit_stack.enter_async_context(stdio_client(server_params))
-            stdio, write = stdio_transport
-
-            session = await exit_stack.enter_async_context(ClientSession(stdio, write))
+                    absolute_path = os.path.abspath(server["args"][dir_index + 1])
+                    startup_fields["directory"] = absolute_path
+                    startup_fields["directory_exists"] = os.path.exists(absolute_path)
+            logger.info("Initializing MCP server", extra={"fields": startup_fields})
+
+            read_stream, write_stream = await open_server_transport(server, exit_stack)
+
+            session = await exit_stack.enter_async_context(
+                ClientSession(read_stream, write_stream, message_handler=tool_list_changed_handler(server_name))
+            )
             await session.initialize()
 
+            # Save session globally in the server's replica pool
+            pool = MCPServers.setdefault(server_name, MCPServerPool(server_name))
+            pool.add_session(session)
+            logger.info("Connected to MCP server replica", extra={"fields": {"server": server_name, "replica": replica_index + 1}})
+            if MCPServerStatus.get(server_name, {}).get("status") == "degraded":
+                set_replica_count(server_name, len(pool))
+
+            if not ready.done():
+                ready.set_result(session)
+            await stop.wait()
+
+    except BaseException as err:
+        if not ready.done():
+            if isinstance(err, Exception):
+                ready.set_exception(err)
+            else:
+                ready.cancel()
+        if not isinstance(err, Exception):
+            raise
+        crash_error = str(err) or type(err).__name__
+        logger.error(f"Error in MCP server: {err}", extra={"fields": {"server": server_name, "replica": replica_index + 1}})
+
+    finally:
+        pool = MCPServers.get(server_name)
+        if pool is not None and session is not None:
+            pool.remove_session(session)
+            if len(pool) == 0:
+                # The next request starts the whole server again, see ensure_mcp_server
+                MCPServers.pop(server_name, None)
+                if MCPServerStatus.get(server_name, {}).get("status") in ("ready", "degraded"):
+                    set_server_status(server_name, "stopped", error=crash_error)
+            elif crash_error is not None and not stop.is_set():
+                # The other replicas keep serving while this one is restarted with backoff
+                set_replica_count(server_name, len(pool), error=crash_error)
+                schedule_replica_restart(server, replica_index, stop)
+        elif is_restart and pool is not None and crash_error is not None and not stop.is_set():
+            # The replacement failed to start, retried after a longer backoff
+            set_replica_count(server_name, len(pool), error=crash_error)
+            schedule_replica_restart(server, replica_index, stop)
+
+
+async def start_mcp_server(server: Dict[str, Any]) -> bool:
+    """Spawn the replicas of a server and wait for them within the startup timeout"""
+    server_name = server["server_name"]
+    startup_timeout = server.get("startup_timeout", ServerStartupConfig.get("startup_timeout", 60.0))
+    replica_count = max(1, int(server.get("replicas", 1)))
+    started_at = time.perf_counter()
+    set_server_status(server_name, "starting")
+    # Replica restarts still pending from the previous run of the server are dropped
+    previous_stop = _server_stop_events.get(server_name)
+    if previous_stop is not None:
+        previous_stop.set()
+    _replica_restarts.pop(server_name, None)
+
+    loop = asyncio.get_running_loop()
+    readies = [loop.create_future() for _ in range(replica_count)]
+    stop = asyncio.Event()
+    _server_stop_events[server_name] = stop
+    _server_tasks[server_name] = [
+        asyncio.create_task(run_mcp_server(server, index, ready, stop))
+        for index, ready in enumerate(readies)
+    ]
+
+    await asyncio.wait(readies, timeout=startup_timeout)
+    startup_seconds = round(time.perf_counter() - started_at, 3)
+
+    errors = []
+    for ready, task in zip(readies, _server_tasks[server_name]):
+        if not ready.done():
+            task.cancel()
+            errors.append(f"Startup timed out after {startup_timeout}s")
+        elif ready.exception() is not None:
+            errors.append(str(ready.exception()))
+
+    started_replicas = replica_count - len(errors)
+    if started_replicas == 0:
+        status = "timeout" if all(error.startswith("Startup timed out") for error in errors) else "failed"
+        set_server_status(server_name, status, error=errors[0], startup_seconds=startup_seconds)
+        _server_start_failures[server_name] = _server_start_failures.get(server_name, 0) + 1
+        logger.error(f"Error initializing MCP server: {errors[0]}", extra={"fields": {"server": server_name}})
+        return False
+
+    try:
+        # Cache the tool catalog, a (re)started server always gets a fresh version
+        catalog_entry = await refresh_tool_catalog(server_name, MCPServers[server_name])
+    except Exception as err:
+        stop.set()
+        set_server_status(server_name, "failed", error=str(err), startup_seconds=startup_seconds)
+        _server_start_failures[server_name] = _server_start_failures.get(server_name, 0) + 1
+        logger.error(f"Error initializing MCP server: {err}", extra={"fields": {"server": server_name}})
+        return False
+
+    tool_names = [tool["function"]["name"] for tool in catalog_entry.tools]
+    logger.info("Connected to MCP server", extra={"fields": {
+        "server": server_name, "replicas": f"{started_replicas}/{replica_count}", "tools": tool_names
+    }})
+    _server_start_failures.pop(server_name, None)
+    set_server_status(
+        server_name,
+        "ready",
+        error=errors[0] if errors else None,
+        startup_seconds=startup_seconds,
+        replicas=started_replicas
+    )
+    return True
+
+
+async def attach_sidecar_server(server_name: str, status: Optional[Dict[str, Any]] = None) -> bool:
+    """Register a server owned by the sidecar and cache its tool catalog"""
+    proxy = SidecarServerProxy(server_name, Sidecar)
+    try:
+        catalog_entry = await refresh_tool_catalog(server_name, proxy)
+    except Exception as err:
+        set_server_status(server_name, "failed", error=str(err))
+        logger.error(f"Error attaching sidecar MCP server: {err}", extra={"fields": {"server": server_name}})
+        return False
+
+    MCPServers[server_name] = proxy
+    status = status or {}
+    set_server_status(server_name, "ready", startup_seconds=status.get("startup_seconds"), replicas=status.get("replicas", 1))
+    logger.info("Attached sidecar MCP server", extra={"fields": {
+        "server": server_name, "tools": [tool["function"]["name"] for tool in catalog_entry.tools]
+    }})
+    return True
+
+
+def uses_sidecar() -> bool:
+    """Whether the servers of this process are owned by the sidecar"""
+    return SidecarConfig.get("enabled", False) if _use_sidecar is None else _use_sidecar
+
+
+async def ensure_mcp_server(server_name: str) -> bool:
+    """Return whether a server is ready, spawning it on first use in lazy mode"""
+    if server_name in MCPServers:
+        return True
+
+    server = get_server_config(server_name)
+    if server is None:
+        return False
+
+    lock = _server_start_locks.setdefault(server_name, asyncio.Lock())
+    async with lock:
+        # Another request may have started it while we were waiting
+        if server_name in MCPServers:
+            return True
+        if uses_sidecar():
+            # The sidecar spawns lazy or stopped servers, the worker only attaches them
+            try:
+                return await Sidecar.request("ensure", server=server_name) and await attach_sidecar_server(server_name)
+            except (ConnectionError, OSError, asyncio.TimeoutError, SidecarError) as err:
+                # Retried on the next request, e.g. when the sidecar is still starting or restarting
+                logger.warning(f"Sidecar unavailable: {err}", extra={"fields": {"server": server_name}})
+                return False
+        status = MCPServerStatus.get(server_name, {}).get("status")
+        if status in ("timeout", "failed"):
+            # Retried with backoff, a server down once is not refused until the gateway restarts
+            if not is_start_retry_due(server_name):
+                return False
+        elif status not in ("lazy", "stopped"):
+            return False
+        return await start_mcp_server(server)
+
+
+async def shutdown_all_mcp():
+    """Stop every server task and close its session"""
+    for stop in _server_stop_events.values():
+        stop.set()
+    await asyncio.gather(*(task for tasks in _server_tasks.values() for task in tasks), return_exceptions=True)
+    _server_tasks.clear()
+    _server_stop_events.clear()
+
+
+def handle_sidecar_event(event: Dict[str, Any]):
+    """Keep the worker's catalog of an attached server in sync with the sidecar"""
+    if event.get("event") == "tools_changed" and event.get("server") in MCPServers:
+        logger.info("Sidecar tools changed", extra={"fields": {"server": event["server"]}})
+        schedule_tool_catalog_refresh(event["server"], MCPServers[event["server"]])
+
+
+def handle_sidecar_reconnect():
+    """Fetch the catalogs again after a sidecar restart, events sent meanwhile were missed"""
+    logger.info("Reconnected to sidecar", extra={"fields": {"socket_path": SidecarConfig.get("socket_path")}})
+    for server_name, proxy in list(MCPServers.items()):
+        schedule_tool_catalog_refresh(server_name, proxy)
+
+
+async def initialize_sidecar_mcp(exit_stack) -> bool:
+    """Attach the servers of the sidecar instead of spawning them in this worker.
+
+    A sidecar that is not listening yet is not fatal, its servers are then attached
+    on first use by ensure_mcp_server.
+    """
+    exit_stack.push_async_callback(Sidecar.close)
+    Sidecar.on_event = handle_sidecar_event
+    Sidecar.on_reconnect = handle_sidecar_reconnect
+    try:
+        statuses = await Sidecar.request("status")
+    except (ConnectionError, OSError, asyncio.TimeoutError, SidecarError) as err:
+        logger.warning(f"Sidecar unavailable, servers are attached on first use: {err}")
+        for server in ServersConfig:
+            set_server_status(server["server_name"], "lazy")
+        return True
+
+    for server_name, status in statuses.items():
+        if status["status"] in ("ready", "degraded"):
+            await attach_sidecar_server(server_name, status)
+        else:
+            set_server_status(server_name, status["status"], error=status.get("error"))
+    logger.info("Connected to sidecar", extra={"fields": {"socket_path": SidecarConfig.get("socket_path")}})
+    return True
+
+
+async def initialize_all_mcp(exit_stack, use_sidecar: Optional[bool] = None):
+    """Initialize all MCP clients based on server configuration.
+
+    With the sidecar enabled the servers are owned by the sidecar process, which calls
+    this with use_sidecar=False to spawn them itself.
+    """
+    global _use_sidecar
 
-            # Save session globally
-            MCPServers[server["server_name"]] = session
+    if use_sidecar is None:
+        use_sidecar = SidecarConfig.get("enabled", False)
+    _use_sidecar = use_sidecar
+    if use_sidecar:
+        return await initialize_sidecar_mcp(exit_stack)
 
-            # Confirm connection
-            tools_response = await session.list_tools()
-            tool_names = [tool.name for tool in tools_response.tools]
-            print(f"Connected to {server['server_name']} with tools: {tool_names}")
-            print(f"\n================= Initializing {server['server_name']} mcp server end ===============")
+    exit_stack.push_async_callback(shutdown_all_mcp)
 
-        except Exception as err:
-            print(f"Error initializing {server['server_name']} mcp server =========>>>> {err}")
-            continue
+    if ServerStartupConfig.get("lazy"):
+        for server in ServersConfig:
+            set_server_status(server["server_name"], "lazy")
+        logger.info("Lazy startup enabled, MCP servers will be spawned on first use")
+        return True
 
-    return True
\ No newline at end of file
+    # Start every server concurrently, boot time is bounded by the slowest one
+    await asyncio.gather(*(start_mcp_server(server) for server in ServersConfig))
+    return True
@@ -0,0 +1,56 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from mcp import ClientSession, types
+
+
+class MCPServerPool:
+    """Replica sessions of one MCP server, dispatching every call to the least loaded replica.
+
+    The pool exposes the `call_tool` / `list_tools` subset of `ClientSession`,
+    so it can be stored in `MCPServers` in place of a single session.
+    """
+
+    def __init__(self, server_name: str):
+        self.server_name = server_name
+        self.replicas: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    def add_session(self, session: ClientSession):
+        self.replicas.append({"session": session, "in_flight": 0, "total_calls": 0})
+
+    def remove_session(self, session: ClientSession):
+        self.replicas = [replica for replica in self.replicas if replica["session"] is not session]
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[ClientSession]:
+        """Reserve the replica with the fewest in-flight calls for the duration of one call"""
+        if not self.replicas:
+            raise RuntimeError(f"No running replica for {self.server_name}")
+
+        replica = min(self.replicas, key=lambda item: item["in_flight"])
+        replica["in_flight"] += 1
+        replica["total_calls"] += 1
+        try:
+            yield replica["session"]
+        finally:
+            replica["in_flight"] -= 1
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, meta: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        """Call a tool on the least loaded replica, `meta` is sent as the request `_meta` field"""
+        async with self.acquire() as session:
+            if not meta:
+                return await session.call_tool(name, arguments, **kwargs)
+
+            params = types.CallToolRequestParams.model_validate({"name": name, "arguments": arguments, "_meta": meta})
+            request = types.ClientRequest(types.CallToolRequest(method="tools/call", params=params))
+            return await session.send_request(request, types.CallToolResult)
+
+    async def list_tools(self) -> Any:
+        async with self.acquire() as session:
+            return await session.list_tools()
+
+    def stats(self) -> List[Dict[str, int]]:
+        return [{"in_flight": replica["in_flight"], "total_calls": replica["total_calls"]} for replica in self.replicas]
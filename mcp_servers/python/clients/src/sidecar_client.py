@@ -0,0 +1,165 @@
+import asyncio
+import itertools
+import logging
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from src.client_and_server_config import SidecarConfig
+from src.json_codec import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+
+class SidecarError(RuntimeError):
+    """Error returned by the sidecar for one request"""
+
+
+class SidecarClient:
+    """Connection of a gateway worker to the sidecar.
+
+    Messages are JSON lines. Concurrent requests share the connection and are matched
+    to their responses by id, messages without an id are events pushed by the sidecar.
+    The connection is opened on the first request and reopened on the next request
+    when the sidecar restarts.
+    """
+
+    def __init__(self):
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.reader_task: Optional[asyncio.Task] = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.request_ids = itertools.count(1)
+        self.connect_lock = asyncio.Lock()
+        self.connections = 0
+        self.last_failure_at: Optional[float] = None
+        # Called with every event pushed by the sidecar, and after reconnecting to a restarted sidecar
+        self.on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+        self.on_reconnect: Optional[Callable[[], None]] = None
+
+    def is_connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self):
+        """Connect to the sidecar, retrying while it is still starting, e.g. spawning its servers"""
+        async with self.connect_lock:
+            if self.is_connected():
+                return
+            loop = asyncio.get_running_loop()
+            retry_interval = SidecarConfig.get("retry_interval", 1.0)
+            if self.last_failure_at is not None and loop.time() - self.last_failure_at < retry_interval:
+                # Requests queued behind a failed attempt fail fast instead of retrying in turn
+                raise ConnectionError("Sidecar is not reachable, retrying shortly")
+
+            deadline = loop.time() + SidecarConfig.get("connect_timeout", 10.0)
+            while True:
+                try:
+                    self.reader, self.writer = await asyncio.wait_for(
+                        asyncio.open_unix_connection(
+                            SidecarConfig.get("socket_path"),
+                            limit=SidecarConfig.get("max_message_size", 64 * 1024 * 1024)
+                        ),
+                        timeout=max(0.1, deadline - loop.time())
+                    )
+                    break
+                except (OSError, asyncio.TimeoutError) as err:
+                    if loop.time() + retry_interval >= deadline:
+                        self.last_failure_at = loop.time()
+                        raise ConnectionError(f"Sidecar is not reachable at {SidecarConfig.get('socket_path')}: {err}") from err
+                    await asyncio.sleep(retry_interval)
+
+            self.last_failure_at = None
+            self.connections += 1
+            self.reader_task = asyncio.create_task(self.read_responses(self.reader, self.writer))
+            if self.connections > 1 and self.on_reconnect is not None:
+                # A restarted sidecar may serve other tool catalogs
+                self.on_reconnect()
+
+    async def read_responses(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = loads(line)
+                if message.get("id") is None:
+                    if message.get("event") and self.on_event is not None:
+                        self.on_event(message)
+                    continue
+                future = self.pending.pop(message.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if message.get("error") is not None:
+                    future.set_exception(SidecarError(message["error"]))
+                else:
+                    future.set_result(message.get("result"))
+        finally:
+            writer.close()
+            if self.writer is writer:
+                self.writer = None
+            pending, self.pending = self.pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Sidecar connection closed"))
+
+    async def send(self, message: Dict[str, Any]):
+        self.writer.write(dumps(message).encode("utf-8") + b"\n")
+        await self.writer.drain()
+
+    async def request(self, method: str, **params) -> Any:
+        if not self.is_connected():
+            await self.connect()
+
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            await self.send({"id": request_id, "method": method, **params})
+            return await future
+        except asyncio.CancelledError:
+            # Stop the work in the sidecar too, e.g. a tool call past the request deadline
+            if self.is_connected():
+                await asyncio.shield(self.send({"method": "cancel", "request_id": request_id}))
+            raise
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.reader_task is not None:
+            self.reader_task.cancel()
+            await asyncio.gather(self.reader_task, return_exceptions=True)
+        self.reader_task = None
+
+
+class SidecarServerProxy:
+    """Stands in for the MCPServerPool of a server owned by the sidecar"""
+
+    def __init__(self, server_name: str, client: SidecarClient):
+        self.server_name = server_name
+        self.client = client
+        self.in_flight = 0
+        self.total_calls = 0
+
+    def __len__(self) -> int:
+        return 1
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, meta: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        """Call a tool through the sidecar, the result comes back as plain dicts and lists"""
+        self.in_flight += 1
+        self.total_calls += 1
+        try:
+            return await self.client.request("call_tool", server=self.server_name, name=name, arguments=arguments, meta=meta)
+        finally:
+            self.in_flight -= 1
+
+    async def list_tools(self) -> Any:
+        tools = await self.client.request("list_tools", server=self.server_name)
+        return SimpleNamespace(tools=[SimpleNamespace(**tool) for tool in tools])
+
+    def stats(self) -> List[Dict[str, int]]:
+        return [{"in_flight": self.in_flight, "total_calls": self.total_calls}]
+
+
+# Connection of this worker to the sidecar, used when SidecarConfig["enabled"] is set
+Sidecar = SidecarClient()
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Set
+
+from src.client_and_server_config import SidecarConfig
+from src.json_codec import dumps, loads, to_plain
+from src.server_connection import MCPServers, MCPServerStatus, ensure_mcp_server
+from src.tool_catalog import ToolCatalogEntry, add_catalog_listener
+
+logger = logging.getLogger(__name__)
+
+# Write lock of every connected gateway worker, responses and events must not interleave
+SidecarConnections: Dict[asyncio.StreamWriter, asyncio.Lock] = {}
+_event_tasks: Set[asyncio.Task] = set()
+
+
+async def send_sidecar_message(writer: asyncio.StreamWriter, write_lock: asyncio.Lock, message: Dict[str, Any]):
+    async with write_lock:
+        writer.write(dumps(message).encode("utf-8") + b"\n")
+        await writer.drain()
+
+
+async def send_sidecar_event(writer: asyncio.StreamWriter, write_lock: asyncio.Lock, event: Dict[str, Any]):
+    try:
+        await send_sidecar_message(writer, write_lock, event)
+    except ConnectionError as err:
+        logger.warning(f"Error sending sidecar event: {err}")
+
+
+def broadcast_sidecar_event(event: Dict[str, Any]):
+    """Push an event to every connected worker, without waiting for slow readers"""
+    for writer, write_lock in list(SidecarConnections.items()):
+        if writer.is_closing():
+            continue
+        task = asyncio.create_task(send_sidecar_event(writer, write_lock, event))
+        _event_tasks.add(task)
+        task.add_done_callback(_event_tasks.discard)
+
+
+def notify_tools_changed(entry: ToolCatalogEntry):
+    """Tell the workers to fetch a server's tools again, e.g. after tools/list_changed"""
+    broadcast_sidecar_event({"event": "tools_changed", "server": entry.server_name})
+
+
+async def dispatch_sidecar_request(message: Dict[str, Any]) -> Any:
+    """Run one gateway worker request against the MCP servers owned by this process"""
+    method = message.get("method")
+    if method == "status":
+        return {
+            name: {**status, "replica_load": MCPServers[name].stats() if name in MCPServers else []}
+            for name, status in MCPServerStatus.items()
+        }
+
+    server_name = message.get("server")
+    is_ready = await ensure_mcp_server(server_name)
+    if method == "ensure":
+        return is_ready
+    if not is_ready:
+        raise RuntimeError(f"Server {server_name} is not available")
+
+    pool = MCPServers[server_name]
+    if method == "list_tools":
+        tools_response = await pool.list_tools()
+        return to_plain(tools_response.tools) if tools_response else []
+    if method == "call_tool":
+        return to_plain(await pool.call_tool(message.get("name"), message.get("arguments"), meta=message.get("meta")))
+    raise ValueError(f"Unknown sidecar method {method}")
+
+
+async def handle_sidecar_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Serve the requests of one gateway worker concurrently, until it disconnects"""
+    tasks: Dict[Any, asyncio.Task] = {}
+    write_lock = SidecarConnections[writer] = asyncio.Lock()
+
+    async def run_request(message: Dict[str, Any]):
+        request_id = message.get("id")
+        try:
+            response = {"id": request_id, "result": await dispatch_sidecar_request(message)}
+        except Exception as err:
+            response = {"id": request_id, "error": str(err) or type(err).__name__}
+        finally:
+            tasks.pop(request_id, None)
+        await send_sidecar_message(writer, write_lock, response)
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = loads(line)
+            if message.get("method") == "cancel":
+                task = tasks.get(message.get("request_id"))
+                if task is not None:
+                    task.cancel()
+                continue
+            tasks[message.get("id")] = asyncio.create_task(run_request(message))
+    except (ConnectionError, ValueError) as err:
+        logger.error(f"Sidecar connection error: {err}")
+    finally:
+        SidecarConnections.pop(writer, None)
+        for task in list(tasks.values()):
+            task.cancel()
+        writer.close()
+
+
+async def start_sidecar_server() -> asyncio.AbstractServer:
+    """Listen on the sidecar socket, readable and writable by the current user only"""
+    socket_path = SidecarConfig.get("socket_path")
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = await asyncio.start_unix_server(
+        handle_sidecar_connection,
+        socket_path,
+        limit=SidecarConfig.get("max_message_size", 64 * 1024 * 1024)
+    )
+    os.chmod(socket_path, 0o600)
+    add_catalog_listener(notify_tools_changed)
+    logger.info("Sidecar listening", extra={"fields": {"socket_path": socket_path}})
+    return server
@@ -0,0 +1,131 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+from src.client_and_server_config import LoggingConfig
+
+# Correlation ID of the request being handled, copied into every record logged for it
+RequestId: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_listener: Optional[QueueListener] = None
+_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue records for the listener thread, dropping them when the queue is full.
+
+    Unlike QueueHandler, records are not formatted here: formatting happens in the
+    listener thread, only the correlation ID is captured on the caller side.
+    """
+
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = RequestId.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full when stopping, the listener thread keeps draining it
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the `fields` passed in `extra` merged in"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Console friendly lines, the `fields` passed in `extra` appended as key=value"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record, '%Y-%m-%d %H:%M:%S')} {record.levelname} "
+        if getattr(record, "request_id", None):
+            line += f"[{record.request_id}] "
+        line += record.getMessage()
+        fields = getattr(record, "fields", None) or {}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def setup_logging():
+    """Route the root logger through the queue handler and start the listener thread"""
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if LoggingConfig.get("format", "json") == "json" else TextFormatter())
+
+    record_queue = queue.Queue(maxsize=LoggingConfig.get("queue_size", 10000))
+    _handler = NonBlockingQueueHandler(record_queue)
+    _listener = LogQueueListener(record_queue, stream_handler, respect_handler_level=True)
+
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(_handler)
+    root_logger.setLevel(LoggingConfig.get("level", "INFO"))
+
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Write out the queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_dropped_log_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+def log_payload(logger: logging.Logger, message: str, payload: Any):
+    """Log a large payload at DEBUG level for a sampled share of the calls, truncated"""
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= LoggingConfig.get("payload_sample_rate", 0.01):
+        return
+
+    max_chars = LoggingConfig.get("max_payload_chars", 2000)
+    encoded = json.dumps(payload, default=str, ensure_ascii=False)
+    if len(encoded) > max_chars:
+        encoded = f"{encoded[:max_chars]}... ({len(encoded) - max_chars} more chars)"
+    logger.debug(message, extra={"fields": {"payload": encoded}})
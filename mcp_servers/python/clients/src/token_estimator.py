@@ -0,0 +1,84 @@
+import hashlib
+import json
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from src.client_and_server_config import ContextWindowConfig
+
+# tiktoken is optional, without it tokens are estimated at about four characters each
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Fixed overhead of the role and separators of every chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Token counts of recently seen texts by (digest, model), least recently used first.
+# Short texts are cheaper to count again than to hash.
+TokenCounts: "OrderedDict[Tuple[bytes, str], int]" = OrderedDict()
+TOKEN_COUNTS_MAX_SIZE = 4096
+MIN_CACHED_TEXT_CHARS = 256
+
+
+def get_model_name(client_details: Dict[str, Any]) -> str:
+    """Model (or Azure deployment) answering the request"""
+    return client_details.get("chat_model") or client_details.get("deployment_id") or ""
+
+
+@lru_cache(maxsize=32)
+def get_encoder(model: str) -> Optional[Any]:
+    """tiktoken encoding of a model, loaded once per model. None when unknown to tiktoken."""
+    if tiktoken is None or not model:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return None
+
+
+def estimate_tokens(text: str, model: str = "") -> int:
+    """Token count of a text for a model.
+
+    Counts are cached, the history resent on every round of the tool loop is only counted once.
+    The cache is keyed on a digest of the text, so large tool results are not kept alive by it.
+    """
+    text = text or ""
+    encoder = get_encoder(model)
+    if encoder is None:
+        return (len(text) + 3) // 4
+    if len(text) < MIN_CACHED_TEXT_CHARS:
+        return len(encoder.encode(text, disallowed_special=()))
+
+    key = (hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest(), model)
+    token_count = TokenCounts.get(key)
+    if token_count is None:
+        token_count = TokenCounts[key] = len(encoder.encode(text, disallowed_special=()))
+        if len(TokenCounts) > TOKEN_COUNTS_MAX_SIZE:
+            TokenCounts.popitem(last=False)
+    else:
+        TokenCounts.move_to_end(key)
+    return token_count
+
+
+def get_context_window(model: str) -> int:
+    return ContextWindowConfig.get("models", {}).get(model, ContextWindowConfig.get("default_context_window", 128000))
+
+
+def estimate_request_tokens(client_details: Dict[str, Any]) -> int:
+    """Estimated input tokens of the next LLM call: system prompt, chat history and tool schemas"""
+    model = get_model_name(client_details)
+    total_tokens = estimate_tokens(client_details.get("prompt", ""), model) + MESSAGE_OVERHEAD_TOKENS
+    for message in client_details.get("chat_history") or []:
+        total_tokens += estimate_tokens(message.get("content") or "", model) + MESSAGE_OVERHEAD_TOKENS
+    if client_details.get("tools"):
+        total_tokens += estimate_tokens(json.dumps(client_details["tools"]), model)
+    return total_tokens
+
+
+def get_input_budget(model: str) -> int:
+    """Input tokens a request may use while leaving room for the minimum output"""
+    context_window = get_context_window(model)
+    safety_tokens = int(context_window * ContextWindowConfig.get("safety_margin", 0.05))
+    return context_window - safety_tokens - ContextWindowConfig.get("min_output_tokens", 256)
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolCatalogEntry:
+    server_name: str
+    version: int
+    tools: List[Dict[str, Any]] = field(default_factory=list)
+    fetched_at: float = 0.0
+    tool_names: Set[str] = field(default_factory=set)
+
+
+# Global tool catalog store, one entry per MCP server
+ToolCatalog: Dict[str, ToolCatalogEntry] = {}
+
+# Monotonic catalog version, bumped on every refresh of any server
+_catalog_version = 0
+_refresh_locks: Dict[str, asyncio.Lock] = {}
+_refresh_tasks: Set[asyncio.Task] = set()
+# Called with every new catalog entry, e.g. by the sidecar to notify the gateway workers
+_catalog_listeners: List[Callable[[ToolCatalogEntry], None]] = []
+
+# Tool names exposed by more than one selected server are namespaced as "<server_name>__<tool_name>"
+TOOL_NAMESPACE_SEPARATOR = "__"
+_tool_routes_cache: Dict[Tuple[Tuple[str, ...], int], Tuple[List[Dict[str, Any]], Dict[str, Dict[str, str]]]] = {}
+
+
+def build_tool_dict(tool: Any) -> Dict[str, Any]:
+    """Convert an MCP tool description into the function tool format sent to the LLMs"""
+    return {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": getattr(tool, "description", f"Tool for {tool.name}"),
+            "parameters": getattr(tool, "inputSchema", {
+                "type": "object",
+                "properties": {},
+                "required": []
+            })
+        }
+    }
+
+
+async def refresh_tool_catalog(server_name: str, session: Any) -> ToolCatalogEntry:
+    """Fetch the tools of a server and store them under a new catalog version"""
+    global _catalog_version
+
+    lock = _refresh_locks.setdefault(server_name, asyncio.Lock())
+    async with lock:
+        tools_response = await session.list_tools()
+        tools = [build_tool_dict(tool) for tool in tools_response.tools] if tools_response else []
+
+        _catalog_version += 1
+        entry = ToolCatalogEntry(
+            server_name=server_name,
+            version=_catalog_version,
+            tools=tools,
+            fetched_at=time.time(),
+            tool_names={tool["function"]["name"] for tool in tools}
+        )
+        ToolCatalog[server_name] = entry
+        for listener in _catalog_listeners:
+            listener(entry)
+        return entry
+
+
+def add_catalog_listener(listener: Callable[[ToolCatalogEntry], None]):
+    if listener not in _catalog_listeners:
+        _catalog_listeners.append(listener)
+
+
+def schedule_tool_catalog_refresh(server_name: str, session: Any):
+    """Refresh a server's catalog in the background, e.g. on a tools/list_changed notification"""
+    if session is None:
+        return
+
+    async def refresh():
+        try:
+            entry = await refresh_tool_catalog(server_name, session)
+            logger.info("Tool catalog refreshed", extra={"fields": {"server": server_name, "version": entry.version}})
+        except Exception as err:
+            logger.error(f"Error refreshing tool catalog: {err}", extra={"fields": {"server": server_name}})
+
+    task = asyncio.create_task(refresh())
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+def get_catalog_tools(server_name: str) -> Optional[List[Dict[str, Any]]]:
+    """Return the cached tools of a server, or None when it was never fetched"""
+    entry = ToolCatalog.get(server_name)
+    return list(entry.tools) if entry else None
+
+
+def is_catalog_tool(server_name: str, tool_name: str) -> bool:
+    """Whether a server's catalog has a tool, e.g. before using an LLM provided name as a metric label"""
+    entry = ToolCatalog.get(server_name)
+    return entry is not None and tool_name in entry.tool_names
+
+
+def get_tool_catalog_version(server_names: Optional[Iterable[str]] = None) -> int:
+    """Return the catalog version covering the given servers (all servers by default)"""
+    if server_names is None:
+        return _catalog_version
+    return max((ToolCatalog[name].version for name in server_names if name in ToolCatalog), default=0)
+
+
+def build_tool_routes(server_names: Iterable[str]) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, str]]]:
+    """Merge the catalogs of the given servers into one tool list and a tool name -> owning server index.
+
+    Names exposed by several servers are namespaced with their server name so every
+    tool the LLM can call maps back to exactly one server and tool.
+    """
+    server_names = tuple(server_names)
+    cache_key = (server_names, get_tool_catalog_version(server_names))
+    if cache_key in _tool_routes_cache:
+        tools_arr, tool_routes = _tool_routes_cache[cache_key]
+        return list(tools_arr), tool_routes
+
+    name_counts = Counter(
+        tool["function"]["name"]
+        for server_name in server_names
+        for tool in (get_catalog_tools(server_name) or [])
+    )
+
+    tools_arr = []
+    tool_routes = {}
+    for server_name in server_names:
+        for tool in get_catalog_tools(server_name) or []:
+            tool_name = tool["function"]["name"]
+            exposed_name = tool_name
+            if name_counts[tool_name] > 1:
+                exposed_name = f"{server_name}{TOOL_NAMESPACE_SEPARATOR}{tool_name}"
+                tool = {**tool, "function": {**tool["function"], "name": exposed_name}}
+
+            tool_routes[exposed_name] = {"server_name": server_name, "tool_name": tool_name}
+            tools_arr.append(tool)
+
+    # Older versions of the same selection can never be requested again
+    for key in [key for key in _tool_routes_cache if key[0] == server_names]:
+        del _tool_routes_cache[key]
+    _tool_routes_cache[cache_key] = (tools_arr, tool_routes)
+    return list(tools_arr), tool_routes
@@ -0,0 +1,89 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from src.client_and_server_config import ToolResultCacheConfig
+from src.json_codec import loads
+from src.ttl_cache import TTLCache
+
+# Argument keys carrying tenant credentials, replaced by the tenant hash in cache keys
+CREDENTIAL_ARGUMENT_KEYS = ("__credentials__", "server_credentials")
+
+ToolResultCache = TTLCache(max_size=ToolResultCacheConfig.get("max_size", 2048))
+
+
+def get_tool_result_ttl(server_name: str, tool_name: str) -> Optional[float]:
+    """Return the TTL of a read-only tool, or None for tools treated as mutating"""
+    server_config = ToolResultCacheConfig.get("servers", {}).get(server_name, {})
+    return server_config.get("read_only", {}).get(tool_name)
+
+
+def get_tenant_hash(credentials: Any) -> str:
+    """Stable short hash identifying the tenant owning a set of credentials"""
+    encoded = json.dumps(credentials or {}, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def get_tool_result_cache_key(server_name: str, tool_name: str, args: Dict[str, Any], credentials: Any) -> Tuple[str, str, str, str]:
+    """Cache key made of the server, tenant, tool and canonicalized arguments"""
+    canonical_args = json.dumps(
+        {key: value for key, value in args.items() if key not in CREDENTIAL_ARGUMENT_KEYS},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str
+    )
+    return (server_name, get_tenant_hash(credentials), tool_name, canonical_args)
+
+
+def get_cached_tool_result(server_name: str, tool_name: str, args: Dict[str, Any], credentials: Any) -> Tuple[Optional[Tuple], Any]:
+    """Return (cache key, cached result). The key is None when the tool is not cacheable."""
+    if not ToolResultCacheConfig.get("enabled", True) or get_tool_result_ttl(server_name, tool_name) is None:
+        return None, None
+
+    cache_key = get_tool_result_cache_key(server_name, tool_name, args, credentials)
+    return cache_key, ToolResultCache.get(cache_key)
+
+
+def is_error_payload(payload: Any) -> bool:
+    """Whether a tool payload reports a failure, e.g. {"error": ..., "status": False} or an HTTP error status"""
+    if not isinstance(payload, dict):
+        return False
+    if payload.get("isError") or payload.get("error") or payload.get("errors"):
+        return True
+    if payload.get("status") is False or payload.get("status") == "error" or payload.get("success") is False:
+        return True
+    status_code = payload.get("status_code", payload.get("statusCode"))
+    return isinstance(status_code, int) and status_code >= 400
+
+
+def is_error_result(tool_call_result: Any) -> bool:
+    """Whether an MCP tool result, or the JSON payload in one of its text items, reports a failure"""
+    if not isinstance(tool_call_result, dict):
+        # Failed calls come back as error strings
+        return True
+    if is_error_payload(tool_call_result):
+        return True
+    for item in tool_call_result.get("content") or []:
+        text = item.get("text") if isinstance(item, dict) else None
+        if not isinstance(text, str) or text[:1] != "{":
+            continue
+        try:
+            if is_error_payload(loads(text)):
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def store_tool_result(cache_key: Tuple, tool_call_result: Any):
+    """Cache a successful read-only tool result under its TTL"""
+    if is_error_result(tool_call_result):
+        return
+    server_name, _, tool_name, _ = cache_key
+    ToolResultCache.set(cache_key, tool_call_result, ttl=get_tool_result_ttl(server_name, tool_name))
+
+
+def invalidate_tool_results(server_name: str, credentials: Any) -> int:
+    """Drop the cached results of a server for one tenant after a mutating call"""
+    tenant_hash = get_tenant_hash(credentials)
+    return ToolResultCache.invalidate(lambda key: key[0] == server_name and key[1] == tenant_hash)
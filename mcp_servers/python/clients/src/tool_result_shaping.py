@@ -0,0 +1,102 @@
+from typing import Any, Optional, Tuple
+
+from src.client_and_server_config import ToolResultShapingConfig
+from src.json_codec import dumps, loads
+from src.token_estimator import estimate_tokens
+
+_OMISSION_MARKER = "... "
+
+
+def sample_array(items: list, head: int, tail: int) -> list:
+    """Keep the first and last items of a long array with a marker counting the omitted ones"""
+    if len(items) <= head + tail:
+        return items
+    omitted = len(items) - head - tail
+    return items[:head] + [f"{_OMISSION_MARKER}{omitted} more items omitted, {len(items)} in total ..."] + items[len(items) - tail:]
+
+
+def decode_embedded_json(value: Any) -> Any:
+    """Recursively decode JSON documents embedded in strings"""
+    if isinstance(value, list):
+        return [decode_embedded_json(item) for item in value]
+    if isinstance(value, dict):
+        return {key: decode_embedded_json(item) for key, item in value.items()}
+    if isinstance(value, str) and value[:1] in ("{", "["):
+        # MCP servers return their JSON payload as the text of a content item
+        try:
+            return decode_embedded_json(loads(value))
+        except ValueError:
+            return value
+    return value
+
+
+def shape_value(value: Any, head: int, tail: int) -> Any:
+    """Recursively sample the long arrays of a value"""
+    if isinstance(value, list):
+        return [shape_value(item, head, tail) for item in sample_array(value, head, tail)]
+    if isinstance(value, dict):
+        return {key: shape_value(item, head, tail) for key, item in value.items()}
+    return value
+
+
+def encode_tables(value: Any, min_rows: int) -> Any:
+    """Recursively re-encode arrays of identically-keyed objects as a header and rows"""
+    if isinstance(value, dict):
+        return {key: encode_tables(item, min_rows) for key, item in value.items()}
+    if not isinstance(value, list):
+        return value
+
+    records = [item for item in value if isinstance(item, dict)]
+    # Omission markers left by sampling are kept as rows of their own
+    others = [item for item in value if not isinstance(item, dict)]
+    is_homogeneous = (
+        len(records) >= min_rows
+        and all(isinstance(item, str) and item.startswith(_OMISSION_MARKER) for item in others)
+        and all(item.keys() == records[0].keys() for item in records)
+    )
+    if not is_homogeneous:
+        return [encode_tables(item, min_rows) for item in value]
+
+    columns = list(records[0].keys())
+    return {
+        "columns": columns,
+        "rows": [
+            [encode_tables(item[column], min_rows) for column in columns] if isinstance(item, dict) else item
+            for item in value
+        ]
+    }
+
+
+def shape_tool_result(tool_call_result: Any, full_text: Optional[str] = None) -> Tuple[str, int]:
+    """Return the LLM view of a tool result and the tokens saved compared to the full result.
+
+    `full_text` is the already encoded result, when the caller has it.
+    """
+    if full_text is None:
+        full_text = dumps(tool_call_result)
+    if not ToolResultShapingConfig.get("enabled", True):
+        return full_text, 0
+
+    max_tokens = ToolResultShapingConfig.get("max_result_tokens", 4000)
+    is_over_budget = estimate_tokens(full_text) > max_tokens
+    is_tabular = ToolResultShapingConfig.get("tabular_arrays", True)
+    if not is_over_budget and not is_tabular:
+        return full_text, 0
+
+    view = decode_embedded_json(tool_call_result)
+    if is_over_budget:
+        view = shape_value(view, ToolResultShapingConfig.get("array_head", 10), ToolResultShapingConfig.get("array_tail", 3))
+    if is_tabular:
+        view = encode_tables(view, ToolResultShapingConfig.get("tabular_min_rows", 3))
+    shaped_text = dumps(view)
+
+    # Hard cap for results that are still too large once sampled, e.g. one huge text field
+    max_chars = max_tokens * 4
+    if len(shaped_text) > max_chars:
+        shaped_text = f"{shaped_text[:max_chars]}... [truncated {len(shaped_text) - max_chars} characters]"
+
+    tokens_saved = estimate_tokens(full_text) - estimate_tokens(shaped_text)
+    if tokens_saved <= 0:
+        # Nothing to gain, keep the result exactly as the tool returned it
+        return full_text, 0
+    return shaped_text, tokens_saved
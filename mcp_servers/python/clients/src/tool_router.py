@@ -0,0 +1,212 @@
+import hashlib
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.client_and_server_config import RouterCacheConfig, ToolRouterConfig
+from src.json_codec import dumps
+from src.ttl_cache import TTLCache
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_CAMEL_CASE_PATTERN = re.compile(r"([a-z0-9])([A-Z])")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+_STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "give", "has", "have",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "please", "show", "that", "the", "this",
+    "to", "was", "what", "which", "with", "you", "your", "all", "tell", "about", "some",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a text, splitting snake_case and camelCase identifiers"""
+    text = _CAMEL_CASE_PATTERN.sub(r"\1 \2", text or "")
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if len(token) < 2 or token in _STOP_WORDS:
+            continue
+        # Cheap plural folding so "incidents" matches "incident"
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@dataclass
+class RouterDecision:
+    is_function_call: bool
+    selected_tools: List[str] = field(default_factory=list)
+    confidence: float = 0.0
+    source: str = "llm"
+
+    def to_extracted_result(self) -> Dict[str, Any]:
+        """Return the decision in the extract_data_from_response format"""
+        return {
+            "isFunctionCall": self.is_function_call,
+            "selectedTools": self.selected_tools,
+        }
+
+
+class BM25ToolIndex:
+    """BM25 index over the name, description and parameter names of function tools"""
+
+    def __init__(self, tools: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.tool_names: List[str] = []
+        self.term_frequencies: List[Counter] = []
+        self.document_lengths: List[int] = []
+
+        for tool in tools:
+            function = tool.get("function", {})
+            name = function.get("name", "")
+            parameters = (function.get("parameters") or {}).get("properties", {}) or {}
+
+            # The tool name is the strongest signal, so it is counted twice
+            terms = tokenize(name) * 2 + tokenize(function.get("description") or "")
+            for parameter_name, parameter in parameters.items():
+                terms += tokenize(parameter_name)
+                if isinstance(parameter, dict):
+                    terms += tokenize(parameter.get("description") or "")
+
+            self.tool_names.append(name)
+            self.term_frequencies.append(Counter(terms))
+            self.document_lengths.append(len(terms))
+
+        document_count = len(self.tool_names)
+        self.average_length = (sum(self.document_lengths) / document_count) if document_count else 0.0
+
+        document_frequencies = Counter(term for frequencies in self.term_frequencies for term in frequencies)
+        self.idf = {
+            term: math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    def score(self, query_tokens: List[str]) -> List[Tuple[str, float]]:
+        """Return (tool name, BM25 score) pairs sorted by descending score"""
+        scores = []
+        for name, frequencies, length in zip(self.tool_names, self.term_frequencies, self.document_lengths):
+            score = 0.0
+            for token in query_tokens:
+                frequency = frequencies.get(token, 0)
+                if not frequency:
+                    continue
+                normalization = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+                score += self.idf[token] * frequency * (self.k1 + 1) / (frequency + normalization)
+            scores.append((name, score))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores
+
+    def coverage(self, query_tokens: List[str]) -> float:
+        """Share of the query tokens known to the index"""
+        if not query_tokens:
+            return 0.0
+        return sum(1 for token in query_tokens if token in self.idf) / len(query_tokens)
+
+
+class ToolRouter(ABC):
+    """Base class of local tool routers. Returning None defers the decision to the LLM router."""
+
+    @abstractmethod
+    def route(self, user_input: str, tools: List[Dict[str, Any]], index_key: Any = None) -> Optional[RouterDecision]:
+        ...
+
+
+class BM25ToolRouter(ToolRouter):
+    def __init__(self):
+        # Indexes are precomputed once per (selected servers, catalog version)
+        self.indexes: Dict[Any, BM25ToolIndex] = {}
+
+    def get_index(self, tools: List[Dict[str, Any]], index_key: Any = None) -> BM25ToolIndex:
+        if index_key is None:
+            return BM25ToolIndex(tools)
+        if index_key not in self.indexes:
+            # Keep only the newest index of a server selection
+            if isinstance(index_key, tuple):
+                for key in [key for key in self.indexes if isinstance(key, tuple) and key[0] == index_key[0]]:
+                    del self.indexes[key]
+            self.indexes[index_key] = BM25ToolIndex(tools)
+        return self.indexes[index_key]
+
+    def route(self, user_input: str, tools: List[Dict[str, Any]], index_key: Any = None) -> Optional[RouterDecision]:
+        if not tools:
+            return None
+
+        index = self.get_index(tools, index_key)
+        query_tokens = tokenize(user_input)
+        scores = index.score(query_tokens)
+        top_score = scores[0][1] if scores else 0.0
+        if top_score < ToolRouterConfig.get("min_score", 1.0):
+            return None
+
+        confidence = index.coverage(query_tokens)
+        if confidence < ToolRouterConfig.get("min_confidence", 0.5):
+            return None
+
+        relative_score = ToolRouterConfig.get("relative_score", 0.5)
+        selected_tools = [
+            name for name, score in scores[:ToolRouterConfig.get("max_tools", 5)]
+            if score >= top_score * relative_score
+        ]
+        return RouterDecision(
+            is_function_call=True,
+            selected_tools=selected_tools,
+            confidence=round(confidence, 3),
+            source="bm25"
+        )
+
+
+# Registered local routers, selected with ToolRouterConfig["local_router"]
+ToolRouters: Dict[str, ToolRouter] = {
+    "bm25": BM25ToolRouter(),
+}
+
+
+def route_tools_locally(user_input: str, tools: List[Dict[str, Any]], index_key: Any = None) -> Optional[RouterDecision]:
+    """Try the configured local router, returning None when the LLM router must decide"""
+    if ToolRouterConfig.get("mode", "hybrid") != "hybrid":
+        return None
+
+    router = ToolRouters.get(ToolRouterConfig.get("local_router", "bm25"))
+    if router is None:
+        return None
+    return router.route(user_input, tools, index_key)
+
+
+# Parsed tool-selection decisions, so repeated intents skip the tool-selection LLM call
+RouterDecisionCache = TTLCache(
+    max_size=RouterCacheConfig.get("max_size", 1024),
+    ttl=RouterCacheConfig.get("ttl", 600.0)
+)
+
+
+def normalize_router_input(user_input: str) -> str:
+    """Lowercase the input, collapse whitespace and drop trailing punctuation"""
+    return _WHITESPACE_PATTERN.sub(" ", (user_input or "").lower()).strip().rstrip("?!.")
+
+
+def get_history_digest(chat_history: Optional[List[Dict[str, Any]]]) -> str:
+    """Digest of the conversation before the current input, empty for a new conversation"""
+    if not chat_history:
+        return ""
+    encoded = dumps([(message.get("role"), message.get("content")) for message in chat_history])
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def get_router_cache_key(
+    user_input: str,
+    selected_servers: Iterable[str],
+    catalog_version: int,
+    prior_history: Optional[List[Dict[str, Any]]] = None
+) -> Optional[Tuple]:
+    """Return the decision cache key of a request, or None when the cache is disabled.
+
+    The prior history is part of the key, the LLM decides on short follow-ups ("yes",
+    "do the second one") from the conversation they belong to.
+    """
+    if not RouterCacheConfig.get("enabled", True):
+        return None
+    return (normalize_router_input(user_input), tuple(sorted(selected_servers)), catalog_version, get_history_digest(prior_history))
@@ -0,0 +1,253 @@
+import asyncio
+import atexit
+import logging
+import os
+import queue
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import httpx
+
+from src.client_and_server_config import TracingConfig
+from src.json_codec import dumps
+from src.structured_logging import LogQueueListener, NonBlockingQueueHandler
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Environment variables telling the MCP servers where to write their spans and when to rotate
+TRACE_DIR_ENV = "MCP_TRACE_DIR"
+TRACE_MAX_BYTES_ENV = "MCP_TRACE_MAX_BYTES"
+TRACE_BACKUP_COUNT_ENV = "MCP_TRACE_BACKUP_COUNT"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def to_otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": to_otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes = dict(attributes)
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+        self.status_code = STATUS_OK
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        self.status_code = STATUS_ERROR
+        self.status_message = message
+
+    @property
+    def traceparent(self) -> str:
+        """W3C trace context header of this span"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns or time.time_ns()),
+            "attributes": to_otlp_attributes(self.attributes),
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+class OtlpJsonFormatter(logging.Formatter):
+    """One OTLP JSON export request per line, encoded in the writer thread"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return dumps(record.msg)
+
+
+class SpanFileWriter:
+    """Append export requests to this process' rotated span file from a background thread.
+
+    Every process (gateway workers, sidecar, MCP servers) has its own file, so lines of
+    concurrent writers never interleave. Requests beyond queue_size are dropped.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.pid = os.getpid()
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        file_handler = RotatingFileHandler(
+            file_path,
+            maxBytes=TracingConfig.get("max_file_bytes", 50 * 1024 * 1024),
+            backupCount=TracingConfig.get("backup_count", 3),
+            encoding="utf-8"
+        )
+        file_handler.setFormatter(OtlpJsonFormatter())
+        self.handler = NonBlockingQueueHandler(queue.Queue(maxsize=TracingConfig.get("queue_size", 10000)))
+        self.listener = LogQueueListener(self.handler.queue, file_handler)
+        self.listener.start()
+
+    def write(self, export_request: Dict[str, Any]):
+        self.handler.handle(logging.makeLogRecord({"msg": export_request}))
+
+    def stop(self):
+        self.listener.stop()
+
+
+def get_span_file_path(service_name: str) -> str:
+    return os.path.join(os.path.abspath(TracingConfig["file_dir"]), f"{service_name}-{os.getpid()}.jsonl")
+
+
+class SpanExporter:
+    """Batch finished spans and export them as OTLP JSON export requests.
+
+    A batch is flushed when it is full or when a root span ends, so a request's
+    trace is written as soon as the request completes.
+    """
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.writer: Optional[SpanFileWriter] = None
+        self.post_tasks: Set[asyncio.Task] = set()
+
+    def export(self, span: Span):
+        self.spans.append(span)
+        if span.parent_span_id is None or len(self.spans) >= TracingConfig.get("max_batch_size", 64):
+            self.flush()
+
+    def build_request(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": to_otlp_attributes({"service.name": TracingConfig.get("service_name", "mcp-gateway")})},
+                "scopeSpans": [{"scope": {"name": "mcp-gateway.tracing"}, "spans": [span.to_otlp() for span in spans]}]
+            }]
+        }
+
+    def flush(self):
+        if not self.spans:
+            return
+        spans, self.spans = self.spans, []
+        export_request = self.build_request(spans)
+
+        if TracingConfig.get("file_dir"):
+            writer = self.get_writer()
+            if writer is not None:
+                writer.write(export_request)
+
+        if TracingConfig.get("otlp_endpoint"):
+            try:
+                task = asyncio.get_running_loop().create_task(self.post(export_request))
+            except RuntimeError:
+                return
+            self.post_tasks.add(task)
+            task.add_done_callback(self.post_tasks.discard)
+
+    def get_writer(self) -> Optional[SpanFileWriter]:
+        # Started on first use, so every forked worker process opens a file of its own
+        if self.writer is None or self.writer.pid != os.getpid():
+            try:
+                self.writer = SpanFileWriter(get_span_file_path(TracingConfig.get("service_name", "mcp-gateway")))
+            except OSError as err:
+                logger.error(f"Error opening the span file: {err}")
+                return None
+        return self.writer
+
+    def stop(self):
+        """Write out the pending spans and stop the writer thread"""
+        self.flush()
+        if self.writer is not None and self.writer.pid == os.getpid():
+            self.writer.stop()
+        self.writer = None
+
+    async def post(self, export_request: Dict[str, Any]):
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(timeout=10.0)
+        try:
+            await self.http_client.post(TracingConfig["otlp_endpoint"], json=export_request)
+        except httpx.HTTPError as err:
+            logger.error(f"Error exporting spans to {TracingConfig['otlp_endpoint']}: {err}")
+
+
+Exporter = SpanExporter()
+atexit.register(Exporter.stop)
+
+
+@contextmanager
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes) -> Iterator[Optional[Span]]:
+    """Open a child span of the current span (or a new trace) for the duration of the block.
+
+    Yields None when tracing is disabled. The span is current for the block and for
+    the tasks started from it, since asyncio tasks copy the context they are created in.
+    """
+    if not TracingConfig.get("enabled", False):
+        yield None
+        return
+
+    parent = _current_span.get()
+    span = Span(
+        name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        parent_span_id=parent.span_id if parent else None,
+        kind=kind,
+        attributes=attributes
+    )
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as err:
+        span.set_error(str(err) or type(err).__name__)
+        raise
+    finally:
+        span.end_time_ns = time.time_ns()
+        _current_span.reset(token)
+        Exporter.export(span)
+
+
+def get_trace_meta() -> Optional[Dict[str, str]]:
+    """`_meta` entries propagating the current trace context to an MCP server"""
+    span = _current_span.get()
+    return {"traceparent": span.traceparent} if span is not None else None
+
+
+def get_server_trace_env() -> Dict[str, str]:
+    """Environment of the MCP server processes, pointing them at the span directory"""
+    if not TracingConfig.get("enabled", False) or not TracingConfig.get("file_dir"):
+        return {}
+    return {
+        TRACE_DIR_ENV: os.path.abspath(TracingConfig["file_dir"]),
+        TRACE_MAX_BYTES_ENV: str(TracingConfig.get("max_file_bytes", 50 * 1024 * 1024)),
+        TRACE_BACKUP_COUNT_ENV: str(TracingConfig.get("backup_count", 3))
+    }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The gateway modules are imported as `src.<module>`, relative to the clients directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from src.admission_control import AdmissionLimiters, AdmissionRejected, ConcurrencyLimiter, admission, get_admission_stats, get_limiter
+from src.client_and_server_config import AdmissionControlConfig
+
+
+@pytest.fixture(autouse=True)
+def empty_limiters():
+    AdmissionLimiters.clear()
+    yield
+    AdmissionLimiters.clear()
+
+
+def test_free_slot_is_taken_immediately():
+    async def scenario():
+        limiter = ConcurrencyLimiter("server", "s", max_concurrent=2, max_queue=0)
+        await limiter.acquire(timeout=1.0)
+        await limiter.acquire(timeout=1.0)
+        assert limiter.active == 2
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire(timeout=1.0)
+        assert rejected.value.reason == "queue_full"
+        limiter.release()
+        assert limiter.active == 1
+
+    asyncio.run(scenario())
+
+
+def test_waiter_times_out():
+    async def scenario():
+        limiter = ConcurrencyLimiter("provider", "p", max_concurrent=1, max_queue=1)
+        await limiter.acquire(timeout=1.0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire(timeout=0.01)
+        assert rejected.value.reason == "timeout"
+        assert limiter.waiting == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiter_gets_released_slot():
+    async def scenario():
+        limiter = ConcurrencyLimiter("provider", "p", max_concurrent=1, max_queue=1)
+        await limiter.acquire(timeout=1.0)
+        waiter = asyncio.create_task(limiter.acquire(timeout=1.0))
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        limiter.release()
+        await waiter
+        assert (limiter.active, limiter.waiting) == (1, 0)
+
+    asyncio.run(scenario())
+
+
+def test_idle_tenant_limiters_are_dropped(monkeypatch):
+    monkeypatch.setitem(AdmissionControlConfig, "enabled", True)
+
+    async def scenario():
+        async with admission("tenant", "t1"):
+            async with admission("provider", "openai"):
+                assert set(AdmissionLimiters) == {("tenant", "t1"), ("provider", "openai")}
+                stats = get_admission_stats()
+                assert {"scope": "tenant", "key": "*", "active": 1, "waiting": 0, "tenants": 1} in stats
+        assert set(AdmissionLimiters) == {("provider", "openai")}
+
+    asyncio.run(scenario())
+
+
+def test_per_key_limits_override_defaults(monkeypatch):
+    monkeypatch.setitem(AdmissionControlConfig, "server", {
+        "default": {"max_concurrent": 8, "max_queue": 32},
+        "MCP-PINGDOM": {"max_concurrent": 2}
+    })
+    limiter = get_limiter("server", "MCP-PINGDOM")
+    assert (limiter.max_concurrent, limiter.max_queue) == (2, 32)
+
+
+def test_disabled_admission_takes_no_slot(monkeypatch):
+    monkeypatch.setitem(AdmissionControlConfig, "enabled", False)
+
+    async def scenario():
+        async with admission("tenant", "t1"):
+            assert AdmissionLimiters == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,220 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("mcp")
+pytest.importorskip("httpx")
+
+from src import client_and_server_execution
+from src.admission_control import AdmissionLimiters, AdmissionRejected
+from src.client_and_server_config import ContextWindowConfig, RouterCacheConfig, ToolResultCacheConfig, ToolRouterConfig
+from src.client_and_server_execution import (
+    ClientAndServerExecutionResponse,
+    client_and_server_execution as run_request,
+    execute_tool_calls,
+    prepare_llm_call,
+)
+from src.llm.adapters import ChatCompletionAdapter, LlmAdapters
+from src.tool_catalog import ToolCatalog, build_tool_routes, refresh_tool_catalog
+
+
+class FakeServerPool:
+    """Stands in for an MCPServerPool, recording the calls it receives"""
+
+    def __init__(self, tool_names, delays=None, errors=None):
+        self.tool_names = tool_names
+        self.delays = delays or {}
+        self.errors = errors or {}
+        self.calls = []
+        self.cancelled = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=[SimpleNamespace(name=name, description=f"Tool {name}", inputSchema={}) for name in self.tool_names])
+
+    async def call_tool(self, name, arguments=None, meta=None):
+        self.calls.append((name, arguments))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(name, 0))
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+        finally:
+            self.in_flight -= 1
+        if name in self.errors:
+            raise self.errors[name]
+        return {"content": [{"type": "text", "text": f"{name} result"}], "isError": False}
+
+
+class ScriptedAdapter(ChatCompletionAdapter):
+    """Chat completion adapter whose processor replays canned LLM responses"""
+
+    def __init__(self, responses):
+        super().__init__("MCP_CLIENT_TEST", self.process)
+        self.responses = list(responses)
+
+    async def process(self, client_details, on_delta=None):
+        assert self.responses, "Unexpected LLM call"
+        final_llm_response, messages = self.responses.pop(0)
+        output_type = "tool_call" if self.get_tool_calls(final_llm_response) else "text"
+        return SimpleNamespace(Status=True, Error=None, Data={
+            "total_tokens": 10,
+            "total_input_tokens": 8,
+            "total_output_tokens": 2,
+            "final_llm_response": final_llm_response,
+            "messages": messages,
+            "output_type": output_type,
+        })
+
+
+def router_response(tool_names):
+    return {}, [f"<function_call>TRUE</function_call><selected_tools>{','.join(tool_names)}</selected_tools>"]
+
+
+def tool_call_response(*tool_names):
+    tool_calls = [
+        {"id": f"call_{index}", "type": "function", "function": {"name": name, "arguments": json.dumps({"index": index})}}
+        for index, name in enumerate(tool_names)
+    ]
+    return {"choices": [{"message": {"role": "assistant", "content": None, "tool_calls": tool_calls}}]}, [None]
+
+
+def text_response(text):
+    return {"choices": [{"message": {"role": "assistant", "content": text}}]}, [text]
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    """Install fake server pools in MCPServers, with result caching and admission state reset"""
+    monkeypatch.setitem(ToolResultCacheConfig, "enabled", False)
+    monkeypatch.setitem(RouterCacheConfig, "enabled", False)
+    monkeypatch.setitem(ToolRouterConfig, "mode", "llm")
+    AdmissionLimiters.clear()
+
+    def install(**pools):
+        for server_name, pool in pools.items():
+            monkeypatch.setitem(client_and_server_execution.MCPServers, server_name, pool)
+        return pools
+
+    yield install
+    AdmissionLimiters.clear()
+
+
+def build_payload(adapter, monkeypatch, server_names, **client_details):
+    monkeypatch.setitem(LlmAdapters, adapter.name, adapter)
+    for server_name in server_names:
+        monkeypatch.delitem(ToolCatalog, server_name, raising=False)
+        asyncio.run(refresh_tool_catalog(server_name, client_and_server_execution.MCPServers[server_name]))
+    tools, tool_routes = build_tool_routes(server_names)
+    return {
+        "selected_client": adapter.name,
+        "selected_servers": list(server_names),
+        "selected_server_credentials": {},
+        "client_details": {"input": "qqq", "prompt": "You are a test assistant", "chat_model": "", "tools": tools, **client_details},
+        "tool_routes": tool_routes,
+    }
+
+
+@pytest.fixture
+def small_window(monkeypatch):
+    monkeypatch.setitem(ContextWindowConfig, "models", {"test-model": 2000})
+    monkeypatch.setitem(ContextWindowConfig, "min_output_tokens", 256)
+    monkeypatch.setitem(ContextWindowConfig, "safety_margin", 0.05)
+
+
+def prepare(client_details):
+    prepare_llm_call(client_details, ClientAndServerExecutionResponse())
+    return client_details["max_tokens"]
+
+
+def test_small_requested_max_tokens_is_kept(small_window):
+    assert prepare({"chat_model": "test-model", "prompt": "hi", "chat_history": [], "max_tokens": 100}) == 100
+
+
+def test_nearly_full_window_gets_min_output_tokens(small_window):
+    # About 1700 prompt tokens leave less than min_output_tokens of the 2000 token window
+    client_details = {"chat_model": "test-model", "prompt": "x" * 6800, "chat_history": [], "max_tokens": 1000}
+    assert prepare(client_details) == 256
+    assert prepare({**client_details, "max_tokens": 100, "requested_max_tokens": 100}) == 100
+
+
+def test_missing_max_tokens_defaults_within_window(small_window):
+    assert prepare({"chat_model": "test-model", "prompt": "hi", "chat_history": []}) == 1000
+    assert prepare({"chat_model": "test-model", "prompt": "x" * 4000, "chat_history": []}) == 2000 - 1004 - 100
+
+
+def test_tool_results_keep_the_call_order(servers):
+    pool = servers(A=FakeServerPool(["slow", "medium", "fast"], delays={"slow": 0.06, "medium": 0.03}))["A"]
+    tool_calls = [{"id": f"call_{name}", "name": name, "arguments": {}} for name in ("slow", "medium", "fast")]
+    client_details = {"chat_history": []}
+    result = ClientAndServerExecutionResponse()
+
+    asyncio.run(execute_tool_calls("A", {}, tool_calls, client_details, result))
+
+    assert pool.max_in_flight == 3
+    assert [call["name"] for call in result.Data["executed_tool_calls"]] == ["slow", "medium", "fast"]
+    assert [message["content"].split(" and ")[0] for message in client_details["chat_history"]] == [
+        "Executed tool: slow", "Executed tool: medium", "Executed tool: fast"
+    ]
+
+
+def test_failed_call_cancels_its_siblings(servers):
+    rejected = AdmissionRejected("server", "A", "queue_full")
+    pool = servers(A=FakeServerPool(["shed", "slow"], delays={"slow": 5.0}, errors={"shed": rejected}))["A"]
+    tool_calls = [{"id": "call_0", "name": "slow", "arguments": {}}, {"id": "call_1", "name": "shed", "arguments": {}}]
+    result = ClientAndServerExecutionResponse()
+
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(execute_tool_calls("A", {}, tool_calls, {"chat_history": []}, result))
+
+    assert pool.cancelled == ["slow"]
+    assert result.Data["executed_tool_calls"] == []
+
+
+def test_namespaced_tool_is_routed_to_its_server(servers, monkeypatch):
+    pools = servers(A=FakeServerPool(["search", "list_a"]), B=FakeServerPool(["search"]))
+    adapter = ScriptedAdapter([
+        router_response(["A__search", "B__search", "list_a"]),
+        tool_call_response("B__search", "list_a", "A__search"),
+        text_response("done"),
+    ])
+    payload = build_payload(adapter, monkeypatch, ["A", "B"])
+    assert {tool["function"]["name"] for tool in payload["client_details"]["tools"]} == {"A__search", "B__search", "list_a"}
+
+    result = asyncio.run(run_request(payload))
+
+    assert result.Status, result.Error
+    assert result.Data["messages"] == ["done"]
+    assert sorted(pools["A"].calls, key=lambda call: call[0]) == [("list_a", {"index": 1}), ("search", {"index": 2})]
+    assert pools["B"].calls == [("search", {"index": 0})]
+    assert [call["name"] for call in result.Data["executed_tool_calls"]] == ["B__search", "list_a", "A__search"]
+
+
+def test_deadline_returns_partial_result(servers, monkeypatch):
+    pool = servers(A=FakeServerPool(["hang"], delays={"hang": 5.0}))["A"]
+    adapter = ScriptedAdapter([router_response(["hang"]), tool_call_response("hang")])
+    payload = build_payload(adapter, monkeypatch, ["A"], request_timeout=0.2)
+
+    result = asyncio.run(run_request(payload))
+
+    assert not result.Status
+    assert result.Error == "Request deadline of 0.2s exceeded, returning partial result"
+    assert result.Data["total_llm_calls"] == 2
+    assert pool.cancelled == ["hang"]
+
+
+def test_tool_rounds_are_capped(servers, monkeypatch):
+    pool = servers(A=FakeServerPool(["lookup"]))["A"]
+    adapter = ScriptedAdapter([router_response(["lookup"])] + [tool_call_response("lookup")] * 3)
+    payload = build_payload(adapter, monkeypatch, ["A"], max_tool_rounds=2)
+
+    result = asyncio.run(run_request(payload))
+
+    assert not result.Status
+    assert result.Error == "Stopped after 2 tool rounds without a final answer"
+    assert len(pool.calls) == 2
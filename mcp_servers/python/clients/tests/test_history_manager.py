@@ -0,0 +1,76 @@
+import pytest
+
+from src.client_and_server_config import HistoryBudgetConfig
+from src.history_manager import compact_chat_history, get_protected_indexes, trim_chat_history
+
+
+def tool_message(name, size):
+    return {"role": "assistant", "content": f"Executed tool: {name} and the result is: " + "x" * size}
+
+
+def build_client_details():
+    return {
+        "prompt": "You are a helpful assistant",
+        "chat_model": "",
+        "chat_history": [
+            {"role": "user", "content": "list my incidents"},
+            {"role": "assistant", "content": "calling tools"},
+            tool_message("get_incidents", 4000),
+            tool_message("get_errors", 4000),
+            {"role": "user", "content": "and the errors?"},
+            {"role": "assistant", "content": "calling tools"},
+            tool_message("get_errors", 4000),
+        ]
+    }
+
+
+@pytest.fixture
+def history_config(monkeypatch):
+    monkeypatch.setitem(HistoryBudgetConfig, "keep_last_messages", 2)
+    monkeypatch.setitem(HistoryBudgetConfig, "preview_chars", 100)
+    return HistoryBudgetConfig
+
+
+def test_protected_indexes_include_last_messages_and_latest_user_input():
+    chat_history = build_client_details()["chat_history"]
+    assert get_protected_indexes(chat_history, keep_last=2) == {4, 5, 6}
+
+
+def test_history_within_budget_is_untouched(history_config):
+    client_details = build_client_details()
+    assert compact_chat_history(client_details, budget=100000) == 0
+    assert client_details == build_client_details()
+
+
+def test_compaction_elides_oldest_tool_results_first(history_config):
+    client_details = build_client_details()
+    tokens_saved = compact_chat_history(client_details, budget=2500)
+    chat_history = client_details["chat_history"]
+    assert tokens_saved > 0
+    assert "[earlier result elided" in chat_history[2]["content"]
+    assert chat_history[2]["content"].startswith("Executed tool: get_incidents and the result is: ")
+    # One elided result is enough to fit, the newer one and the protected tail are kept verbatim
+    assert chat_history[3] == tool_message("get_errors", 4000)
+    assert chat_history[6] == tool_message("get_errors", 4000)
+
+
+def test_compaction_does_not_elide_twice(history_config):
+    client_details = build_client_details()
+    compact_chat_history(client_details, budget=10)
+    compacted = [dict(message) for message in client_details["chat_history"]]
+    assert compact_chat_history(client_details, budget=10) == 0
+    assert client_details["chat_history"] == compacted
+
+
+def test_compaction_disabled(history_config, monkeypatch):
+    monkeypatch.setitem(HistoryBudgetConfig, "enabled", False)
+    assert compact_chat_history(build_client_details()) == 0
+
+
+def test_trim_drops_oldest_unprotected_messages(history_config):
+    client_details = build_client_details()
+    tokens_saved = trim_chat_history(client_details, budget=1200)
+    chat_history = client_details["chat_history"]
+    assert tokens_saved > 0
+    assert chat_history[-3:] == build_client_details()["chat_history"][-3:]
+    assert len(chat_history) < 7
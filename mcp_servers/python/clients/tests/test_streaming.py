@@ -0,0 +1,124 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from src.json_codec import dumps
+from src.llm import gemini
+from src.llm.adapters import LlmAdapters
+from src.llm.streaming import ChatCompletionStreamAccumulator, GeminiStreamAccumulator, iter_sse_events
+
+
+class FakeResponse:
+    def __init__(self, lines):
+        self.lines = lines
+
+        self.is_error = False
+
+    async def aiter_lines(self):
+        for line in self.lines:
+            yield line
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeStreamingClient:
+    def __init__(self, chunks):
+        self.lines = [f"data: {dumps(chunk)}" for chunk in chunks]
+
+    @asynccontextmanager
+    async def stream(self, method, url, **kwargs):
+        yield FakeResponse(self.lines)
+
+
+def test_iter_sse_events_stops_at_done():
+    response = FakeResponse([": keep-alive", 'data: {"a": 1}', "", "data:", 'data: {"a": 2}', "data: [DONE]", 'data: {"a": 3}'])
+
+    async def collect():
+        return [event async for event in iter_sse_events(response)]
+
+    assert asyncio.run(collect()) == [{"a": 1}, {"a": 2}]
+
+
+def test_chat_completion_text_and_usage():
+    accumulator = ChatCompletionStreamAccumulator()
+    deltas = [
+        accumulator.add_chunk({"id": "c1", "model": "gpt-4o", "choices": [{"delta": {"role": "assistant", "content": "Hel"}}]}),
+        accumulator.add_chunk({"id": "c1", "choices": [{"delta": {"content": "lo"}, "finish_reason": "stop"}]}),
+        accumulator.add_chunk({"id": "c1", "choices": [], "usage": {"total_tokens": 7}}),
+    ]
+    assert deltas == ["Hel", "lo", ""]
+    assert accumulator.to_response() == {
+        "id": "c1",
+        "model": "gpt-4o",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "Hello"}, "finish_reason": "stop"}],
+        "usage": {"total_tokens": 7}
+    }
+
+
+def test_chat_completion_tool_call_fragments():
+    accumulator = ChatCompletionStreamAccumulator()
+    accumulator.add_chunk({"choices": [{"delta": {"tool_calls": [
+        {"index": 1, "id": "call_b", "function": {"name": "get_errors", "arguments": ""}},
+        {"index": 0, "id": "call_a", "function": {"name": "get_", "arguments": '{"sym'}},
+    ]}}]})
+    accumulator.add_chunk({"choices": [{"delta": {"tool_calls": [
+        {"index": 0, "function": {"name": "stock", "arguments": 'bol": "AAPL"}'}},
+        {"index": 1, "function": {"arguments": "{}"}},
+    ]}, "finish_reason": "tool_calls"}]})
+
+    message = accumulator.to_response()["choices"][0]["message"]
+    assert message["content"] is None
+    assert message["tool_calls"] == [
+        {"id": "call_a", "type": "function", "function": {"name": "get_stock", "arguments": '{"symbol": "AAPL"}'}},
+        {"id": "call_b", "type": "function", "function": {"name": "get_errors", "arguments": "{}"}},
+    ]
+
+
+def test_gemini_merges_text_parts():
+    accumulator = GeminiStreamAccumulator()
+    deltas = [
+        accumulator.add_chunk({"candidates": [{"content": {"parts": [{"text": "Hel"}]}}], "modelVersion": "gemini-2.0-flash"}),
+        accumulator.add_chunk({"candidates": [{"content": {"parts": [{"text": "lo"}]}, "finishReason": "STOP"}], "usageMetadata": {"totalTokenCount": 5}}),
+    ]
+    assert deltas == ["Hel", "lo"]
+    assert accumulator.to_response() == {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": "Hello"}]}, "finishReason": "STOP"}],
+        "usageMetadata": {"totalTokenCount": 5},
+        "modelVersion": "gemini-2.0-flash"
+    }
+
+
+def test_gemini_keeps_function_calls():
+    accumulator = GeminiStreamAccumulator()
+    function_call = {"functionCall": {"name": "get_stock", "args": {"symbol": "AAPL"}}}
+    assert accumulator.add_chunk({"candidates": [{"content": {"parts": [{"text": "Checking"}, function_call]}}]}) == "Checking"
+    assert accumulator.to_response()["candidates"][0]["content"]["parts"] == [{"text": "Checking"}, function_call]
+
+
+def test_gemini_empty_response():
+    assert GeminiStreamAccumulator().to_response()["candidates"][0]["content"]["parts"] == [{"text": ""}]
+
+
+def test_gemini_stream_with_text_before_function_call(monkeypatch):
+    function_call = {"functionCall": {"name": "get_stock", "args": {"symbol": "AAPL"}}}
+    chunks = [
+        {"candidates": [{"content": {"parts": [{"text": "Checking the price"}]}}]},
+        {"candidates": [{"content": {"parts": [function_call]}, "finishReason": "STOP"}]},
+    ]
+    monkeypatch.setattr(gemini, "get_llm_client", lambda client_name: FakeStreamingClient(chunks))
+    deltas = []
+
+    async def on_delta(text_delta):
+        deltas.append(text_delta)
+
+    response = asyncio.run(gemini.gemini_processor({"api_key": "key", "input": "AAPL price?", "is_stream": True}, on_delta=on_delta))
+    assert response.Status
+    assert deltas == ["Checking the price"]
+    assert response.Data["output_type"] == "tool_call"
+    assert LlmAdapters["MCP_CLIENT_GEMINI"].get_tool_calls(response.Data["final_llm_response"]) == [
+        {"id": None, "name": "get_stock", "arguments": {"symbol": "AAPL"}}
+    ]
@@ -0,0 +1,79 @@
+import pytest
+
+from src.json_codec import dumps
+from src.tool_result_cache import (
+    ToolResultCache,
+    get_cached_tool_result,
+    get_tool_result_cache_key,
+    invalidate_tool_results,
+    is_error_result,
+    store_tool_result,
+)
+
+SERVER = "MCP-APPSIGNAL"
+READ_ONLY_TOOL = "get_appsignal_all_incidents"
+CREDENTIALS = {"personal_api": "key-a", "app_id": "app"}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    ToolResultCache.clear()
+    yield
+    ToolResultCache.clear()
+
+
+def build_result(payload):
+    return {"content": [{"type": "text", "text": dumps(payload)}], "isError": False}
+
+
+def test_cache_key_ignores_argument_order_and_credentials():
+    first = get_tool_result_cache_key(SERVER, READ_ONLY_TOOL, {"a": 1, "b": 2, "__credentials__": {"x": 1}}, CREDENTIALS)
+    second = get_tool_result_cache_key(SERVER, READ_ONLY_TOOL, {"b": 2, "a": 1}, CREDENTIALS)
+    assert first == second
+
+
+def test_cache_key_is_per_tenant():
+    other_tenant = {**CREDENTIALS, "personal_api": "key-b"}
+    assert get_tool_result_cache_key(SERVER, READ_ONLY_TOOL, {}, CREDENTIALS) != get_tool_result_cache_key(SERVER, READ_ONLY_TOOL, {}, other_tenant)
+
+
+def test_mutating_tools_are_not_cacheable():
+    assert get_cached_tool_result(SERVER, "resolve_incident", {}, CREDENTIALS) == (None, None)
+
+
+def test_store_and_get_read_only_result():
+    cache_key, cached = get_cached_tool_result(SERVER, READ_ONLY_TOOL, {"state": "open"}, CREDENTIALS)
+    assert cached is None
+    result = build_result({"incidents": []})
+    store_tool_result(cache_key, result)
+    assert get_cached_tool_result(SERVER, READ_ONLY_TOOL, {"state": "open"}, CREDENTIALS) == (cache_key, result)
+
+
+@pytest.mark.parametrize("result", [
+    "Error calling tool: timeout",
+    {"content": [], "isError": True},
+    build_result({"error": "Unauthorized"}),
+    build_result({"status": False, "message": "failed"}),
+    build_result({"status": "error"}),
+    build_result({"success": False}),
+    build_result({"statusCode": 503}),
+])
+def test_error_results_are_not_cached(result):
+    assert is_error_result(result)
+    cache_key, _ = get_cached_tool_result(SERVER, READ_ONLY_TOOL, {}, CREDENTIALS)
+    store_tool_result(cache_key, result)
+    assert get_cached_tool_result(SERVER, READ_ONLY_TOOL, {}, CREDENTIALS)[1] is None
+
+
+def test_successful_results_are_not_errors():
+    assert not is_error_result(build_result({"status": "ok", "status_code": 200, "items": []}))
+    assert not is_error_result({"content": [{"type": "text", "text": "{not json"}]})
+
+
+def test_invalidate_drops_only_one_tenant():
+    other_tenant = {**CREDENTIALS, "personal_api": "key-b"}
+    for credentials in (CREDENTIALS, other_tenant):
+        cache_key, _ = get_cached_tool_result(SERVER, READ_ONLY_TOOL, {}, credentials)
+        store_tool_result(cache_key, build_result({"incidents": []}))
+    assert invalidate_tool_results(SERVER, CREDENTIALS) == 1
+    assert get_cached_tool_result(SERVER, READ_ONLY_TOOL, {}, other_tenant)[1] is not None
@@ -0,0 +1,77 @@
+import pytest
+
+from src.client_and_server_config import ToolResultShapingConfig
+from src.json_codec import dumps, loads
+from src.tool_result_shaping import decode_embedded_json, encode_tables, sample_array, shape_tool_result
+
+
+@pytest.fixture
+def shaping_config():
+    saved = dict(ToolResultShapingConfig)
+    yield ToolResultShapingConfig
+    ToolResultShapingConfig.clear()
+    ToolResultShapingConfig.update(saved)
+
+
+def test_sample_array_keeps_short_arrays():
+    assert sample_array([1, 2, 3], head=2, tail=1) == [1, 2, 3]
+
+
+def test_sample_array_marks_omitted_items():
+    sampled = sample_array(list(range(10)), head=2, tail=1)
+    assert sampled[:2] == [0, 1]
+    assert sampled[-1] == 9
+    assert sampled[2] == "... 7 more items omitted, 10 in total ..."
+
+
+def test_decode_embedded_json():
+    value = {"content": [{"type": "text", "text": '{"items": [1, 2]}'}, {"type": "text", "text": "{not json"}]}
+    assert decode_embedded_json(value) == {"content": [{"type": "text", "text": {"items": [1, 2]}}, {"type": "text", "text": "{not json"}]}
+
+
+def test_encode_tables_homogeneous_records():
+    records = [{"id": index, "name": f"n{index}"} for index in range(3)]
+    assert encode_tables({"items": records}, min_rows=3) == {
+        "items": {"columns": ["id", "name"], "rows": [[0, "n0"], [1, "n1"], [2, "n2"]]}
+    }
+
+
+def test_encode_tables_leaves_mixed_records():
+    records = [{"id": 1}, {"id": 2, "extra": True}, {"id": 3}]
+    assert encode_tables(records, min_rows=3) == records
+
+
+def test_encode_tables_keeps_omission_markers_as_rows():
+    sampled = sample_array([{"id": index} for index in range(6)], head=2, tail=1)
+    table = encode_tables(sampled, min_rows=3)
+    assert table["columns"] == ["id"]
+    assert table["rows"] == [[0], [1], sampled[2], [5]]
+
+
+def test_shape_tool_result_disabled_returns_full_text(shaping_config):
+    shaping_config["enabled"] = False
+    result = {"items": list(range(100))}
+    assert shape_tool_result(result) == (dumps(result), 0)
+
+
+def test_shape_tool_result_samples_large_arrays(shaping_config):
+    shaping_config.update(max_result_tokens=50, array_head=2, array_tail=1, tabular_arrays=False)
+    result = {"content": [{"type": "text", "text": dumps({"items": list(range(500))})}]}
+    shaped_text, tokens_saved = shape_tool_result(result)
+    assert tokens_saved > 0
+    items = loads(shaped_text)["content"][0]["text"]["items"]
+    assert items[:2] == [0, 1] and items[-1] == 499
+    assert "497 more items omitted" in items[2]
+
+
+def test_shape_tool_result_caps_huge_text(shaping_config):
+    shaping_config.update(max_result_tokens=10, tabular_arrays=False)
+    shaped_text, tokens_saved = shape_tool_result({"text": "x" * 1000})
+    assert shaped_text.startswith('{"text":"xxx')
+    assert "[truncated" in shaped_text
+    assert tokens_saved > 0
+
+
+def test_shape_tool_result_keeps_small_results_unchanged(shaping_config):
+    result = {"status": "ok"}
+    assert shape_tool_result(result) == (dumps(result), 0)
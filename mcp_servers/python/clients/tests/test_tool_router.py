@@ -0,0 +1,80 @@
+import pytest
+
+from src.client_and_server_config import ToolRouterConfig
+from src.tool_router import BM25ToolIndex, BM25ToolRouter, route_tools_locally, tokenize
+
+
+def build_tool(name, description, parameters=None):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": parameters or {}}
+        }
+    }
+
+
+TOOLS = [
+    build_tool("get_appsignal_all_incidents", "List the open incidents of an AppSignal application"),
+    build_tool("get_stock_details", "Price and fundamentals of a stock", {"ticker": {"type": "string", "description": "Stock ticker symbol"}}),
+    build_tool("list_classroom_courses", "Courses of a Google Classroom teacher"),
+]
+
+
+@pytest.fixture
+def router_config():
+    saved = dict(ToolRouterConfig)
+    yield ToolRouterConfig
+    ToolRouterConfig.clear()
+    ToolRouterConfig.update(saved)
+
+
+def test_tokenize_splits_identifiers_and_folds_plurals():
+    assert tokenize("getAllIncidents") == ["get", "incident"]
+    assert tokenize("get_stock_details") == ["get", "stock", "detail"]
+
+
+def test_tokenize_drops_stop_words_and_short_tokens():
+    assert tokenize("What is the price of a stock?") == ["price", "stock"]
+
+
+def test_bm25_ranks_matching_tool_first():
+    scores = BM25ToolIndex(TOOLS).score(tokenize("stock price for a ticker"))
+    assert scores[0][0] == "get_stock_details"
+    assert scores[0][1] > scores[1][1]
+
+
+def test_bm25_coverage():
+    index = BM25ToolIndex(TOOLS)
+    assert index.coverage(tokenize("incidents")) == 1.0
+    assert index.coverage(tokenize("weather forecast")) == 0.0
+    assert index.coverage([]) == 0.0
+
+
+def test_router_selects_tool_for_confident_match(router_config):
+    decision = BM25ToolRouter().route("show the open appsignal incidents", TOOLS)
+    assert decision.is_function_call
+    assert decision.selected_tools[0] == "get_appsignal_all_incidents"
+    assert decision.source == "bm25"
+    assert decision.to_extracted_result() == {"isFunctionCall": True, "selectedTools": decision.selected_tools}
+
+
+def test_router_defers_unknown_intents_to_llm(router_config):
+    assert BM25ToolRouter().route("what is the weather tomorrow", TOOLS) is None
+    assert BM25ToolRouter().route("anything", []) is None
+
+
+def test_router_keeps_newest_index_per_selection():
+    router = BM25ToolRouter()
+    router.get_index(TOOLS, (("A",), 1))
+    router.get_index(TOOLS[:1], (("A",), 2))
+    router.get_index(TOOLS, (("B",), 2))
+    assert set(router.indexes) == {(("A",), 2), (("B",), 2)}
+
+
+def test_route_tools_locally_respects_mode(router_config):
+    router_config["mode"] = "llm"
+    assert route_tools_locally("show the open appsignal incidents", TOOLS) is None
+    router_config["mode"] = "hybrid"
+    assert route_tools_locally("show the open appsignal incidents", TOOLS) is not None
@@ -0,0 +1,98 @@
+import pytest
+
+from src import ttl_cache
+from src.client_and_server_config import RouterCacheConfig
+from src.tool_router import get_history_digest, get_router_cache_key, normalize_router_input
+from src.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", fake_clock.monotonic)
+    return fake_clock
+
+
+def test_get_and_expiry(clock):
+    cache = TTLCache(max_size=4, ttl=10.0)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    clock.now += 10.0
+    assert cache.get("key", "missing") == "missing"
+    assert cache.stats()["size"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_per_entry_ttl(clock):
+    cache = TTLCache(ttl=10.0)
+    cache.set("short", 1, ttl=1.0)
+    cache.set("default", 2)
+    clock.now += 5.0
+    assert cache.get("short") is None
+    assert cache.get("default") == 2
+
+
+def test_non_positive_ttl_is_not_stored():
+    cache = TTLCache(ttl=10.0)
+    cache.set("key", "value", ttl=0)
+    assert cache.get("key") is None
+    assert TTLCache(max_size=0).stats()["size"] == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.evictions == 1
+
+
+def test_invalidate_by_predicate():
+    cache = TTLCache()
+    for key in [("s1", 1), ("s1", 2), ("s2", 1)]:
+        cache.set(key, True)
+    assert cache.invalidate(lambda key: key[0] == "s1") == 2
+    assert list(cache.entries) == [("s2", 1)]
+
+
+def test_hit_rate():
+    cache = TTLCache()
+    cache.set("key", 1)
+    cache.get("key")
+    cache.get("other")
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_normalize_router_input():
+    assert normalize_router_input("  Show   my Incidents?! ") == "show my incidents"
+
+
+def test_router_cache_key_ignores_server_order():
+    assert get_router_cache_key("list incidents", ["b", "a"], 3) == get_router_cache_key("List incidents.", ["a", "b"], 3)
+
+
+def test_router_cache_key_depends_on_catalog_version():
+    assert get_router_cache_key("list incidents", ["a"], 3) != get_router_cache_key("list incidents", ["a"], 4)
+
+
+def test_router_cache_key_depends_on_prior_history():
+    first = [{"role": "user", "content": "list my courses"}, {"role": "assistant", "content": "Which teacher?"}]
+    second = [{"role": "user", "content": "delete my course"}, {"role": "assistant", "content": "Which course?"}]
+    assert get_router_cache_key("yes", ["a"], 1, first) != get_router_cache_key("yes", ["a"], 1, second)
+    assert get_router_cache_key("yes", ["a"], 1, first) == get_router_cache_key("yes", ["a"], 1, [dict(message) for message in first])
+    assert get_history_digest([]) == get_history_digest(None) == ""
+
+
+def test_router_cache_key_disabled(monkeypatch):
+    monkeypatch.setitem(RouterCacheConfig, "enabled", False)
+    assert get_router_cache_key("list incidents", ["a"], 1) is None
@@ -4,6 +4,7 @@ from typing import Any
 import traceback
 from dotenv import load_dotenv
 from mcp.server import Server
+from mcp_server_common import tracing, transport
 from mcp.types import (
     Tool,
     TextContent,
@@ -21,6 +22,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("mcp-anytype")
 
 app = Server("mcp-anytype")
+tracing.setup_tracing("mcp-anytype")
 
 tool_handlers = {}
 
@@ -61,17 +63,12 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageCo
         if not tool_handler:
             raise ValueError(f"Unknown tool: {name}")
 
-        return tool_handler.run_tool(arguments)
+        with tracing.start_tool_span(app, name):
+            return tool_handler.run_tool(arguments)
     except Exception as e:
         logging.error(traceback.format_exc())
         logging.error(f"Error during call_tool: {str(e)}")
         raise RuntimeError(f"Caught Exception. Error: {str(e)}")
 
 async def main():
-    from mcp.server.stdio import stdio_server
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        ) 
\ No newline at end of file
+    await transport.run_server(app, default_port=8103)
\ No newline at end of file
@@ -5,6 +5,7 @@ from typing import Any
 import traceback
 from dotenv import load_dotenv
 from mcp.server import Server
+from mcp_server_common import tracing, transport
 from mcp.types import (
     Tool,
     TextContent,
@@ -23,6 +24,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("mcp-appsignal")
 
 app = Server("mcp-appsignal")
+tracing.setup_tracing("mcp-appsignal")
 
 tool_handlers = {}
 def add_tool_handler(tool_class: toolhandler.ToolHandler):
@@ -56,18 +58,12 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageCo
         if not tool_handler:
             raise ValueError(f"Unknown tool: {name}")
 
-        return tool_handler.run_tool(arguments)
+        with tracing.start_tool_span(app, name):
+            return tool_handler.run_tool(arguments)
     except Exception as e:
         logging.error(traceback.format_exc())
         logging.error(f"Error during call_tool: {str(e)}")
         raise RuntimeError(f"Caught Exception. Error: {str(e)}")
 
 async def main():
-    from mcp.server.stdio import stdio_server
-
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        ) 
\ No newline at end of file
+    await transport.run_server(app, default_port=8101)
\ No newline at end of file
@@ -1,7 +1,10 @@
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Shared server code, see mcp_servers/python/servers/mcp-server-common
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'mcp-server-common', 'src')))
 from mcp.server import Server
+from mcp_server_common import tracing, transport
 from mcp.types import Tool
 from mcp_pingdom.tools_checks import get_all_checks, get_check_details, create_check, update_check, delete_check
 from mcp_pingdom.tools_maintenance import get_all_maintenance, create_maintenance, update_maintenance, delete_maintenance
@@ -17,6 +20,7 @@ logging.basicConfig(filename='stdio_server_debug.log', level=logging.DEBUG, form
 logging.info("Server started")
 
 app = Server("mcp-pingdom")
+tracing.setup_tracing("mcp-pingdom")
 
 @app.list_tools()
 async def list_tools():
@@ -207,49 +211,50 @@ async def list_tools():
 async def call_tool(name: str, arguments: dict):
     logging.info(f"Tool call invoked: {name}, arguments: {arguments}")
     try:
-    if name == "get_all_checks":
-        return get_all_checks(arguments)
-    elif name == "get_check_details":
-        return get_check_details(arguments.get("check_id"), arguments)
-    elif name == "create_check":
-        return create_check(arguments.get("check_data", {}), arguments)
-    elif name == "update_check":
-        return update_check(arguments.get("check_id"), arguments.get("update_data", {}), arguments)
-    elif name == "delete_check":
-        return delete_check(arguments.get("check_id"), arguments)
-    elif name == "get_all_maintenance":
-        return get_all_maintenance(arguments)
-    elif name == "create_maintenance":
-        return create_maintenance(arguments.get("maintenance_data", {}), arguments)
-    elif name == "update_maintenance":
-        return update_maintenance(arguments.get("maintenanceid"), arguments.get("update_data", {}), arguments)
-    elif name == "delete_maintenance":
-        return delete_maintenance(arguments.get("maintenanceid"), arguments)
-    elif name == "get_all_probes":
-        return get_all_probes(arguments)
-    elif name == "get_check_results":
-        return get_check_results(arguments.get("check_id"), arguments)
-    elif name == "get_summary_average":
-        return get_summary_average(arguments.get("check_id"), arguments)
-    elif name == "get_summary_outage":
-        return get_summary_outage(arguments.get("check_id"), arguments)
-    elif name == "get_summary_performance":
-        return get_summary_performance(arguments.get("check_id"), arguments)
-    elif name == "get_summary_pagespeed":
-        return get_summary_pagespeed(arguments.get("check_id"), arguments)
-    elif name == "get_all_transactions":
-        return get_all_transactions(arguments)
-    elif name == "get_transaction_details":
-        return get_transaction_details(arguments.get("transaction_id"), arguments)
-    elif name == "create_transaction":
-        return create_transaction(arguments.get("transaction_data", {}), arguments)
-    elif name == "update_transaction":
-        return update_transaction(arguments.get("transaction_id"), arguments.get("update_data", {}), arguments)
-    elif name == "delete_transaction":
-        return delete_transaction(arguments.get("transaction_id"), arguments)
-    else:
-            logging.error(f"Unknown tool: {name}")
-        return {"error": f"Unknown tool: {name}", "status": False}
+        with tracing.start_tool_span(app, name):
+            if name == "get_all_checks":
+                return get_all_checks(arguments)
+            elif name == "get_check_details":
+                return get_check_details(arguments.get("check_id"), arguments)
+            elif name == "create_check":
+                return create_check(arguments.get("check_data", {}), arguments)
+            elif name == "update_check":
+                return update_check(arguments.get("check_id"), arguments.get("update_data", {}), arguments)
+            elif name == "delete_check":
+                return delete_check(arguments.get("check_id"), arguments)
+            elif name == "get_all_maintenance":
+                return get_all_maintenance(arguments)
+            elif name == "create_maintenance":
+                return create_maintenance(arguments.get("maintenance_data", {}), arguments)
+            elif name == "update_maintenance":
+                return update_maintenance(arguments.get("maintenanceid"), arguments.get("update_data", {}), arguments)
+            elif name == "delete_maintenance":
+                return delete_maintenance(arguments.get("maintenanceid"), arguments)
+            elif name == "get_all_probes":
+                return get_all_probes(arguments)
+            elif name == "get_check_results":
+                return get_check_results(arguments.get("check_id"), arguments)
+            elif name == "get_summary_average":
+                return get_summary_average(arguments.get("check_id"), arguments)
+            elif name == "get_summary_outage":
+                return get_summary_outage(arguments.get("check_id"), arguments)
+            elif name == "get_summary_performance":
+                return get_summary_performance(arguments.get("check_id"), arguments)
+            elif name == "get_summary_pagespeed":
+                return get_summary_pagespeed(arguments.get("check_id"), arguments)
+            elif name == "get_all_transactions":
+                return get_all_transactions(arguments)
+            elif name == "get_transaction_details":
+                return get_transaction_details(arguments.get("transaction_id"), arguments)
+            elif name == "create_transaction":
+                return create_transaction(arguments.get("transaction_data", {}), arguments)
+            elif name == "update_transaction":
+                return update_transaction(arguments.get("transaction_id"), arguments.get("update_data", {}), arguments)
+            elif name == "delete_transaction":
+                return delete_transaction(arguments.get("transaction_id"), arguments)
+            else:
+                logging.error(f"Unknown tool: {name}")
+                return {"error": f"Unknown tool: {name}", "status": False}
     except Exception as e:
         logging.exception(f"Exception in tool call {name}: {e}")
         return {"error": f"Exception in tool call {name}: {e}", "status": False}
@@ -257,9 +262,7 @@ async def call_tool(name: str, arguments: dict):
 async def main():
     logging.info("Main loop entered")
     time.sleep(2)  # Wait for 2 seconds to keep the server alive at startup
-    from mcp.server.stdio import stdio_server
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
+    await transport.run_server(app, default_port=8104)
     logging.info("Server exiting")
 
 if __name__ == "__main__":
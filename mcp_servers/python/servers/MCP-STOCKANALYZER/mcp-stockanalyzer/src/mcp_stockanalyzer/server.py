@@ -1,5 +1,6 @@
 import logging
 from mcp.server import Server
+from mcp_server_common import tracing, transport
 from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
 from . import tools_stock
 from . import toolhandler
@@ -10,6 +11,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("mcp-stockanalyzer")
 
 app = Server("mcp-stockanalyzer")
+tracing.setup_tracing("mcp-stockanalyzer")
 
 tool_handlers = {}
 
@@ -37,17 +39,12 @@ async def call_tool(name: str, arguments: dict) -> Sequence[TextContent | ImageC
         tool_handler = get_tool_handler(name)
         if not tool_handler:
             raise ValueError(f"Unknown tool: {name}")
-        return tool_handler.run_tool(arguments)
+        with tracing.start_tool_span(app, name):
+            return tool_handler.run_tool(arguments)
     except Exception as e:
         logger.error(traceback.format_exc())
         logger.error(f"Error during call_tool: {str(e)}")
         raise RuntimeError(f"Caught Exception. Error: {str(e)}")
 
 async def main():
-    from mcp.server.stdio import stdio_server
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        ) 
\ No newline at end of file
+    await transport.run_server(app, default_port=8102)
\ No newline at end of file
@@ -5,6 +5,7 @@ from typing import Any, Optional, Sequence, Union
 from collections.abc import Sequence
 from dotenv import load_dotenv
 from mcp.server import Server
+from mcp_server_common import tracing, transport
 from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
 
 # Local imports
@@ -20,6 +21,7 @@ logger = logging.getLogger("mcp-googleclassroom")
 
 # Create MCP Server instance
 app = Server("mcp-googleclassroom")
+tracing.setup_tracing("mcp-google-classroom")
 
 # Tool handlers registry
 tool_handlers: dict[str, toolhandler.ToolHandler] = {}
@@ -87,7 +89,8 @@ async def call_tool(name: str, arguments: Any) -> Sequence[Union[TextContent, Im
         if not handler:
             raise ValueError(f"Unknown tool: {name}")
 
-        return handler.run_tool(arguments)
+        with tracing.start_tool_span(app, name):
+            return handler.run_tool(arguments)
 
     except Exception as e:
         logger.error(traceback.format_exc())
@@ -96,16 +99,9 @@ async def call_tool(name: str, arguments: Any) -> Sequence[Union[TextContent, Im
 
 async def main():
     """
-    Entry point to run the MCP server using stdio transport.
+    Entry point to run the MCP server over stdio or Streamable HTTP.
     """
-    from mcp.server.stdio import stdio_server
-
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
+    await transport.run_server(app, default_port=8105)
 
 # Optional: For running via `python server.py`
 if __name__ == "__main__":
@@ -1,5 +1,10 @@
+from pathlib import Path
+
 from setuptools import setup, find_packages
 
+# Shared tracing and transports, not published on PyPI, installed from the sibling directory
+MCP_SERVER_COMMON = (Path(__file__).resolve().parent.parent / "mcp-server-common").as_uri()
+
 setup(
     name="mcp-google-classroom",
     version="0.1.0",
@@ -10,7 +15,8 @@ setup(
     python_requires=">=3.10",
     packages=find_packages(include=["mcp_googleclassroom", "mcp_googleclassroom.*"]),
     install_requires=[
-        "mcp>=1.1.0",
+        "mcp>=1.8.0",
+        f"mcp-server-common @ {MCP_SERVER_COMMON}",
         "requests>=2.32.3",
         "python-dotenv>=1.0.1",
         "google-api-python-client>=2.108.0",
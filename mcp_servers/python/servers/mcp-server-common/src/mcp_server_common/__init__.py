@@ -0,0 +1 @@
+"""Tracing and transports shared by the MCP servers"""
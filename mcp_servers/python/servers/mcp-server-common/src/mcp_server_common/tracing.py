@@ -0,0 +1,210 @@
+"""Tracing of tool calls made through the MCP gateway.
+
+The gateway sends a W3C `traceparent` in the `_meta` field of tools/call requests.
+Tool calls and their outbound HTTP requests are recorded as child spans, written as
+OTLP JSON lines by a background thread to "<service>-<pid>.jsonl" in the directory named
+by the MCP_TRACE_DIR environment variable, rotated at MCP_TRACE_MAX_BYTES. Nothing is
+recorded when it is unset. Stdout carries the stdio protocol, so spans are never
+written there.
+"""
+import atexit
+import functools
+import json
+import logging
+import os
+import queue
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Iterator, List, Optional
+
+# Set by setup_tracing, the service.name resource attribute of the spans
+SERVICE_NAME = "mcp-server"
+TRACE_DIR_ENV = "MCP_TRACE_DIR"
+TRACE_MAX_BYTES_ENV = "MCP_TRACE_MAX_BYTES"
+TRACE_BACKUP_COUNT_ENV = "MCP_TRACE_BACKUP_COUNT"
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+_current_span: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_span", default=None)
+_writer: Optional["SpanFileWriter"] = None
+
+
+def parse_traceparent(traceparent: Optional[str]) -> Optional[Dict[str, str]]:
+    """Return the trace and parent span ids of a W3C traceparent header"""
+    parts = (traceparent or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return {"trace_id": parts[1], "span_id": parts[2]}
+
+
+def get_request_traceparent(app: Any) -> Optional[str]:
+    """traceparent sent by the gateway in the `_meta` of the current request"""
+    try:
+        meta = app.request_context.meta
+    except LookupError:
+        return None
+    return getattr(meta, "traceparent", None) if meta is not None else None
+
+
+def to_otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    otlp_attributes = []
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            otlp_value = {"boolValue": value}
+        elif isinstance(value, int):
+            otlp_value = {"intValue": str(value)}
+        else:
+            otlp_value = {"stringValue": str(value)}
+        otlp_attributes.append({"key": key, "value": otlp_value})
+    return otlp_attributes
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue spans for the writer thread as they are, dropping them when the queue is full"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class OtlpJsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg)
+
+
+class SpanFileWriter:
+    """Append export requests to the rotated span file of this process from a background thread"""
+
+    def __init__(self, trace_dir: str):
+        self.pid = os.getpid()
+        os.makedirs(trace_dir, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            os.path.join(trace_dir, f"{SERVICE_NAME}-{self.pid}.jsonl"),
+            maxBytes=int(os.getenv(TRACE_MAX_BYTES_ENV, 50 * 1024 * 1024)),
+            backupCount=int(os.getenv(TRACE_BACKUP_COUNT_ENV, 3)),
+            encoding="utf-8"
+        )
+        file_handler.setFormatter(OtlpJsonFormatter())
+        self.handler = DroppingQueueHandler(queue.Queue(maxsize=10000))
+        self.listener = QueueListener(self.handler.queue, file_handler)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def write(self, export_request: Dict[str, Any]):
+        self.handler.handle(logging.makeLogRecord({"msg": export_request}))
+
+
+def get_writer() -> Optional[SpanFileWriter]:
+    global _writer
+    if _writer is None or _writer.pid != os.getpid():
+        try:
+            _writer = SpanFileWriter(os.environ[TRACE_DIR_ENV])
+        except OSError:
+            return None
+    return _writer
+
+
+def export_span(span: Dict[str, Any]):
+    if not os.getenv(TRACE_DIR_ENV):
+        return
+    writer = get_writer()
+    if writer is None:
+        return
+    writer.write({
+        "resourceSpans": [{
+            "resource": {"attributes": to_otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": f"{SERVICE_NAME}.tracing"}, "spans": [span]}]
+        }]
+    })
+
+
+@contextmanager
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, traceparent: Optional[str] = None, **attributes) -> Iterator[Optional[Dict[str, Any]]]:
+    """Record a span for the duration of the block, as a child of `traceparent` or of the current span"""
+    if not os.getenv(TRACE_DIR_ENV):
+        yield None
+        return
+
+    parent = parse_traceparent(traceparent) or _current_span.get()
+    span = {
+        "traceId": parent["trace_id"] if parent else secrets.token_hex(16),
+        "spanId": secrets.token_hex(8),
+        "name": name,
+        "kind": kind,
+        "startTimeUnixNano": str(time.time_ns()),
+        "status": {"code": 1},
+    }
+    if parent:
+        span["parentSpanId"] = parent["span_id"]
+
+    token = _current_span.set({"trace_id": span["traceId"], "span_id": span["spanId"]})
+    try:
+        yield span
+    except BaseException as err:
+        span["status"] = {"code": 2, "message": str(err) or type(err).__name__}
+        raise
+    finally:
+        _current_span.reset(token)
+        span["endTimeUnixNano"] = str(time.time_ns())
+        span["attributes"] = to_otlp_attributes(attributes)
+        export_span(span)
+
+
+def setup_tracing(service_name: str):
+    """Name the spans of this server and trace its outbound HTTP requests"""
+    global SERVICE_NAME
+    SERVICE_NAME = service_name
+    instrument_http()
+
+
+def start_tool_span(app: Any, name: str):
+    """Span of a tools/call request, continuing the gateway trace"""
+    return start_span(f"tools/call {name}", kind=SPAN_KIND_SERVER, traceparent=get_request_traceparent(app), tool=name)
+
+
+def _wrap_http_method(owner: Any, method_name: str, get_request_info):
+    original = getattr(owner, method_name)
+    if getattr(original, "__traced__", False):
+        return
+
+    @functools.wraps(original)
+    def traced(*args, **kwargs):
+        method, url = get_request_info(*args, **kwargs)
+        with start_span(f"HTTP {method}", kind=SPAN_KIND_CLIENT, **{"http.method": method, "http.url": url}):
+            return original(*args, **kwargs)
+
+    traced.__traced__ = True
+    setattr(owner, method_name, traced)
+
+
+def instrument_http():
+    """Open a client span around every outbound HTTP request of the installed HTTP libraries"""
+    try:
+        import requests
+        _wrap_http_method(requests.Session, "request", lambda self, method, url, *args, **kwargs: (str(method).upper(), str(url).split("?")[0]))
+    except ImportError:
+        pass
+
+    try:
+        import httpx
+        _wrap_http_method(httpx.Client, "send", lambda self, request, *args, **kwargs: (request.method, str(request.url.copy_with(query=None))))
+    except ImportError:
+        pass
+
+    try:
+        from googleapiclient import http as googleapiclient_http
+        _wrap_http_method(googleapiclient_http.HttpRequest, "execute", lambda self, *args, **kwargs: (self.method, self.uri.split("?")[0]))
+    except ImportError:
+        pass
@@ -0,0 +1,74 @@
+"""Transports of the MCP servers.
+
+stdio (the default) serves the parent process that spawned the server. With
+`--transport streamable-http` the server runs as a long-lived Streamable HTTP
+endpoint at http://<host>:<port>/mcp that many clients share, so it can be scaled
+and restarted independently of them. The options can also be set with the
+MCP_TRANSPORT, MCP_HTTP_HOST and MCP_HTTP_PORT environment variables.
+"""
+import argparse
+import contextlib
+import os
+from typing import Any, List, Optional
+
+from mcp.server import Server
+
+
+def parse_transport_args(default_port: int, description: str, argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--transport", choices=["stdio", "streamable-http"], default=os.getenv("MCP_TRANSPORT", "stdio"))
+    parser.add_argument("--host", default=os.getenv("MCP_HTTP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_HTTP_PORT", default_port)))
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+class StreamableHTTPEndpoint:
+    """ASGI app handing every request of the /mcp route to the session manager"""
+
+    def __init__(self, session_manager: Any):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope, receive, send):
+        await self.session_manager.handle_request(scope, receive, send)
+
+
+async def run_stdio(app: Server):
+    from mcp.server.stdio import stdio_server
+
+    async with stdio_server() as (read_stream, write_stream):
+        await app.run(
+            read_stream,
+            write_stream,
+            app.create_initialization_options()
+        )
+
+
+async def run_streamable_http(app: Server, host: str, port: int):
+    import uvicorn
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+
+    # Stateless, so any instance behind a load balancer can serve any request
+    session_manager = StreamableHTTPSessionManager(app=app, stateless=True)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(_):
+        async with session_manager.run():
+            yield
+
+    http_app = Starlette(routes=[Route("/mcp", endpoint=StreamableHTTPEndpoint(session_manager))], lifespan=lifespan)
+    await uvicorn.Server(uvicorn.Config(http_app, host=host, port=port)).serve()
+
+
+async def run_server(app: Server, default_port: int, description: Optional[str] = None, argv: Optional[List[str]] = None):
+    """Serve the app over the transport selected on the command line or in the environment.
+
+    `default_port` is the Streamable HTTP port of the server when none is given.
+    """
+    args = parse_transport_args(default_port, description or f"{app.name} MCP server", argv)
+    if args.transport == "streamable-http":
+        await run_streamable_http(app, args.host, args.port)
+    else:
+        await run_stdio(app)